@@ -0,0 +1,149 @@
+import sqlite3
+import pandas as pd
+
+from scripts.aggregation import compute_partial_aggregates
+from scripts.utils import extract_multiple_date_features
+
+# table name -> (group by columns, summed value columns)
+# weeks are ISO weeks, so the weekly tables are keyed on the ISO year the week belongs to
+AGGREGATE_TABLES = {'weekly_product': (['iso_year', 'week', 'product'], ['total_orders', 'revenue']),
+                    'weekly_provider': (['iso_year', 'week', 'provider'], ['total_orders', 'revenue']),
+                    'monthly_product_provider': (['product', 'provider', 'year', 'month'], ['order_count', 'revenue'])}
+
+TEXT_KEY_COLUMNS = ('product', 'provider')
+
+# summed value column -> source column of the order rows
+VALUE_SOURCE_COLUMNS = {'total_orders': 'order_count',
+                        'order_count': 'order_count',
+                        'revenue': 'revenue'}
+
+class AggregateStore:
+    """
+    SQLite backed store of the weekly and monthly product/provider aggregates.
+    New order rows are folded into the affected buckets only and the KPIs are
+    derived from the stored sums, so the cost of a daily update depends on the
+    size of the new rows instead of the whole history.
+
+    Args:
+        path:str        -> SQLite database file, ':memory:' keeps the store in memory
+        date_column:str -> Date column of the appended order rows
+    """
+
+    def __init__(self, path:str = 'aggregates.sqlite', date_column:str = 'order_date'):
+        self.path = path
+        self.date_column = date_column
+        self.connection = sqlite3.connect(path)
+        self.create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self)->None:
+        self.connection.close()
+
+    def create_tables(self)->None:
+        with self.connection:
+            for table, (key_columns, value_columns) in AGGREGATE_TABLES.items():
+                stored_columns = [row[1] for row in self.connection.execute('PRAGMA table_info({})'.format(table))]
+                if stored_columns and stored_columns!=key_columns+value_columns:
+                    raise ValueError("Table '{}' of {} has the outdated columns {}, rebuild the store from the "
+                                     "order rows.".format(table, self.path, stored_columns))
+                columns = [f'{column} TEXT NOT NULL' if column in TEXT_KEY_COLUMNS else f'{column} INTEGER NOT NULL'
+                           for column in key_columns]
+                columns += [f'{column} REAL NOT NULL' for column in value_columns]
+                self.connection.execute('CREATE TABLE IF NOT EXISTS {} ({}, PRIMARY KEY ({}))'
+                                        .format(table, ', '.join(columns), ', '.join(key_columns)))
+
+    def append(self, new_rows:pd.core.frame.DataFrame)->None:
+        """
+        Adds the sums of the new order rows to the stored buckets. Buckets which
+        do not exist yet are created.
+
+        Args:
+            new_rows:pd.core.frame.DataFrame -> rows with order_date, product, provider,
+                                                order_count and revenue columns
+        """
+        try:
+            if new_rows.empty:
+                return
+
+            date_features = extract_multiple_date_features(new_rows, self.date_column,
+                                                           ['year', 'month', 'iso_year', 'week'])
+            data = pd.concat([new_rows[['product', 'provider', 'order_count', 'revenue']], date_features], axis=1)
+
+            with self.connection:
+                for table, (key_columns, value_columns) in AGGREGATE_TABLES.items():
+                    metrics = {column: ('sum', VALUE_SOURCE_COLUMNS[column]) for column in value_columns}
+                    partial = compute_partial_aggregates(data, key_columns, metrics).reset_index()
+
+                    records = {}
+                    for column in key_columns:
+                        records[column] = partial[column].astype(str) if column in TEXT_KEY_COLUMNS \
+                                          else partial[column].astype('int64')
+                    for column in value_columns:
+                        records[column] = partial[VALUE_SOURCE_COLUMNS[column]+'__sum'].astype('float64')
+
+                    self.connection.executemany(
+                        'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+                        'ON CONFLICT ({keys}) DO UPDATE SET {updates}'.format(
+                            table=table,
+                            columns=', '.join(key_columns+value_columns),
+                            placeholders=', '.join('?'*len(key_columns+value_columns)),
+                            keys=', '.join(key_columns),
+                            updates=', '.join(f'{column} = {column} + excluded.{column}' for column in value_columns)),
+                        pd.DataFrame(records).itertuples(index=False, name=None))
+
+        except Exception as error:
+            raise Exception('Caught this error: ' + repr(error)) from error
+
+    def get_table(self, table:str)->pd.core.frame.DataFrame:
+        """
+        Returns the stored aggregate table with the average revenue per order
+        of each bucket as avg_order_rev(0 for buckets without orders).
+
+        Args:
+            table:str -> one of AGGREGATE_TABLES
+        """
+        if table not in AGGREGATE_TABLES:
+            raise ValueError("Unknown aggregate table '{}'.".format(table))
+
+        key_columns, value_columns = AGGREGATE_TABLES[table]
+        df = pd.read_sql_query('SELECT * FROM {} ORDER BY {}'.format(table, ', '.join(key_columns)), self.connection)
+        orders = df[value_columns[0]]
+        df['avg_order_rev'] = (df['revenue']/orders.where(orders!=0)).fillna(0)
+        return df
+
+    def _query_value(self, query:str):
+        return self.connection.execute(query).fetchone()
+
+    def get_avg_orders_per_week(self)->float:
+        """Returns the average number of orders per week."""
+        total_orders, num_weeks = self._query_value('SELECT SUM(total_orders), COUNT(DISTINCT iso_year*100+week) '
+                                                    'FROM weekly_product')
+        return total_orders/num_weeks if num_weeks else 0.0
+
+    def get_avg_revenue_per_week(self)->float:
+        """Returns the average revenue per week."""
+        revenue, num_weeks = self._query_value('SELECT SUM(revenue), COUNT(DISTINCT iso_year*100+week) '
+                                               'FROM weekly_product')
+        return revenue/num_weeks if num_weeks else 0.0
+
+    def get_avg_revenue_per_order(self)->float:
+        """Returns the average revenue per order."""
+        revenue, total_orders = self._query_value('SELECT SUM(revenue), SUM(total_orders) FROM weekly_product')
+        return revenue/total_orders if total_orders else 0.0
+
+    def _get_top_weekly_orders(self, table:str, column:str)->tuple:
+        return self._query_value('SELECT {column}, AVG(total_orders) AS avg_orders FROM {table} '
+                                 'GROUP BY {column} ORDER BY avg_orders DESC LIMIT 1'.format(column=column, table=table))
+
+    def get_most_desirable_product(self)->tuple:
+        """Returns the product with most orders per week and its average weekly orders."""
+        return self._get_top_weekly_orders('weekly_product', 'product')
+
+    def get_most_proactive_provider(self)->tuple:
+        """Returns the provider with most orders per week and its average weekly orders."""
+        return self._get_top_weekly_orders('weekly_provider', 'provider')
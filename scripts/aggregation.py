@@ -0,0 +1,290 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from scripts.utils import extract_multiple_date_features, get_wide_column
+
+SUPPORTED_OPERATIONS = ('sum', 'count', 'mean', 'ratio')
+
+def get_partial_columns(metrics:dict)->dict:
+    """
+    This function resolves the metrics into the partial sums and counts they
+    are computed from. Means are sum/count and ratios are sum/sum, so every
+    metric can be merged from partial aggregates exactly.
+
+    Args:
+        metrics:dict -> resulted column name to (operation, column) mapping, i.e.
+                        {'total_orders': ('sum', 'order_count'),
+                         'avg_revenue': ('mean', 'revenue'),
+                         'avg_order_rev': ('ratio', 'revenue', 'order_count')}
+
+    Returns:
+        partial_columns:dict -> partial column name to (column, 'sum' or 'count') mapping
+    """
+    partial_columns = {}
+
+    for name, metric in metrics.items():
+        operation, columns = metric[0], metric[1:]
+
+        if operation not in SUPPORTED_OPERATIONS:
+            raise ValueError("Unsupported operation '{}' for metric '{}'.".format(operation, name))
+        elif operation=='ratio' and len(columns)!=2:
+            raise ValueError("Ratio metric '{}' needs a numerator and a denominator column.".format(name))
+        elif operation!='ratio' and len(columns)!=1:
+            raise ValueError("Metric '{}' needs exactly one column.".format(name))
+
+        if operation in ('sum', 'mean', 'ratio'):
+            for column in columns:
+                partial_columns[f'{column}__sum'] = (column, 'sum')
+        if operation in ('count', 'mean'):
+            partial_columns[f'{columns[0]}__count'] = (columns[0], 'count')
+
+    return partial_columns
+
+def compute_partial_aggregates(data:pd.core.frame.DataFrame,
+                               group_by_columns:list,
+                               metrics:dict)->pd.core.frame.DataFrame:
+    """
+    This function computes the partial sums and counts of the metrics in one
+    groupby pass. String keys are grouped as categoricals with sort=False and
+    observed=True, value columns are summed as int64/float64.
+
+    Args:
+        data:pd.core.frame.DataFrame
+        group_by_columns:list
+        metrics:dict -> see get_partial_columns
+
+    Returns:
+        partial:pd.core.frame.DataFrame -> indexed by the group by columns
+    """
+    partial_columns = get_partial_columns(metrics)
+    value_columns = list(dict.fromkeys(column for column, _ in partial_columns.values()))
+
+    frame = {}
+    for column in group_by_columns:
+        keys = data[column]
+        if pd.api.types.is_object_dtype(keys) or pd.api.types.is_string_dtype(keys):
+            keys = keys.astype('category')
+        frame[column] = keys
+    for column in value_columns:
+        if column not in frame:
+            frame[column] = get_wide_column(data[column])
+
+    grouped = pd.DataFrame(frame).groupby(group_by_columns, sort=False, observed=True)
+    return grouped.agg(**partial_columns)
+
+def merge_partial_aggregates(partials:list)->pd.core.frame.DataFrame:
+    """
+    This function merges partial aggregates of several partitions of the same
+    dataset into one partial aggregate.
+
+    Args:
+        partials:list -> partial aggregates created by compute_partial_aggregates
+
+    Returns:
+        partial:pd.core.frame.DataFrame
+    """
+    partials = list(partials)
+    if len(partials)==1:
+        return partials[0]
+
+    levels = list(partials[0].index.names)
+    return pd.concat(partials).groupby(level=levels, sort=False, observed=True).sum()
+
+def finalize_aggregates(partial:pd.core.frame.DataFrame,
+                        metrics:dict,
+                        zero_division:float=0.0)->pd.core.frame.DataFrame:
+    """
+    This function derives the metrics from a partial aggregate. Means and ratios
+    with a zero denominator are set to zero_division instead of inf/NaN.
+
+    Args:
+        partial:pd.core.frame.DataFrame -> created by compute_partial_aggregates
+        metrics:dict
+        zero_division:float
+
+    Returns:
+        df_grouped:pd.core.frame.DataFrame -> group by columns and one column per metric
+    """
+    results = {}
+
+    for name, metric in metrics.items():
+        operation, columns = metric[0], metric[1:]
+
+        if operation=='sum':
+            results[name] = partial[f'{columns[0]}__sum'].to_numpy()
+        elif operation=='count':
+            results[name] = partial[f'{columns[0]}__count'].to_numpy()
+        else:
+            if operation=='mean':
+                numerator = partial[f'{columns[0]}__sum'].to_numpy(dtype='float64')
+                denominator = partial[f'{columns[0]}__count'].to_numpy(dtype='float64')
+            else:
+                numerator = partial[f'{columns[0]}__sum'].to_numpy(dtype='float64')
+                denominator = partial[f'{columns[1]}__sum'].to_numpy(dtype='float64')
+
+            results[name] = np.divide(numerator,
+                                      denominator,
+                                      out=np.full(len(partial), zero_division, dtype='float64'),
+                                      where=denominator!=0)
+
+    return pd.DataFrame(results, index=partial.index).reset_index()
+
+def aggregate_metrics(data:pd.core.frame.DataFrame,
+                      group_by_columns:list,
+                      metrics:dict,
+                      zero_division:float=0.0)->pd.core.frame.DataFrame:
+    """
+    Grouped by the given column list and calculated every given metric in a single
+    groupby pass. Replaces one group_by_and_sum_rows call per metric followed by
+    merging the results.
+
+    Args:
+        data:pd.core.frame.DataFrame
+        group_by_columns:list
+        metrics:dict        -> resulted column name to (operation, column) mapping,
+                               operation is one of sum, count, mean or ratio(of two column sums)
+        zero_division:float -> value of means and ratios with a zero denominator
+
+    Returns:
+        Updated dataframe-> consists of grouped columns and one column per metric.
+    """
+    try:
+        partial = compute_partial_aggregates(data, group_by_columns, metrics)
+        return finalize_aggregates(partial, metrics, zero_division)
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def write_partitions(chunks, directory:str, prefix:str='partition')->list:
+    """
+    This function writes dataframe chunks(i.e. from utils.iter_xlsx_chunks) as
+    Feather partition files and returns their paths.
+
+    Args:
+        chunks:iterable   -> dataframe chunks
+        directory:str     -> directory of the partition files
+        prefix:str        -> file name prefix of the partition files
+
+    Returns:
+        paths:list
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        paths = []
+        for index, chunk in enumerate(chunks):
+            path = os.path.join(directory, f'{prefix}-{index:05d}.feather')
+            chunk.reset_index(drop=True).to_feather(path)
+            paths.append(path)
+        return paths
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def read_partition(partition, columns:list=None)->pd.core.frame.DataFrame:
+    """
+    This function returns the partition as dataframe. Partitions are dataframes
+    or paths of parquet, feather or csv files.
+
+    Args:
+        partition:pd.core.frame.DataFrame or str
+        columns:list -> columns to read, all columns if None
+    """
+    if isinstance(partition, pd.core.frame.DataFrame):
+        return partition if columns is None else partition[columns]
+
+    extension = os.path.splitext(str(partition))[1].lower()
+
+    if extension=='.parquet':
+        return pd.read_parquet(partition, columns=columns)
+    elif extension in ('.feather', '.arrow'):
+        return pd.read_feather(partition, columns=columns)
+    elif extension=='.csv':
+        return pd.read_csv(partition, usecols=columns)
+    else:
+        raise ValueError("Unsupported partition file: {}".format(partition))
+
+def _aggregate_partition(partition,
+                         group_by_columns:list,
+                         metrics:dict,
+                         date_column:str,
+                         date_features:list)->pd.core.frame.DataFrame:
+    """
+    Reads a single partition and returns its partial aggregate. Runs in the
+    worker processes of aggregate_metrics_out_of_core.
+    """
+    value_columns = [column for column, _ in get_partial_columns(metrics).values()]
+    columns = [column for column in group_by_columns if column not in date_features] + value_columns
+    if date_features:
+        columns.append(date_column)
+    columns = list(dict.fromkeys(columns))
+
+    data = read_partition(partition, columns)
+
+    if date_features:
+        data = pd.concat([data, extract_multiple_date_features(data, date_column, date_features)], axis=1)
+
+    return compute_partial_aggregates(data, group_by_columns, metrics)
+
+def aggregate_metrics_out_of_core(partitions,
+                                  group_by_columns:list,
+                                  metrics:dict,
+                                  max_workers:int=None,
+                                  date_column:str='order_date',
+                                  date_features:list=None,
+                                  zero_division:float=0.0)->pd.core.frame.DataFrame:
+    """
+    Out-of-core version of aggregate_metrics for datasets larger than memory. The
+    partial aggregate of every partition is computed on a process pool and merged
+    into a running result, which gives the same sums, counts, means and ratios as
+    the in-memory path. At most two partitions per worker are in flight at a time.
+
+    Args:
+        partitions:iterable -> dataframes or partition file paths(see write_partitions)
+        group_by_columns:list
+        metrics:dict        -> see aggregate_metrics
+        max_workers:int     -> number of worker processes, defaults to the cpu count
+        date_column:str
+        date_features:list  -> date features(see utils.extract_multiple_date_features)
+                               extracted from date_column inside the workers
+        zero_division:float
+
+    Returns:
+        Updated dataframe-> consists of grouped columns and one column per metric.
+    """
+    try:
+        date_features = list(date_features or [])
+        max_workers = max_workers or os.cpu_count()
+
+        merged = None
+        pending = set()
+
+        def merge_done(done):
+            nonlocal merged
+            for future in done:
+                partial = future.result()
+                merged = partial if merged is None else merge_partial_aggregates([merged, partial])
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for partition in partitions:
+                if len(pending)>=2*max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    merge_done(done)
+
+                pending.add(executor.submit(_aggregate_partition,
+                                            partition,
+                                            group_by_columns,
+                                            metrics,
+                                            date_column,
+                                            date_features))
+            merge_done(wait(pending).done)
+
+        if merged is None:
+            raise ValueError("No partitions to aggregate.")
+
+        return finalize_aggregates(merged, metrics, zero_division)
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
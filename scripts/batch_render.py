@@ -0,0 +1,94 @@
+import os
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
+def _init_render_worker()->None:
+    """
+    Selects the non-interactive Agg backend before pyplot is used in the worker.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+def get_plot_output_path(function, kwargs:dict)->str:
+    """
+    Returns the path a plot function of scripts.visualization saves its figure to
+    when called with the given kwargs, or None if no save_path is given.
+
+    Args:
+        function:function -> plot function of scripts.visualization
+        kwargs:dict
+    """
+    parameters = inspect.signature(function).parameters
+    save_path = kwargs.get('save_path', parameters['save_path'].default)
+    save_file = kwargs.get('save_file', parameters['save_file'].default)
+
+    return f"{save_path}/" + save_file if save_path else None
+
+def _render_plot(plot_spec:dict)->str:
+    """
+    Renders a single plot spec in the worker and returns its output path. Figures and
+    style changes of the plot are discarded afterwards, so plots rendered by the same
+    worker do not affect each other.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from scripts import visualization
+
+    function = plot_spec['function']
+    if isinstance(function, str):
+        function = getattr(visualization, function)
+    kwargs = plot_spec.get('kwargs', {})
+
+    try:
+        with matplotlib.rc_context():
+            function(**kwargs)
+    finally:
+        plt.close('all')
+
+    return get_plot_output_path(function, kwargs)
+
+def get_plot_name(plot_spec:dict)->str:
+    """Returns the function name of the plot spec."""
+    function = plot_spec['function']
+    return function if isinstance(function, str) else function.__name__
+
+def render_plots(plot_specs:list, max_workers:int = None, return_exceptions:bool = False)->list:
+    """
+    This function renders a list of plot specs of scripts.visualization in parallel on
+    a process pool with the Agg backend and returns the output paths in the order of
+    the specs(None for specs without save_path). A failing plot does not stop the
+    other plots of the batch, the failures are reported once every plot is done.
+
+    Args:
+        plot_specs:list         -> list of {'function': name or function of scripts.visualization,
+                                            'kwargs': keyword arguments of the function}
+        max_workers:int         -> number of worker processes, defaults to one per spec up to the cpu count
+        return_exceptions:bool  -> return the exception of a failed plot in place of its path instead
+                                   of raising an error naming every failed plot
+
+    Returns:
+        paths:list
+    """
+    try:
+        if not plot_specs:
+            return []
+
+        max_workers = max_workers or min(len(plot_specs), os.cpu_count())
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker) as executor:
+            futures = [executor.submit(_render_plot, plot_spec) for plot_spec in plot_specs]
+
+        paths, failures = [], []
+        for index, (plot_spec, future) in enumerate(zip(plot_specs, futures)):
+            error = future.exception()
+            paths.append(future.result() if error is None else error)
+            if error is not None:
+                failures.append('{} {}: {!r}'.format(index, get_plot_name(plot_spec), error))
+
+        if failures and not return_exceptions:
+            raise RuntimeError("{} of {} plots failed: {}".format(len(failures), len(plot_specs), '; '.join(failures)))
+
+        return paths
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
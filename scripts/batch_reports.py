@@ -0,0 +1,307 @@
+import io
+import os
+import re
+import sys
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scripts.utils import read_xlsx, extract_multiple_date_features, resolve_converted_wide_table_index_issue
+
+ENTITY_COLUMNS = ['provider', 'product']
+BAR_COLORS = ['#00876c', '#66ad75', '#b1d081', '#fff197']
+
+# shared arrays and categories of the worker process, set by _init_report_worker
+_worker_state = {}
+
+def get_weekly_cells(data:pd.core.frame.DataFrame, date_column:str = 'order_date')->tuple:
+    """
+    This function aggregates the order rows once into one cell per week, product and
+    provider and returns the cells as flat arrays together with the categories the
+    codes of the arrays refer to.
+
+    Args:
+        data:pd.core.frame.DataFrame
+        date_column:str -> the week is extracted from it if data has no week column
+
+    Returns:
+        arrays:dict     -> week_code, product_code, provider_code, total_orders, revenue
+        categories:dict -> week, product and provider values of the codes
+    """
+    if 'week' not in data:
+        data = pd.concat([data, extract_multiple_date_features(data, date_column, ['week'])], axis=1)
+
+    codes, categories = [], {}
+    for column in ['week']+ENTITY_COLUMNS:
+        column_codes, uniques = pd.factorize(data[column], sort=True)
+        if (column_codes<0).any():
+            raise ValueError("Column '{}' must not contain missing values.".format(column))
+        codes.append(column_codes)
+        categories[column] = uniques.tolist()
+
+    keys = pd.MultiIndex.from_arrays(codes)
+    cells = pd.DataFrame({'total_orders': data['order_count'].to_numpy(dtype='float64'),
+                          'revenue': data['revenue'].to_numpy(dtype='float64')},
+                         index=keys).groupby(level=[0, 1, 2], sort=True).sum()
+
+    arrays = {column+'_code': cells.index.get_level_values(level).to_numpy(dtype='int32')
+              for level, column in enumerate(['week']+ENTITY_COLUMNS)}
+    arrays['total_orders'] = cells['total_orders'].to_numpy()
+    arrays['revenue'] = cells['revenue'].to_numpy()
+
+    return arrays, categories
+
+def create_shared_arrays(arrays:dict)->tuple:
+    """
+    Copies the arrays into shared memory blocks. The caller owns the blocks and has to
+    close and unlink them(see release_shared_arrays).
+
+    Returns:
+        spec:dict   -> name to (block name, dtype, length) mapping for attach_shared_arrays
+        blocks:list -> the shared memory blocks
+    """
+    spec, blocks = {}, []
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            spec[name] = (block.name, array.dtype.str, len(array))
+    except Exception:
+        release_shared_arrays(blocks)
+        raise
+    return spec, blocks
+
+def attach_shared_arrays(spec:dict)->tuple:
+    """
+    Returns read-only numpy views of the shared arrays created by create_shared_arrays
+    together with the attached blocks, which must stay referenced while the views are used.
+    """
+    arrays, blocks = {}, []
+    for name, (block_name, dtype, length) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        array = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays, blocks
+
+def release_shared_arrays(blocks:list)->None:
+    """Closes and unlinks the shared memory blocks."""
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+def _init_report_worker(spec:dict, categories:dict)->None:
+    """
+    Attaches the shared arrays once per worker process and selects the Agg backend.
+    """
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    arrays, blocks = attach_shared_arrays(spec)
+    _worker_state.update({'arrays': arrays, 'blocks': blocks, 'categories': categories})
+
+def get_entity_weekly_table(arrays:dict,
+                            categories:dict,
+                            entity_column:str,
+                            entity)->pd.core.frame.DataFrame:
+    """
+    Returns the weekly total orders, revenue and average revenue per order of one
+    provider(per product) or one product(per provider) from the shared cells.
+    """
+    other_column = [column for column in ENTITY_COLUMNS if column!=entity_column][0]
+    entity_code = categories[entity_column].index(entity)
+    mask = arrays[entity_column+'_code']==entity_code
+
+    df_weekly = pd.DataFrame({'week': np.asarray(categories['week'])[arrays['week_code'][mask]],
+                              other_column: np.asarray(categories[other_column], dtype=object)[arrays[other_column+'_code'][mask]],
+                              'total_orders': arrays['total_orders'][mask],
+                              'revenue': arrays['revenue'][mask]})
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_order_rev = df_weekly['revenue']/df_weekly['total_orders']
+    df_weekly['avg_order_rev'] = avg_order_rev.replace([np.inf, -np.inf], 0).fillna(0)
+    return df_weekly
+
+def get_entity_kpis(df_weekly:pd.core.frame.DataFrame, other_column:str, num_weeks:int)->dict:
+    """
+    Returns the report KPIs of an entity: average orders per week, average revenue per
+    order and the product/provider with the most orders per week.
+    """
+    total_orders = df_weekly['total_orders'].sum()
+    orders_by_other = df_weekly.groupby(other_column)['total_orders'].mean()
+
+    return {'avg_orders_per_week': total_orders/num_weeks if num_weeks else 0,
+            'avg_revenue_per_order': df_weekly['revenue'].sum()/total_orders if total_orders else 0,
+            'top': orders_by_other.idxmax() if len(orders_by_other) else None,
+            'top_orders': orders_by_other.max() if len(orders_by_other) else 0}
+
+def get_report_file_name(entity_column:str, entity)->str:
+    """Returns a file name of the entity report which is safe on every platform."""
+    return '{}_{}.pdf'.format(entity_column, re.sub(r'[^\w.-]+', '_', str(entity)))
+
+def _create_entity_report(job:tuple)->dict:
+    """
+    Computes the KPIs and plots of one entity from the shared cells and writes its
+    report. Runs in the worker processes of create_entity_reports.
+    """
+    from scripts.visualization import plot_line_graph, plot_aggregated_bargraph, plot_highlighted_sphagetti_graph
+    from scripts.generate_analytics_report import PDF
+
+    entity_column, entity, output_dir = job
+    start = time.perf_counter()
+    arrays, categories = _worker_state['arrays'], _worker_state['categories']
+
+    other_column = [column for column in ENTITY_COLUMNS if column!=entity_column][0]
+    other_name = other_column.capitalize()
+    df_weekly = get_entity_weekly_table(arrays, categories, entity_column, entity)
+    kpis = get_entity_kpis(df_weekly, other_column, len(categories['week']))
+
+    color_dict = {value: BAR_COLORS[index%len(BAR_COLORS)] for index, value in enumerate(categories[other_column])}
+
+    def get_plot_kwargs(image_name):
+        # render every plot at the size it is placed at in the report
+        return {'headless': True, 'return_bytes': True, 'width_px': PDF.get_image_width_px(image_name)}
+
+    trend = df_weekly.groupby('week')['revenue'].sum().reindex(categories['week'], fill_value=0)
+    wide_orders = resolve_converted_wide_table_index_issue(
+        df_weekly.pivot(index='week', columns=other_column, values='total_orders').fillna(0)/7)
+    wide_revenue = resolve_converted_wide_table_index_issue(
+        df_weekly.pivot(index='week', columns=other_column, values='revenue').fillna(0))
+    highlight = kpis['top'] if kpis['top'] is not None else wide_orders.columns[-1]
+
+    images = {'page_1_img_path': plot_line_graph(trend, x_label='Revenue', y_label='Week', trend_label='Weekly',
+                                                 title='Weekly Revenue trend of {}'.format(entity),
+                                                 **get_plot_kwargs('page_1_img_path')),
+              'page_2_img_path1': plot_aggregated_bargraph(df_weekly, other_column, 'revenue', x_label_name=other_name,
+                                                           y_label_name='Revenue', title='Top {} By Revenue'.format(other_name),
+                                                           color_dict=color_dict, **get_plot_kwargs('page_2_img_path1')),
+              'page_2_img_path2': plot_aggregated_bargraph(df_weekly, other_column, 'avg_order_rev', x_label_name=other_name,
+                                                           y_label_name='Average Revenue per order',
+                                                           title='Top {} By Average Revenue Per Order'.format(other_name),
+                                                           color_dict=color_dict, **get_plot_kwargs('page_2_img_path2')),
+              'page_2_img_path3': plot_highlighted_sphagetti_graph(wide_orders, highlight_column=highlight,
+                                                                   y_label='Order Volume', x_label='Week',
+                                                                   title='Sales Trend by {}'.format(other_name),
+                                                                   **get_plot_kwargs('page_2_img_path3')),
+              'page_3_img_path1': plot_aggregated_bargraph(df_weekly, other_column, 'total_orders', x_label_name=other_name,
+                                                           y_label_name='Orders', title='Top {} By Orders'.format(other_name),
+                                                           color_dict=color_dict, **get_plot_kwargs('page_3_img_path1')),
+              'page_3_img_path2': plot_highlighted_sphagetti_graph(wide_revenue, highlight_column=highlight,
+                                                                   y_label='Revenue', x_label='Week',
+                                                                   title='Weekly Revenue trend by {}'.format(other_name),
+                                                                   **get_plot_kwargs('page_3_img_path2'))}
+
+    top_text = "Top {}: '{}' ~{} orders per week".format(other_name, kpis['top'], round(kpis['top_orders']))
+    path = os.path.join(output_dir, get_report_file_name(entity_column, entity))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        PDF().create_analytics_report(page_1_txt1='Average orders per week: ~{}'.format(round(kpis['avg_orders_per_week'])),
+                                      page_1_txt2='Average Revenue per order: ~{}'.format(round(kpis['avg_revenue_per_order'])),
+                                      page_2_text=top_text,
+                                      page_3_text="{} breakdown of {} '{}'".format(other_name, entity_column, entity),
+                                      save_filename=path,
+                                      title='Weekly Report: {} {}'.format(entity_column.capitalize(), entity),
+                                      **images)
+
+    return {'entity_column': entity_column,
+            'entity': entity,
+            'path': path,
+            'seconds': time.perf_counter()-start}
+
+def print_progress(done:int, total:int, result:dict)->None:
+    """Default progress callback of create_entity_reports."""
+    print('[{:>{width}}/{}] {} {:<20} {:.2f}s'.format(done, total, result['entity_column'], str(result['entity']),
+                                                     result['seconds'], width=len(str(total))), flush=True)
+
+def create_entity_reports(data,
+                          sheet_name:str = 'data',
+                          entity_columns:list = ENTITY_COLUMNS,
+                          entities:dict = None,
+                          output_dir:str = 'reports',
+                          max_workers:int = None,
+                          progress = print_progress)->list:
+    """
+    This function creates one weekly report per provider and per product. The dataset
+    is read and aggregated into weekly cells once, the cell arrays are placed in shared
+    memory and every worker process attaches them once, so a report job only carries
+    the entity name. KPIs, plots(rendered headless into memory) and the PDF of every
+    entity are created on a process pool.
+
+    Args:
+        data:pd.core.frame.DataFrame or str -> order rows or path of the excel file
+        sheet_name:str        -> Sheet name in the excel
+        entity_columns:list   -> create reports per provider and/or product
+        entities:dict         -> column to list of values to create reports for, defaults to every value
+        output_dir:str
+        max_workers:int       -> number of worker processes, defaults to the cpu count
+        progress:function     -> called with (done, total, result) after every report, None disables it
+
+    Returns:
+        results:list -> {'entity_column', 'entity', 'path', 'seconds'} of every report in completion order
+    """
+    try:
+        if isinstance(data, str):
+            data = read_xlsx(data, sheet_name)
+
+        unknown_columns = set(entity_columns)-set(ENTITY_COLUMNS)
+        if unknown_columns:
+            raise ValueError("Reports can only be created per {}, got {}.".format(ENTITY_COLUMNS, sorted(unknown_columns)))
+
+        arrays, categories = get_weekly_cells(data)
+        os.makedirs(output_dir, exist_ok=True)
+
+        jobs = []
+        for entity_column in entity_columns:
+            values = (entities or {}).get(entity_column, categories[entity_column])
+            unknown_values = [value for value in values if value not in categories[entity_column]]
+            if unknown_values:
+                raise ValueError("Unknown {} values: {}".format(entity_column, unknown_values))
+            jobs.extend((entity_column, value, output_dir) for value in values)
+
+        max_workers = max_workers or os.cpu_count()
+        spec, blocks = create_shared_arrays(arrays)
+        results = []
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, max(len(jobs), 1)),
+                                     initializer=_init_report_worker,
+                                     initargs=(spec, categories)) as executor:
+                futures = [executor.submit(_create_entity_report, job) for job in jobs]
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if progress:
+                        progress(len(results), len(jobs), results[-1])
+        finally:
+            release_shared_arrays(blocks)
+
+        return results
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def main(argv:list = None)->int:
+    parser = argparse.ArgumentParser(description='Create one weekly report per provider and per product.')
+    parser.add_argument('path', help='excel file of the commission dataset')
+    parser.add_argument('--sheet-name', default='data')
+    parser.add_argument('--entity-columns', nargs='+', choices=ENTITY_COLUMNS, default=ENTITY_COLUMNS)
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, defaults to the cpu count')
+    parser.add_argument('--quiet', action='store_true', help='do not report the progress')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = create_entity_reports(args.path, args.sheet_name, args.entity_columns, output_dir=args.output_dir,
+                                    max_workers=args.workers, progress=None if args.quiet else print_progress)
+    print('{} reports written to {} in {:.1f}s'.format(len(results), args.output_dir, time.perf_counter()-start))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
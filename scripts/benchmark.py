@@ -0,0 +1,543 @@
+import io
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from scripts.commission import COMMISSION_RULES, calculate_commissions
+from scripts.aggregation import read_partition, compute_partial_aggregates, merge_partial_aggregates, finalize_aggregates
+from scripts.utils import (read_xlsx, extract_date_features, extract_multiple_date_features,
+                           group_by_and_sum_rows, get_commision, resolve_converted_wide_table_index_issue)
+
+PRODUCTS = ['A', 'B', 'C', 'D']
+PROVIDERS = list(COMMISSION_RULES)
+
+# an excel sheet holds 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1048575
+
+# larger datasets are benchmarked chunk by chunk instead of loaded into memory
+IN_MEMORY_MAX_ROWS = 10000000
+
+STAGES = ['read_xlsx',
+          'read_columnar',
+          'extract_date_features',
+          'group_by_and_sum_rows',
+          'get_commision',
+          'calculate_commissions',
+          'plot_line_graph',
+          'plot_bargraph',
+          'plot_highlighted_sphagetti_graph',
+          'create_analytics_report']
+
+METRICS = {'total_orders': ('sum', 'order_count'),
+           'revenue': ('sum', 'revenue'),
+           'avg_order_rev': ('ratio', 'revenue', 'order_count')}
+
+def generate_sales_chunks(num_rows:int,
+                          seed:int = 0,
+                          chunksize:int = 1000000,
+                          start_date:str = '2021-05-01',
+                          num_days:int = 61):
+    """
+    Yields a seeded random dataset shaped like the commission dataset(order_date,
+    product, provider, order_count, revenue) in chunks of at most chunksize rows.
+    The same seed and chunksize always give the same rows.
+
+    Args:
+        num_rows:int
+        seed:int
+        chunksize:int
+        start_date:str -> first order date
+        num_days:int   -> number of days the order dates are spread over
+
+    Yields:
+        chunk:pd.core.frame.DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(start_date, 'ns')
+
+    for offset in range(0, num_rows, chunksize):
+        size = min(chunksize, num_rows-offset)
+        days = rng.integers(0, num_days, size).astype('timedelta64[D]')
+
+        yield pd.DataFrame({'order_date': start+days,
+                            'product': np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), size)],
+                            'provider': np.array(PROVIDERS, dtype=object)[rng.integers(0, len(PROVIDERS), size)],
+                            'order_count': rng.integers(0, 40, size),
+                            'revenue': rng.integers(0, 4000, size)})
+
+def generate_sales_data(num_rows:int, seed:int = 0, **kwargs)->pd.core.frame.DataFrame:
+    """
+    Returns the whole dataset of generate_sales_chunks as one dataframe.
+    """
+    return pd.concat(generate_sales_chunks(num_rows, seed, **kwargs), ignore_index=True)
+
+def write_sales_dataset(path:str,
+                        num_rows:int,
+                        seed:int = 0,
+                        chunksize:int = 1000000,
+                        sheet_name:str = 'data')->str:
+    """
+    This function writes a generated dataset chunk by chunk, so the whole dataset is
+    never held in memory. The format is chosen by the extension: xlsx(up to
+    XLSX_MAX_ROWS rows), parquet, feather/arrow or csv.
+
+    Args:
+        path:str
+        num_rows:int
+        seed:int
+        chunksize:int
+        sheet_name:str -> sheet of the xlsx file
+
+    Returns:
+        path:str
+    """
+    try:
+        extension = os.path.splitext(path)[1].lower()
+        chunks = generate_sales_chunks(num_rows, seed, chunksize)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        # write to a temporary file first so that an interrupted run never leaves a partial dataset
+        temp_path = path + '.tmp'
+
+        if extension=='.xlsx':
+            if num_rows>XLSX_MAX_ROWS:
+                raise ValueError("An excel sheet holds at most {} rows, use a columnar format instead.".format(XLSX_MAX_ROWS))
+
+            from openpyxl import Workbook
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append(['order_date', 'product', 'provider', 'order_count', 'revenue'])
+            for chunk in chunks:
+                chunk['order_date'] = chunk['order_date'].dt.to_pydatetime()
+                for row in chunk.itertuples(index=False):
+                    sheet.append(list(row))
+            workbook.save(temp_path)
+
+        elif extension in ('.parquet', '.feather', '.arrow'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(temp_path, table.schema) if extension=='.parquet' else \
+                                 pa.ipc.new_file(temp_path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+        elif extension=='.csv':
+            for index, chunk in enumerate(chunks):
+                chunk.to_csv(temp_path, mode='w' if index==0 else 'a', header=index==0, index=False)
+
+        else:
+            raise ValueError("Unsupported dataset file: {}".format(path))
+
+        os.replace(temp_path, path)
+        return path
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def iter_columnar_chunks(path:str, chunksize:int = 1000000, columns:list = None):
+    """
+    Yields a parquet, feather/arrow or csv dataset as dataframe chunks of at most
+    chunksize rows.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension=='.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+    elif extension in ('.feather', '.arrow'):
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                for offset in range(0, batch.num_rows, chunksize):
+                    chunk = batch.slice(offset, chunksize).to_pandas()
+                    yield chunk if columns is None else chunk[columns]
+
+    elif extension=='.csv':
+        parse_dates = ['order_date'] if columns is None or 'order_date' in columns else None
+        yield from pd.read_csv(path, usecols=columns, parse_dates=parse_dates, chunksize=chunksize)
+
+    else:
+        raise ValueError("Unsupported dataset file: {}".format(path))
+
+def measure(function, *args, trace_memory:bool = True, **kwargs)->tuple:
+    """
+    Calls the function and returns its result together with the wall time in seconds
+    and the peak memory in MB allocated during the call. The memory is traced with
+    tracemalloc, which sees numpy and pandas buffers but not the buffers allocated
+    by pyarrow itself.
+
+    If memory is already traced(i.e. inside a profiling session), the trace is left
+    running and its peak is not reset. A call that does not raise the peak of that
+    trace records the growth of the traced memory instead, a lower bound of its peak.
+
+    Returns:
+        (result, {'seconds': float, 'peak_memory_mb': float})
+    """
+    gc.collect()
+    started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    start_memory, start_peak = tracemalloc.get_traced_memory() if trace_memory else (0, 0)
+
+    try:
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter()-start
+
+        peak_memory = 0
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak_memory = (peak if peak>start_peak else max(current, start_memory))-start_memory
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+    return result, {'seconds': round(seconds, 6),
+                    'peak_memory_mb': round(peak_memory/(1024*1024), 3) if trace_memory else None}
+
+def get_dataset_paths(num_rows:int, work_dir:str, seed:int = 0, chunksize:int = 1000000)->dict:
+    """
+    Returns the xlsx(None above XLSX_MAX_ROWS) and parquet dataset of the given size in
+    work_dir and generates them if they do not exist yet.
+    """
+    paths = {'xlsx': os.path.join(work_dir, 'sales_{}_{}.xlsx'.format(num_rows, seed)),
+             'parquet': os.path.join(work_dir, 'sales_{}_{}.parquet'.format(num_rows, seed))}
+    if num_rows>XLSX_MAX_ROWS:
+        paths['xlsx'] = None
+
+    for path in paths.values():
+        if path and not os.path.exists(path):
+            write_sales_dataset(path, num_rows, seed, chunksize)
+
+    return paths
+
+def _get_report_aggregates(chunks)->dict:
+    """
+    Computes the weekly and monthly aggregates the plots and commissions are created
+    from in one pass over the chunks.
+    """
+    groupings = {'weekly_product': ['week', 'product'],
+                 'weekly_provider': ['week', 'provider'],
+                 'monthly': ['product', 'provider', 'year', 'month']}
+    partials = dict.fromkeys(groupings)
+
+    for chunk in chunks:
+        missing_features = [feature for feature in ['week', 'month', 'year'] if feature not in chunk]
+        if missing_features:
+            chunk = pd.concat([chunk, extract_multiple_date_features(chunk, 'order_date', missing_features)], axis=1)
+
+        for name, group_by_columns in groupings.items():
+            partial = compute_partial_aggregates(chunk, group_by_columns, METRICS)
+            partials[name] = partial if partials[name] is None else merge_partial_aggregates([partials[name], partial])
+
+    aggregates = {name: finalize_aggregates(partial, METRICS) for name, partial in partials.items()}
+    for df in aggregates.values():
+        for column in ['product', 'provider']:
+            if column in df:
+                df[column] = df[column].astype(str)
+    return aggregates
+
+def run_benchmark(num_rows:int,
+                  work_dir:str = '.benchmark',
+                  seed:int = 0,
+                  stages:list = None,
+                  chunksize:int = 1000000,
+                  trace_memory:bool = True)->dict:
+    """
+    This function times every stage of the analysis pipeline on a generated dataset of
+    num_rows rows and records its peak memory. Stages which are not selected still run
+    untimed when later stages need their output. Datasets above IN_MEMORY_MAX_ROWS are
+    processed chunk by chunk, so there the group_by_and_sum_rows stage includes reading
+    the chunks and extracting the week. read_xlsx is skipped above XLSX_MAX_ROWS.
+
+    Args:
+        num_rows:int
+        work_dir:str       -> directory of the generated datasets, plots and report
+        seed:int
+        stages:list        -> stages to time(see STAGES), defaults to every stage
+        chunksize:int
+        trace_memory:bool  -> whether to record the peak memory, tracing slows down the stages
+
+    Returns:
+        results:dict -> stage to {'seconds': float, 'peak_memory_mb': float} mapping
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        from scripts import visualization
+        from scripts.generate_analytics_report import PDF
+
+        stages = STAGES if stages is None else stages
+        unknown_stages = set(stages)-set(STAGES)
+        if unknown_stages:
+            raise ValueError("Unknown stages: {}".format(sorted(unknown_stages)))
+
+        paths = get_dataset_paths(num_rows, work_dir, seed, chunksize)
+        plot_dir = os.path.join(work_dir, 'plots')
+        os.makedirs(plot_dir, exist_ok=True)
+        chunked = num_rows>IN_MEMORY_MAX_ROWS
+        results = {}
+
+        def run(stage, function, *args, **kwargs):
+            if stage not in stages:
+                return function(*args, **kwargs)
+            result, results[stage] = measure(function, *args, trace_memory=trace_memory, **kwargs)
+            return result
+
+        data = None
+        if not chunked:
+            if paths['xlsx'] and 'read_xlsx' in stages:
+                data = run('read_xlsx', read_xlsx, paths['xlsx'], 'data')
+            columnar_data = run('read_columnar', read_partition, paths['parquet'])
+            data = columnar_data if data is None else data
+            del columnar_data
+
+            def add_date_features(df):
+                for feature in ['week', 'month', 'year']:
+                    df[feature] = extract_date_features(df, 'order_date', feature)
+            run('extract_date_features', add_date_features, data)
+
+            run('group_by_and_sum_rows', group_by_and_sum_rows, data, ['week', 'product'], 'order_count', 'total_orders')
+            aggregates = _get_report_aggregates([data])
+            del data
+        else:
+            def read_chunks():
+                return sum(len(chunk) for chunk in iter_columnar_chunks(paths['parquet'], chunksize))
+            run('read_columnar', read_chunks)
+
+            def add_date_features():
+                for chunk in extract_date_features(iter_columnar_chunks(paths['parquet'], chunksize), 'order_date', 'week'):
+                    pass
+            run('extract_date_features', add_date_features)
+
+            run('group_by_and_sum_rows',
+                lambda: group_by_and_sum_rows(extract_date_features(iter_columnar_chunks(paths['parquet'], chunksize), 'order_date', 'week'),
+                                              ['week', 'product'], 'order_count', 'total_orders'))
+            aggregates = _get_report_aggregates(iter_columnar_chunks(paths['parquet'], chunksize))
+
+        monthly = aggregates['monthly'].rename(columns={'total_orders': 'order_count'})
+        run('get_commision', monthly.apply, lambda row: get_commision(row['provider'], row['order_count']), axis=1)
+        run('calculate_commissions', calculate_commissions, monthly['provider'], monthly['order_count'])
+
+        weekly_product, weekly_provider = aggregates['weekly_product'], aggregates['weekly_provider']
+        trend = weekly_product.groupby('week')['revenue'].sum()
+        product_trend = resolve_converted_wide_table_index_issue(weekly_product.pivot(index='week', columns='product', values='total_orders'))
+        provider_trend = resolve_converted_wide_table_index_issue(weekly_provider.pivot(index='week', columns='provider', values='revenue'))
+        plot_kwargs = {'save_path': plot_dir, 'headless': True}
+
+        run('plot_line_graph', visualization.plot_line_graph, trend, save_file='trend.png', **plot_kwargs)
+
+        def plot_bargraphs():
+            visualization.plot_bargraph(weekly_product, 'product', 'revenue', save_file='top_products_revenue.png', **plot_kwargs)
+            visualization.plot_bargraph(weekly_product, 'product', 'total_orders', save_file='top_products.png', **plot_kwargs)
+            visualization.plot_bargraph(weekly_provider, 'provider', 'total_orders', save_file='top_providers.png', **plot_kwargs)
+        run('plot_bargraph', plot_bargraphs)
+
+        def plot_sphagetti_graphs():
+            visualization.plot_highlighted_sphagetti_graph(product_trend, highlight_column=PRODUCTS[-1],
+                                                           save_file='product_sales_trend.png', **plot_kwargs)
+            visualization.plot_highlighted_sphagetti_graph(provider_trend, highlight_column=PROVIDERS[1],
+                                                           save_file='provider_revenue_trend.png', **plot_kwargs)
+        run('plot_highlighted_sphagetti_graph', plot_sphagetti_graphs)
+
+        def create_report():
+            image_paths = {name: os.path.join(plot_dir, file_name) for name, file_name in
+                           [('page_1_img_path', 'trend.png'),
+                            ('page_2_img_path1', 'top_products_revenue.png'),
+                            ('page_2_img_path2', 'top_products.png'),
+                            ('page_2_img_path3', 'product_sales_trend.png'),
+                            ('page_3_img_path1', 'top_providers.png'),
+                            ('page_3_img_path2', 'provider_revenue_trend.png')]}
+            with contextlib.redirect_stdout(io.StringIO()):
+                PDF().create_analytics_report(save_filename=os.path.join(work_dir, 'report.pdf'), **image_paths)
+        run('create_analytics_report', create_report)
+
+        return results
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def get_environment()->dict:
+    """Returns the python, platform and library versions the benchmark ran with."""
+    import matplotlib
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'matplotlib': matplotlib.__version__}
+
+def run_benchmarks(sizes:list,
+                   work_dir:str = '.benchmark',
+                   seed:int = 0,
+                   stages:list = None,
+                   chunksize:int = 1000000,
+                   trace_memory:bool = True,
+                   verbose:bool = True)->dict:
+    """
+    Runs run_benchmark for every dataset size and returns the results in the JSON
+    baseline format of save_benchmark.
+
+    Args:
+        sizes:list -> number of rows of every dataset, i.e. [1000, 100000, 10000000]
+        kwargs     -> see run_benchmark
+    """
+    benchmark = {'created': datetime.now().isoformat(timespec='seconds'),
+                 'seed': seed,
+                 'environment': get_environment(),
+                 'results': {}}
+
+    for num_rows in sizes:
+        results = run_benchmark(num_rows, work_dir, seed, stages, chunksize, trace_memory)
+        benchmark['results'][str(num_rows)] = results
+
+        if verbose:
+            for stage, result in results.items():
+                print('{:>11,} rows  {:<34} {:>10.3f}s {:>10} MB'.format(num_rows, stage, result['seconds'],
+                                                                       result['peak_memory_mb']))
+
+    return benchmark
+
+def save_benchmark(benchmark:dict, path:str)->None:
+    """Writes the benchmark results to a JSON file."""
+    with open(path, 'w') as file:
+        json.dump(benchmark, file, indent=2)
+
+def load_benchmark(path:str)->dict:
+    """Reads the benchmark results written by save_benchmark."""
+    with open(path) as file:
+        return json.load(file)
+
+def compare_benchmarks(baseline:dict,
+                       current:dict,
+                       time_tolerance:float = 0.2,
+                       memory_tolerance:float = 0.2,
+                       min_seconds:float = 0.05)->pd.core.frame.DataFrame:
+    """
+    This function compares every stage and size present in both benchmark results.
+    A stage regresses if it got slower or used more peak memory than the baseline by
+    more than the tolerance. Stages faster than min_seconds in both runs are too noisy
+    to judge their time.
+
+    Args:
+        baseline:dict
+        current:dict
+        time_tolerance:float   -> allowed relative increase of the wall time
+        memory_tolerance:float -> allowed relative increase of the peak memory
+        min_seconds:float
+
+    Returns:
+        comparison:pd.core.frame.DataFrame -> one row per size and stage
+    """
+    rows = []
+
+    for size, stages in current['results'].items():
+        baseline_stages = baseline['results'].get(size, {})
+
+        for stage, result in stages.items():
+            if stage not in baseline_stages:
+                continue
+            before = baseline_stages[stage]
+
+            time_ratio = result['seconds']/before['seconds'] if before['seconds'] else np.nan
+            slower = max(result['seconds'], before['seconds'])>=min_seconds and time_ratio>1+time_tolerance
+
+            memory_ratio = np.nan
+            if before.get('peak_memory_mb') and result.get('peak_memory_mb') is not None:
+                memory_ratio = result['peak_memory_mb']/before['peak_memory_mb']
+
+            rows.append({'num_rows': int(size),
+                         'stage': stage,
+                         'baseline_seconds': before['seconds'],
+                         'seconds': result['seconds'],
+                         'time_ratio': round(time_ratio, 3),
+                         'baseline_peak_memory_mb': before.get('peak_memory_mb'),
+                         'peak_memory_mb': result.get('peak_memory_mb'),
+                         'memory_ratio': round(memory_ratio, 3),
+                         'regression': bool(slower or memory_ratio>1+memory_tolerance)})
+
+    return pd.DataFrame(rows, columns=['num_rows', 'stage', 'baseline_seconds', 'seconds', 'time_ratio',
+                                       'baseline_peak_memory_mb', 'peak_memory_mb', 'memory_ratio', 'regression'])
+
+def _parse_size(value:str)->int:
+    """Parses sizes like 1000, 1e6 or 1_000_000."""
+    size = float(value.replace('_', ''))
+    if size<1 or not size.is_integer():
+        raise argparse.ArgumentTypeError("invalid dataset size: {}".format(value))
+    return int(size)
+
+def main(argv:list = None)->int:
+    parser = argparse.ArgumentParser(description='Generate synthetic sales datasets and benchmark the analysis pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='write a generated dataset')
+    generate_parser.add_argument('path', help='output file(.xlsx, .parquet, .feather or .csv)')
+    generate_parser.add_argument('--rows', type=_parse_size, required=True)
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.add_argument('--chunksize', type=_parse_size, default=1000000)
+
+    run_parser = subparsers.add_parser('run', help='benchmark the pipeline stages')
+    run_parser.add_argument('--sizes', type=_parse_size, nargs='+', default=[1000, 10000, 100000])
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=None)
+    run_parser.add_argument('--work-dir', default='.benchmark')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--chunksize', type=_parse_size, default=1000000)
+    run_parser.add_argument('--no-memory', action='store_true', help='do not trace the peak memory')
+    run_parser.add_argument('--output', help='JSON file to write the results to')
+    run_parser.add_argument('--baseline', help='JSON baseline to compare the results against')
+    run_parser.add_argument('--time-tolerance', type=float, default=0.2)
+    run_parser.add_argument('--memory-tolerance', type=float, default=0.2)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two JSON results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--time-tolerance', type=float, default=0.2)
+    compare_parser.add_argument('--memory-tolerance', type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    if args.command=='generate':
+        write_sales_dataset(args.path, args.rows, args.seed, args.chunksize)
+        return 0
+
+    if args.command=='run':
+        current = run_benchmarks(args.sizes, args.work_dir, args.seed, args.stages, args.chunksize, not args.no_memory)
+        if args.output:
+            save_benchmark(current, args.output)
+        if not args.baseline:
+            return 0
+        baseline = load_benchmark(args.baseline)
+    else:
+        baseline, current = load_benchmark(args.baseline), load_benchmark(args.current)
+
+    comparison = compare_benchmarks(baseline, current, args.time_tolerance, args.memory_tolerance)
+    with pd.option_context('display.width', 200, 'display.max_rows', None):
+        print(comparison.to_string(index=False))
+
+    # non-zero exit status on regressions, i.e. to fail a CI job
+    return 1 if comparison['regression'].any() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from scripts.profiling import instrument
+
+# Every provider contract is expressed with the same four parameters:
+# commision = flat_fee + per_order_rate*orders + tier_rate*max(orders-tier_threshold, 0)
+RULE_COLUMNS = ['flat_fee', 'per_order_rate', 'tier_threshold', 'tier_rate']
+
+COMMISSION_RULES = {'tom_jerry': {'flat_fee': 8000},
+                    'roadrunner': {'per_order_rate': 50},
+                    'donald_duck': {'per_order_rate': 50},
+                    'micky_mouse': {'flat_fee': 10000, 'tier_threshold': 500, 'tier_rate': 10}}
+
+def create_commission_rule_table(rules:dict = COMMISSION_RULES)->pd.core.frame.DataFrame:
+    """
+    This function converts the declarative commission rules into a rule table
+    indexed by provider. Parameters missing for a provider are set to 0.
+
+    Args:
+        rules:dict -> provider to {parameter: value} mapping. Valid parameters are
+                      flat_fee, per_order_rate, tier_threshold and tier_rate.
+
+    Returns:
+        rule_table:pd.core.frame.DataFrame
+    """
+    try:
+        for provider, rule in rules.items():
+            unknown_parameters = set(rule) - set(RULE_COLUMNS)
+            if unknown_parameters:
+                raise ValueError("Unknown commission parameters for '{}': {}".format(provider, sorted(unknown_parameters)))
+
+        rule_table = pd.DataFrame.from_dict(rules, orient='index', columns=RULE_COLUMNS)
+        rule_table = rule_table.fillna(0).astype('float64')
+        rule_table.index.name = 'provider'
+        return rule_table
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def get_provider_codes(rule_table:pd.core.frame.DataFrame, providers)->np.ndarray:
+    """
+    This function returns the row position of every provider in the rule table.
+    Categorical providers are resolved once per category instead of once per row.
+    Raises a ValueError naming the providers without a rule.
+
+    Args:
+        rule_table:pd.core.frame.DataFrame
+        providers:array-like
+
+    Returns:
+        codes:np.ndarray
+    """
+    providers = pd.Series(providers) if not isinstance(providers, pd.Series) else providers
+
+    if isinstance(providers.dtype, pd.CategoricalDtype):
+        category_codes = rule_table.index.get_indexer(providers.cat.categories)
+        row_codes = providers.cat.codes.to_numpy()
+        codes = np.where(row_codes<0, -1, category_codes[row_codes])
+    else:
+        codes = rule_table.index.get_indexer(providers)
+
+    if (codes<0).any():
+        unknown_providers = pd.unique(providers.to_numpy()[codes<0])
+        raise ValueError("No commission rule for providers: {}".format(sorted(map(str, unknown_providers))))
+
+    return codes
+
+@instrument
+def calculate_commissions(providers,
+                          order_counts,
+                          rule_table:pd.core.frame.DataFrame = None)->np.ndarray:
+    """
+    This function calculates the monthly commision for every provider/order count
+    pair at once. Gives the same results as utils.get_commision.
+
+    Args:
+        providers:array-like         -> provider of each row
+        order_counts:array-like      -> monthly order count of each row
+        rule_table:pd.core.frame.DataFrame -> created by create_commission_rule_table,
+                                              defaults to COMMISSION_RULES
+
+    Returns:
+        commissions:np.ndarray
+    """
+    try:
+        if rule_table is None:
+            rule_table = create_commission_rule_table()
+
+        codes = get_provider_codes(rule_table, providers)
+        order_counts = np.asarray(order_counts, dtype='float64')
+
+        flat_fee, per_order_rate, tier_threshold, tier_rate = rule_table[RULE_COLUMNS].to_numpy().T
+
+        return flat_fee[codes] \
+               + per_order_rate[codes]*order_counts \
+               + tier_rate[codes]*np.maximum(order_counts-tier_threshold[codes], 0)
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+@instrument
+def simulate_gross_margins(monthly_data:pd.core.frame.DataFrame,
+                           schemes,
+                           key_columns:tuple = ('product', 'provider', 'year', 'month'),
+                           provider_column:str = 'provider',
+                           order_count_column:str = 'order_count',
+                           revenue_column:str = 'revenue')->pd.core.frame.DataFrame:
+    """
+    This function evaluates N candidate commission schemes against the monthly
+    aggregates in one broadcasted computation and returns the gross margin(%)
+    of every scheme for every row of monthly_data.
+
+    Args:
+        monthly_data:pd.core.frame.DataFrame -> monthly revenue and order count per key
+        schemes:list or dict     -> commission rules(see COMMISSION_RULES) of each scheme.
+                                    Keys of a dict are used as scenario names.
+        key_columns:tuple        -> columns identifying a row of monthly_data
+        provider_column:str
+        order_count_column:str
+        revenue_column:str
+
+    Returns:
+        gross_margins:pd.core.frame.DataFrame -> N x (product, provider, year, month) matrix
+    """
+    try:
+        if isinstance(schemes, dict):
+            scenario_names, schemes = list(schemes.keys()), list(schemes.values())
+        else:
+            scenario_names = list(range(len(schemes)))
+
+        if not schemes:
+            raise ValueError("At least one commission scheme is required.")
+
+        providers = pd.Index(pd.unique(monthly_data[provider_column].to_numpy()))
+
+        # (N, providers, parameters) stack of the rule tables of all schemes
+        parameters = np.stack([create_commission_rule_table(rules).reindex(providers)[RULE_COLUMNS].to_numpy()
+                               for rules in schemes])
+
+        missing = np.isnan(parameters).any(axis=2)
+        if missing.any():
+            scenario_index, provider_index = np.nonzero(missing)
+            raise ValueError("No commission rule for providers: {}".format(
+                                sorted({(scenario_names[i], str(providers[j])) for i, j in zip(scenario_index, provider_index)})))
+
+        codes = providers.get_indexer(monthly_data[provider_column])
+        order_counts = monthly_data[order_count_column].to_numpy(dtype='float64')
+        revenue = monthly_data[revenue_column].to_numpy(dtype='float64')
+
+        # (N, rows) parameters of each row under every scheme
+        flat_fee, per_order_rate, tier_threshold, tier_rate = np.moveaxis(parameters[:, codes, :], 2, 0)
+
+        commissions = flat_fee \
+                      + per_order_rate*order_counts \
+                      + tier_rate*np.maximum(order_counts-tier_threshold, 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gross_margins = (revenue-commissions)*100/revenue
+
+        return pd.DataFrame(gross_margins,
+                            index=pd.Index(scenario_names, name='scenario'),
+                            columns=pd.MultiIndex.from_frame(monthly_data[list(key_columns)]))
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
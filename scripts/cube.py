@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from scripts.utils import extract_multiple_date_features
+
+DIMENSIONS = ['product', 'provider', 'year', 'month', 'week', 'dayofweek']
+MEASURES = ['order_count', 'revenue']
+
+class SalesCube:
+    """
+    Materialized cube of the order rows over (product, provider, year, month, week, dayofweek).
+    Every cell stores the sum of the measures and its number of rows. An inverted
+    index per dimension maps each value to its cells and the order rows are stored
+    sorted by cell, so queries only touch the matching cells and row lookups are
+    slices instead of boolean mask scans over the whole dataset.
+
+    Args:
+        data:pd.core.frame.DataFrame -> order rows
+        date_column:str              -> date features missing in data are extracted from it
+        dimensions:list
+        measures:list
+    """
+
+    def __init__(self,
+                 data:pd.core.frame.DataFrame,
+                 date_column:str = 'order_date',
+                 dimensions:list = DIMENSIONS,
+                 measures:list = MEASURES):
+
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+
+        missing_features = [column for column in self.dimensions if column not in data]
+        if missing_features:
+            data = pd.concat([data, extract_multiple_date_features(data, date_column, missing_features)], axis=1)
+
+        codes, uniques = zip(*[pd.factorize(data[column], sort=True) for column in self.dimensions])
+        if any((code<0).any() for code in codes):
+            raise ValueError("Dimension columns must not contain missing values.")
+
+        cell_keys = np.ravel_multi_index(codes, [len(values) for values in uniques])
+        cell_keys, cell_ids = np.unique(cell_keys, return_inverse=True)
+        num_cells = len(cell_keys)
+
+        # order rows sorted by cell, the rows of cell i are rows.iloc[offsets[i]:offsets[i+1]]
+        # the index of data is kept so rows can be mapped back to the source frame
+        order = np.argsort(cell_ids, kind='stable')
+        self.rows = data.iloc[order]
+        row_counts = np.bincount(cell_ids, minlength=num_cells)
+        self.offsets = np.concatenate([[0], np.cumsum(row_counts)])
+
+        cell_codes = np.unravel_index(cell_keys, [len(values) for values in uniques])
+        cells = {column: values.take(code) for column, values, code in zip(self.dimensions, uniques, cell_codes)}
+        for measure in self.measures:
+            sums = np.bincount(cell_ids, weights=data[measure].to_numpy(dtype='float64'), minlength=num_cells)
+            # sums of narrow integer columns(see schema.coerce_schema) overflow their source dtype
+            cells[measure] = sums.round().astype('int64') if pd.api.types.is_integer_dtype(data[measure]) else sums
+        cells['num_rows'] = row_counts
+        self.cells = pd.DataFrame(cells)
+
+        self.indexes = {}
+        for column, values, code in zip(self.dimensions, uniques, cell_codes):
+            cell_order = np.argsort(code, kind='stable')
+            bounds = np.searchsorted(code[cell_order], np.arange(len(values)+1))
+            self.indexes[column] = {value: cell_order[bounds[i]:bounds[i+1]] for i, value in enumerate(values.tolist())}
+
+    def _get_cell_ids(self, filters:dict)->np.ndarray:
+        """
+        Returns the sorted ids of the cells matching every filter. A filter value
+        is a single dimension value or a list of values.
+        """
+        cell_ids = None
+
+        for column, values in filters.items():
+            if column not in self.indexes:
+                raise ValueError("Unknown dimension '{}'.".format(column))
+
+            if not isinstance(values, (list, tuple, set, np.ndarray, pd.Index)):
+                values = [values]
+
+            index = self.indexes[column]
+            matches = [index[value] for value in values if value in index]
+            matches = np.sort(np.concatenate(matches)) if matches else np.array([], dtype='int64')
+
+            cell_ids = matches if cell_ids is None else np.intersect1d(cell_ids, matches, assume_unique=True)
+
+        return np.arange(len(self.cells)) if cell_ids is None else cell_ids
+
+    def dice(self, **filters)->pd.core.frame.DataFrame:
+        """
+        Returns the cells matching the filters, i.e. dice(product=['B', 'D'], week=24).
+        """
+        return self.cells.iloc[self._get_cell_ids(filters)].reset_index(drop=True)
+
+    def slice(self, dimension:str, value)->pd.core.frame.DataFrame:
+        """
+        Returns the cells of a single dimension value, i.e. slice('product', 'B').
+        """
+        return self.dice(**{dimension: value})
+
+    def roll_up(self, dimensions:list = None, **filters)->pd.core.frame.DataFrame:
+        """
+        Returns the measures of the matching cells aggregated to the given dimensions,
+        i.e. roll_up(['week'], product='D'). Aggregates to the grand total if no
+        dimensions are given.
+        """
+        cells = self.cells.iloc[self._get_cell_ids(filters)]
+        values = self.measures + ['num_rows']
+
+        if not dimensions:
+            return cells[values].sum().to_frame().T
+
+        return cells.groupby(list(dimensions), sort=True)[values].sum().reset_index()
+
+    def get_rows(self, **filters)->pd.core.frame.DataFrame:
+        """
+        Returns the order rows matching the filters, i.e. get_rows(product='B', week=24).
+        The rows keep their index in the source frame and are ordered by cell.
+        """
+        cell_ids = self._get_cell_ids(filters)
+        starts, ends = self.offsets[cell_ids], self.offsets[cell_ids+1]
+        lengths = ends-starts
+
+        # concatenated ranges [start, end) of all matching cells
+        positions = np.repeat(starts-np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        return self.rows.iloc[positions]
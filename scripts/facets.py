@@ -0,0 +1,214 @@
+import os
+import math
+import pandas as pd
+import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.batch_render import _init_render_worker
+from scripts.visualization import get_bar_statistics
+
+def get_facet_grid_shape(num_panels:int, ncols:int = None)->tuple:
+    """
+    This function returns the (nrows, ncols) of a grid holding num_panels panels.
+    The grid is as square as possible unless ncols is given.
+
+    Args:
+        num_panels:int
+        ncols:int
+    """
+    if num_panels<1:
+        raise ValueError("At least one panel is required.")
+
+    ncols = min(ncols or math.ceil(math.sqrt(num_panels)), num_panels)
+    return math.ceil(num_panels/ncols), ncols
+
+def get_facet_values(data:pd.core.frame.DataFrame, facet_column:str)->list:
+    """
+    Returns the values of the facet column in panel order, sorted if they are sortable.
+    """
+    values = pd.unique(data[facet_column].dropna())
+    try:
+        return sorted(values)
+    except TypeError:
+        return list(values)
+
+def _render_facet_page(page_spec:dict)->bytes:
+    """
+    Renders one page of the facet grid from its slice of the precomputed statistics
+    and returns the png as bytes if requested.
+    """
+    from scripts.visualization import create_figure, finalize_figure, draw_aggregated_bars
+
+    df_statistics = page_spec['statistics']
+    facet_column = page_spec['facet_column']
+    nrows, ncols = page_spec['shape']
+    panel_size = page_spec['panel_size']
+
+    fig = create_figure(headless=True, figsize=(ncols*panel_size, nrows*panel_size))
+    axes = fig.subplots(nrows, ncols, squeeze=False).ravel()
+
+    groups = dict(list(df_statistics.groupby(facet_column, sort=False, observed=True)))
+    for ax, facet_value in zip(axes, page_spec['facet_values']):
+        draw_aggregated_bars(ax,
+                             groups[facet_value],
+                             page_spec['x_axis_column'],
+                             page_spec['hue_column_name'],
+                             page_spec['conf_interval'],
+                             page_spec['color_dict'],
+                             page_spec['value_labels'])
+        ax.set_title('{} = {}'.format(facet_column, facet_value), fontsize=8)
+        ax.set_xlabel(page_spec['x_label_name'], fontsize=7)
+        ax.set_ylabel(page_spec['y_label_name'], fontsize=7)
+        ax.tick_params(labelsize=6)
+        ax.tick_params(axis='x', labelrotation=45)
+        if page_spec['y_limits']:
+            ax.set_ylim(*page_spec['y_limits'])
+
+        # hue legend only once per page
+        legend = ax.get_legend()
+        if legend and ax is not axes[0]:
+            legend.remove()
+        elif legend:
+            for text in legend.get_texts():
+                text.set_fontsize(5)
+            legend.get_title().set_fontsize(6)
+
+    # hide the unused panels of the last page
+    for ax in axes[len(page_spec['facet_values']):]:
+        ax.set_visible(False)
+
+    fig.suptitle(page_spec['title'])
+    fig.tight_layout()
+
+    return finalize_figure(fig,
+                           page_spec['save_path'],
+                           page_spec['save_file'],
+                           headless=True,
+                           return_bytes=page_spec['return_bytes'])
+
+def plot_facet_grid(data:pd.core.frame.DataFrame,
+                    facet_column:str = 'product',
+                    x_axis_column:str = 'provider',
+                    y_axis_column:str = 'revenue',
+                    hue_column_name:str = None,
+                    facet_values:list = None,
+                    ncols:int = None,
+                    panels_per_figure:int = 16,
+                    panel_size:float = 2.5,
+                    sharey:bool = True,
+                    conf_interval:bool = False,
+                    confidence:float = 0.95,
+                    top_n:int = None,
+                    value_labels:bool = True,
+                    color_dict:dict = None,
+                    x_label_name:str = None,
+                    y_label_name:str = None,
+                    title:str = 'Title',
+                    save_file:str = 'facet_grid.png',
+                    save_path:str = None,
+                    return_bytes:bool = False,
+                    max_workers:int = None)->list:
+    """
+    This function plots one bargraph panel of y_axis_column per x_axis_column(and hue)
+    for every value of facet_column, i.e. the revenue per provider of every product.
+    The statistics of all panels are computed in one grouped pass and the panels are
+    split into pages of at most panels_per_figure panels. Pages are rendered in
+    parallel on a process pool and every page only receives its slice of the statistics.
+    Pages are saved as <save_file stem>_<page><extension>.
+
+    Args:
+        data:pd.core.frame.DataFrame
+        facet_column:str        -> Dataframe Column name to create a panel per value for, i.e. product, provider, month
+        x_axis_column:str       -> Dataframe Column name to put on x-axis
+        y_axis_column:str       -> Dataframe Column name to put on y-axis
+        hue_column_name:str     -> Dataframe Column name to put on hue
+        facet_values:list       -> facet values(and their order) to plot, defaults to every value
+        ncols:int               -> number of panel columns of a page
+        panels_per_figure:int
+        panel_size:float        -> width and height of a panel in inches
+        sharey:bool             -> use the same y-axis range in every panel of every page
+        conf_interval:bool      -> draw confidence intervals as error bars
+        confidence:float        -> confidence level of the intervals
+        top_n:int               -> only plot the top_n x-axis values of every panel
+        value_labels:bool       -> write the value above every bar
+        color_dict:dict         -> color of every x-axis value, or of every hue value if hue is given
+        x_label_name:str
+        y_label_name:str
+        title:str
+        save_file:str
+        save_path:str
+        return_bytes:bool       -> return the rendered pngs as bytes
+        max_workers:int         -> number of worker processes, 1 renders the pages in this process
+
+    Returns:
+        pages:list -> png bytes of every page if return_bytes is set, else the output paths
+    """
+    try:
+        if facet_values is None:
+            facet_values = get_facet_values(data, facet_column)
+        else:
+            data = data[data[facet_column].isin(facet_values)]
+
+        df_statistics = get_bar_statistics(data,
+                                           x_axis_column,
+                                           y_axis_column,
+                                           hue_column_name,
+                                           confidence,
+                                           top_n,
+                                           facet_column=facet_column)
+        present_values = set(df_statistics[facet_column])
+        facet_values = [value for value in facet_values if value in present_values]
+        if not facet_values:
+            raise ValueError("No data to plot for the given facet values.")
+
+        # same color of an x-axis(or hue) value in every panel
+        color_column = x_axis_column if hue_column_name is None else hue_column_name
+        color_values = get_facet_values(df_statistics, color_column)
+        palette = dict(zip(color_values, sns.color_palette(n_colors=len(color_values))))
+        palette.update(color_dict or {})
+
+        y_limits = None
+        if sharey:
+            errors = df_statistics['ci'] if conf_interval else 0
+            y_min = min((df_statistics['mean']-errors).min(), 0)
+            y_max = max((df_statistics['mean']+errors).max(), 0)
+            padding = (y_max-y_min)*0.1 or 1
+            y_limits = (y_min-padding if y_min<0 else 0, y_max+padding if y_max>0 else 0)
+
+        pages = [facet_values[start:start+panels_per_figure]
+                 for start in range(0, len(facet_values), panels_per_figure)]
+        stem, extension = os.path.splitext(save_file)
+
+        page_specs = []
+        for page_number, page_values in enumerate(pages, start=1):
+            page_specs.append({'statistics': df_statistics[df_statistics[facet_column].isin(page_values)],
+                               'facet_column': facet_column,
+                               'facet_values': page_values,
+                               'shape': get_facet_grid_shape(len(page_values), ncols),
+                               'panel_size': panel_size,
+                               'x_axis_column': x_axis_column,
+                               'hue_column_name': hue_column_name,
+                               'conf_interval': conf_interval,
+                               'color_dict': palette,
+                               'value_labels': value_labels,
+                               'x_label_name': x_label_name or x_axis_column,
+                               'y_label_name': y_label_name or y_axis_column,
+                               'y_limits': y_limits,
+                               'title': title if len(pages)==1 else '{} ({}/{})'.format(title, page_number, len(pages)),
+                               'save_path': save_path,
+                               'save_file': save_file if len(pages)==1 else '{}_{}{}'.format(stem, page_number, extension),
+                               'return_bytes': return_bytes})
+
+        max_workers = max_workers or min(len(page_specs), os.cpu_count())
+        if max_workers==1 or len(page_specs)==1:
+            images = [_render_facet_page(page_spec) for page_spec in page_specs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker) as executor:
+                images = list(executor.map(_render_facet_page, page_specs))
+
+        if return_bytes:
+            return images
+        return [f"{save_path}/"+ page_spec['save_file'] if save_path else None for page_spec in page_specs]
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
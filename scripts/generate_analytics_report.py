@@ -1,17 +1,125 @@
+import io
+import zlib
+import hashlib
 from fpdf import FPDF
 from datetime import datetime
 
+from scripts.pdf_charts import Chart
+from scripts.profiling import instrument
+
 class PDF(FPDF):
     
     TEST_DATE = datetime.today().strftime('%Y-%m-%d')
     WIDTH = 210
     HEIGHT = 297
-
+    MM_PER_INCH = 25.4
+    DEFAULT_IMAGE_PPI = 200
+    
+    # placed width in mm of every image argument of create_analytics_report
+    IMAGE_WIDTHS = {'page_1_img_path': WIDTH-20,
+                    'page_2_img_path1': WIDTH/2-10,
+                    'page_2_img_path2': WIDTH/2.1-10,
+                    'page_2_img_path3': WIDTH/2-10,
+                    'page_3_img_path1': WIDTH/1.65-20,
+                    'page_3_img_path2': WIDTH/1.35-20}
+    
+    def __init__(self, *args, image_ppi:int = DEFAULT_IMAGE_PPI, image_quality:int = None, **kwargs):
+        """
+        Args:
+            image_ppi:int     -> images are downsampled to this many pixels per inch of their
+                                 placed width on the page, None keeps their resolution
+            image_quality:int -> if set, images are embedded as JPEG of this quality(1-95)
+                                 instead of lossless
+        """
+        super().__init__(*args, **kwargs)
+        self.image_ppi = image_ppi
+        self.image_quality = image_quality
+    
+    @classmethod
+    def get_image_width_px(cls, image_name:str, image_ppi:int = DEFAULT_IMAGE_PPI)->int:
+        """
+        Returns the pixel width an image argument of create_analytics_report is embedded
+        with, so plots can be rendered at that size(see visualization.finalize_figure)
+        instead of being rendered at 300 dpi and downsampled afterwards.
+        
+        Args:
+            image_name:str -> key of IMAGE_WIDTHS, i.e. 'page_1_img_path'
+            image_ppi:int
+        """
+        return max(1, round(cls.IMAGE_WIDTHS[image_name]/cls.MM_PER_INCH*image_ppi))
+    
+    def _register_image(self, image, width:float)->str:
+        """
+        Converts the image to the placed resolution, registers it in the document
+        and returns its key. Identical images are embedded only once.
+        
+        Args:
+            image:str, bytes or file-like -> image path or encoded image
+            width:float                   -> placed width in mm
+        """
+        # Pillow is installed together with matplotlib
+        from PIL import Image
+        
+        if isinstance(image, (bytes, bytearray)):
+            image = io.BytesIO(image)
+        
+        with Image.open(image) as img:
+            img.load()
+            
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode!='RGB':
+                img = img.convert('RGB')
+            
+            if self.image_ppi:
+                pixel_width = max(1, round(width/self.MM_PER_INCH*self.image_ppi))
+                if pixel_width<img.width:
+                    pixel_height = max(1, round(img.height*pixel_width/img.width))
+                    img = img.resize((pixel_width, pixel_height), Image.LANCZOS)
+            
+            if self.image_quality:
+                buffer = io.BytesIO()
+                img.save(buffer, format='JPEG', quality=self.image_quality, optimize=True)
+                info = {'f': 'DCTDecode', 'data': buffer.getvalue()}
+            else:
+                info = {'f': 'FlateDecode', 'data': zlib.compress(img.tobytes())}
+            
+            info.update({'w': img.width, 'h': img.height, 'cs': 'DeviceRGB', 'bpc': 8})
+        
+        key = 'memory_image_' + hashlib.sha1(info['data']).hexdigest()
+        if key not in self.images:
+            info['i'] = len(self.images)+1
+            self.images[key] = info
+        return key
+    
+    @instrument
+    def place_image(self, image, x:float, y:float, w:float)->None:
+        """
+        Puts the image on the page. Accepts image paths as well as in-memory images
+        (bytes or file-like objects, i.e. from the plot functions with return_bytes=True).
+        Images are decoded with Pillow instead of fpdf's own PNG parser, which is much
+        slower for large plots. Charts of scripts.pdf_charts are drawn as vector graphics
+        without going through matplotlib.
+        
+        Args:
+            image:str, bytes, file-like or pdf_charts.Chart
+            x:float -> position in mm
+            y:float -> position in mm
+            w:float -> width in mm
+        """
+        if isinstance(image, Chart):
+            image.draw(self, x, y, w)
+        else:
+            self.image(self._register_image(image, w), x, y, w)
+        
     def create_title(self, day:str, title:str = "Weekly Report"):
         # Unicode is not yet supported in the py3k version; use windows-1252 standard font
         self.set_font('Arial', '', 24)  
         self.ln(60)
-        self.write(5, f"Weekly Report")
+        self.write(5, title)
         self.ln(10)
         self.set_font('Arial', '', 16)
         self.write(4, f'{day}')
@@ -34,10 +142,11 @@ class PDF(FPDF):
     def first_page(self, 
                    page_1_txt1:str,
                    page_1_txt2:str,
-                   page_1_img_path:str)->None:
+                   page_1_img_path:str,
+                   title:str = "Weekly Report")->None:
         
         self.add_page()
-        self.create_title(self.TEST_DATE)
+        self.create_title(self.TEST_DATE, title)
         self.set_page_text_style()
         self.cell(30, 10, page_1_txt1, ln = 0, align='L')
         # Move to 16 cm to the right
@@ -45,7 +154,7 @@ class PDF(FPDF):
         self.cell(10, 10, page_1_txt2, align='R', ln = 1,)
         # Line break
         self.ln(30)
-        self.image(page_1_img_path, 5, 140, self.WIDTH-20)
+        self.place_image(page_1_img_path, 5, 140, self.IMAGE_WIDTHS['page_1_img_path'])
         
     def second_page(self, 
                     page_2_text:str,
@@ -56,9 +165,9 @@ class PDF(FPDF):
         self.add_page()        
         self.set_page_text_style()
         self.cell(0, 10, page_2_text, 0, 0, 'C')
-        self.image(page_2_img_path1, 5, 60, self.WIDTH/2-10)
-        self.image(page_2_img_path2, self.WIDTH/2, 60, self.WIDTH/2.1-10)
-        self.image(page_2_img_path3, self.WIDTH/4, 160, self.WIDTH/2-10)
+        self.place_image(page_2_img_path1, 5, 60, self.IMAGE_WIDTHS['page_2_img_path1'])
+        self.place_image(page_2_img_path2, self.WIDTH/2, 60, self.IMAGE_WIDTHS['page_2_img_path2'])
+        self.place_image(page_2_img_path3, self.WIDTH/4, 160, self.IMAGE_WIDTHS['page_2_img_path3'])
         
     def third_page(self,
                    page_3_text,
@@ -68,9 +177,10 @@ class PDF(FPDF):
         self.add_page()        
         self.set_page_text_style()
         self.cell(0, 10, page_3_text, 0, 0, 'C')
-        self.image(page_3_img_path1, 50, 60, self.WIDTH/1.65-20)
-        self.image(page_3_img_path2, 40, 170, self.WIDTH/1.35-20)
+        self.place_image(page_3_img_path1, 50, 60, self.IMAGE_WIDTHS['page_3_img_path1'])
+        self.place_image(page_3_img_path2, 40, 170, self.IMAGE_WIDTHS['page_3_img_path2'])
         
+    @instrument
     def create_analytics_report(self,
                                 page_1_txt1:str='Average orders per week: ~66.',
                                 page_1_txt2:str='Average Revenue per order: ~480',
@@ -82,15 +192,18 @@ class PDF(FPDF):
                                 page_2_img_path3:str="./plots/product_sales_trend.png",
                                 page_3_img_path1:str="./plots/top_providers.png",
                                 page_3_img_path2:str="./plots/provider_revenue_trend.png",
-                                save_filename="report.pdf"):
-
-        pdf = FPDF() # A4 (210 by 297 mm)
-
+                                save_filename="report.pdf",
+                                title:str="Weekly Report"):
+        """
+        Creates the three page analytics report. Every image argument is either a
+        path, an in-memory image(bytes or file-like object) or a pdf_charts chart.
+        """
 
         ''' First Page '''
         self.first_page(page_1_txt1,
                         page_1_txt2,
-                        page_1_img_path)
+                        page_1_img_path,
+                        title)
         
         ''' Second Page '''
         self.second_page(page_2_text,
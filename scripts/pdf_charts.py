@@ -0,0 +1,316 @@
+import abc
+import math
+import numpy as np
+import pandas as pd
+
+DEFAULT_COLORS = ['#00876c', '#66ad75', '#b1d081', '#fff197']
+
+def hex_to_rgb(color:str)->tuple:
+    """
+    Returns the (r, g, b) tuple(0-255) of a '#rrggbb' color. Other matplotlib colors,
+    i.e. 'grey' or '#rgb' of the color dicts of plot_bargraph, are converted with
+    matplotlib.colors.to_rgb.
+    """
+    if isinstance(color, str) and len(color)==7 and color.startswith('#'):
+        try:
+            return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+        except ValueError:
+            pass
+
+    from matplotlib.colors import to_rgb
+
+    try:
+        return tuple(int(round(channel*255)) for channel in to_rgb(color))
+    except ValueError as error:
+        raise ValueError("Invalid chart color {!r}.".format(color)) from error
+
+def get_nice_ticks(min_value:float, max_value:float, max_ticks:int=6)->np.ndarray:
+    """
+    Returns evenly spaced tick values with a step of 1, 2 or 5 times a power of ten
+    covering the given range.
+
+    Args:
+        min_value:float
+        max_value:float
+        max_ticks:int
+    """
+    if not (math.isfinite(min_value) and math.isfinite(max_value)):
+        raise ValueError("Tick range must be finite, got {} to {}.".format(min_value, max_value))
+    if max_value<=min_value:
+        max_value = min_value+1
+
+    raw_step = (max_value-min_value)/max(max_ticks-1, 1)
+    magnitude = 10**math.floor(math.log10(raw_step))
+    step = next(factor*magnitude for factor in (1, 2, 5, 10) if factor*magnitude>=raw_step)
+
+    first_tick = math.floor(min_value/step)*step
+    last_tick = math.ceil(max_value/step)*step
+    return np.arange(first_tick, last_tick+step*0.5, step)
+
+def format_tick(value:float)->str:
+    """
+    Returns a short label of the tick value, i.e. 12000 -> 12k.
+    """
+    if abs(value)>=1000000:
+        return '{:g}M'.format(value/1000000)
+    elif abs(value)>=1000:
+        return '{:g}k'.format(value/1000)
+    return '{:g}'.format(value)
+
+class Chart(abc.ABC):
+    """
+    Base class of the charts drawn with the line, rect and text primitives of fpdf.
+    A chart is placed like an image: PDF.place_image(chart, x, y, w) draws it at
+    (x, y) with width w and height w*aspect_ratio(all in mm).
+
+    Args:
+        title:str
+        x_label:str
+        y_label:str
+        aspect_ratio:float -> height/width of the chart
+        font_size:int
+    """
+
+    MARGIN_LEFT = 14
+    MARGIN_RIGHT = 4
+    MARGIN_TOP = 9
+    MARGIN_BOTTOM = 12
+
+    def __init__(self,
+                 title:str = '',
+                 x_label:str = '',
+                 y_label:str = '',
+                 aspect_ratio:float = 0.5,
+                 font_size:int = 7):
+
+        self.title = title
+        self.x_label = x_label
+        self.y_label = y_label
+        self.aspect_ratio = aspect_ratio
+        self.font_size = font_size
+
+    def get_plot_area(self, x:float, y:float, w:float)->tuple:
+        """
+        Returns the (left, top, width, height) of the plot area inside the chart.
+        """
+        h = w*self.aspect_ratio
+        return (x+self.MARGIN_LEFT,
+                y+self.MARGIN_TOP,
+                w-self.MARGIN_LEFT-self.MARGIN_RIGHT,
+                h-self.MARGIN_TOP-self.MARGIN_BOTTOM)
+
+    def draw_frame(self, pdf, x:float, y:float, w:float, ticks:np.ndarray)->None:
+        """
+        Draws title, axis labels, y ticks and horizontal grid lines.
+        """
+        left, top, width, height = self.get_plot_area(x, y, w)
+        y_min, y_max = ticks[0], ticks[-1]
+
+        pdf.set_font('Arial', '', self.font_size+2)
+        pdf.set_text_color(0)
+        pdf.text(x+(w-pdf.get_string_width(self.title))/2, y+self.font_size*0.6, self.title)
+
+        pdf.set_font('Arial', '', self.font_size)
+        pdf.set_draw_color(220)
+        pdf.set_line_width(0.1)
+        for tick in ticks:
+            tick_y = top+height-(tick-y_min)/(y_max-y_min)*height
+            pdf.line(left, tick_y, left+width, tick_y)
+            label = format_tick(tick)
+            pdf.text(left-1.5-pdf.get_string_width(label), tick_y+1, label)
+
+        pdf.set_draw_color(80)
+        pdf.set_line_width(0.2)
+        pdf.line(left, top+height, left+width, top+height)
+        pdf.line(left, top, left, top+height)
+
+        pdf.text(left+(width-pdf.get_string_width(self.x_label))/2, top+height+self.MARGIN_BOTTOM-2, self.x_label)
+
+        # fpdf 1.7 cannot rotate text, so the y label is written above the axis
+        pdf.text(x, top-2, self.y_label)
+
+    @staticmethod
+    def reset_style(pdf, font:tuple)->None:
+        """
+        Restores the default colors and line width and the given font of the document.
+        """
+        pdf.set_draw_color(0)
+        pdf.set_fill_color(0)
+        pdf.set_text_color(0)
+        pdf.set_line_width(0.2)
+        if font[0]:
+            pdf.set_font(*font)
+
+    def draw(self, pdf, x:float, y:float, w:float)->None:
+        """
+        Draws the chart at (x, y) with width w(all in mm).
+        """
+        font = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        try:
+            self.draw_chart(pdf, x, y, w)
+        finally:
+            self.reset_style(pdf, font)
+
+    @abc.abstractmethod
+    def draw_chart(self, pdf, x:float, y:float, w:float)->None:
+        """
+        Draws the chart itself, implemented by the subclasses.
+        """
+
+class LineChart(Chart):
+    """
+    Line chart of a series, the vector counterpart of visualization.plot_line_graph.
+
+    Args:
+        values:array-like     -> y values, i.e. weekly revenue
+        x_values:array-like   -> x values, defaults to the index of values or 0..n-1
+        annotate_every:int    -> write every n-th value next to its point, 0 disables it
+        color:str
+        kwargs                -> see Chart
+    """
+
+    def __init__(self,
+                 values,
+                 x_values = None,
+                 annotate_every:int = 4,
+                 color:str = '#1f77b4',
+                 **kwargs):
+
+        super().__init__(**kwargs)
+        if x_values is None:
+            x_values = values.index if isinstance(values, pd.core.series.Series) else np.arange(len(values))
+        x_values = np.asarray(x_values, dtype='float64')
+        values = np.asarray(values, dtype='float64')
+
+        # missing points are left out of the line
+        present = ~(np.isnan(x_values) | np.isnan(values))
+        self.x_values = x_values[present]
+        self.values = values[present]
+        self.annotate_every = annotate_every
+        self.color = color
+
+    def draw_chart(self, pdf, x:float, y:float, w:float)->None:
+        left, top, width, height = self.get_plot_area(x, y, w)
+
+        ticks = get_nice_ticks(min(self.values.min(initial=0), 0), self.values.max() if len(self.values) else 1)
+        self.draw_frame(pdf, x, y, w, ticks)
+        if not len(self.values):
+            return
+
+        x_min, x_max = self.x_values.min(), self.x_values.max()
+        x_span = (x_max-x_min) or 1
+        points_x = left+(self.x_values-x_min)/x_span*width
+        points_y = top+height-(self.values-ticks[0])/(ticks[-1]-ticks[0])*height
+
+        # x ticks at every integer position, like the MultipleLocator(1) of plot_line_graph
+        pdf.set_font('Arial', '', self.font_size)
+        step = max(1, math.ceil((x_max-x_min)/20))
+        for tick in np.arange(math.ceil(x_min), x_max+1, step):
+            tick_x = left+(tick-x_min)/x_span*width
+            label = format_tick(tick)
+            pdf.text(tick_x-pdf.get_string_width(label)/2, top+height+3.5, label)
+
+        pdf.set_draw_color(*hex_to_rgb(self.color))
+        pdf.set_fill_color(*hex_to_rgb(self.color))
+        pdf.set_line_width(0.3)
+        for index in range(len(points_x)-1):
+            pdf.line(points_x[index], points_y[index], points_x[index+1], points_y[index+1])
+        for point_x, point_y in zip(points_x, points_y):
+            pdf.rect(point_x-0.4, point_y-0.4, 0.8, 0.8, 'F')
+
+        if self.annotate_every:
+            pdf.set_font('Arial', '', self.font_size-2)
+            for point_x, point_y, value in list(zip(points_x, points_y, self.values))[::self.annotate_every]:
+                label = str(int(value)) if float(value).is_integer() else '{:.1f}'.format(value)
+                pdf.text(point_x+0.8, point_y-0.8, label)
+
+class BarChart(Chart):
+    """
+    Bar chart of aggregated values, the vector counterpart of visualization.plot_bargraph.
+
+    Args:
+        labels:array-like    -> x axis categories
+        values:array-like    -> bar heights
+        colors:dict or list  -> category to '#rrggbb' color mapping or list of colors
+        sort:bool            -> sort the bars by value in descending order
+        top_n:int            -> only draw the n highest bars
+        value_labels:bool    -> write the value above every bar
+        kwargs               -> see Chart
+    """
+
+    def __init__(self,
+                 labels,
+                 values,
+                 colors = None,
+                 sort:bool = True,
+                 top_n:int = None,
+                 value_labels:bool = True,
+                 **kwargs):
+
+        kwargs.setdefault('aspect_ratio', 1.0)
+        super().__init__(**kwargs)
+
+        labels = np.asarray(labels).astype(str)
+        values = np.asarray(values, dtype='float64')
+
+        # bars without a value are left out
+        present = ~np.isnan(values)
+        labels, values = labels[present], values[present]
+        if sort:
+            order = np.argsort(-values, kind='stable')
+            labels, values = labels[order], values[order]
+        if top_n:
+            labels, values = labels[:top_n], values[:top_n]
+
+        if colors is None:
+            colors = DEFAULT_COLORS
+        if isinstance(colors, dict):
+            colors = [colors.get(label, DEFAULT_COLORS[0]) for label in labels]
+        else:
+            colors = [colors[index%len(colors)] for index in range(len(labels))]
+
+        self.labels = labels
+        self.values = values
+        self.colors = colors
+        self.value_labels = value_labels
+
+    @classmethod
+    def from_frame(cls,
+                   df:pd.core.frame.DataFrame,
+                   x_axis_column:str = 'product',
+                   y_axis_column:str = 'avg_order_rev',
+                   **kwargs):
+        """
+        Creates the bar chart of the mean of y_axis_column per x_axis_column, the
+        same bars as plot_bargraph without confidence intervals.
+        """
+        means = df.groupby(x_axis_column, sort=False, observed=True)[y_axis_column].mean()
+        return cls(means.index, means.to_numpy(), **kwargs)
+
+    def draw_chart(self, pdf, x:float, y:float, w:float)->None:
+        left, top, width, height = self.get_plot_area(x, y, w)
+
+        ticks = get_nice_ticks(min(self.values.min(initial=0), 0), self.values.max(initial=1))
+        self.draw_frame(pdf, x, y, w, ticks)
+
+        slot = width/max(len(self.values), 1)
+        bar_width = slot*0.8
+        zero_y = top+height-(0-ticks[0])/(ticks[-1]-ticks[0])*height
+
+        bars_x = left+np.arange(len(self.values))*slot+(slot-bar_width)/2
+        bars_y = top+height-(self.values-ticks[0])/(ticks[-1]-ticks[0])*height
+
+        pdf.set_font('Arial', '', self.font_size)
+        for label, color, bar_x, bar_y in zip(self.labels, self.colors, bars_x, bars_y):
+            pdf.set_fill_color(*hex_to_rgb(color))
+            pdf.rect(bar_x, min(bar_y, zero_y), bar_width, abs(zero_y-bar_y), 'F')
+
+            pdf.text(bar_x+(bar_width-pdf.get_string_width(label))/2, top+height+3.5, label)
+
+        if self.value_labels:
+            pdf.set_font('Arial', '', self.font_size-2)
+            for value, bar_x, bar_y in zip(self.values, bars_x, bars_y):
+                value_label = '{:.1f}'.format(value)
+                pdf.text(bar_x+(bar_width-pdf.get_string_width(value_label))/2,
+                         bar_y-1 if value>=0 else bar_y+2.5,
+                         value_label)
@@ -0,0 +1,570 @@
+import os
+import sys
+import time
+import pickle
+import hashlib
+import inspect
+import argparse
+import importlib.util
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from scripts.utils import _get_file_content_hash, read_xlsx, extract_multiple_date_features, \
+                          resolve_converted_wide_table_index_issue
+from scripts.aggregation import aggregate_metrics
+
+DEFAULT_DATASET = 'Data Analyst - Recruiting Task - Commission Dataset.xlsx'
+BAR_COLORS = ['#00876c', '#66ad75', '#b1d081', '#fff197']
+
+# modules the stage functions call into, their source is part of the stage fingerprints
+DATA_MODULES = ['scripts.utils', 'scripts.aggregation']
+PLOT_MODULES = ['scripts.utils', 'scripts.visualization', 'scripts.generate_analytics_report']
+REPORT_MODULES = ['scripts.generate_analytics_report', 'scripts.pdf_charts']
+CHART_MODULES = ['scripts.pdf_charts']
+
+class Stage:
+    """
+    A step of the pipeline. The stage calls function(*outputs of inputs, **params) and
+    its return value is cached on disk under a fingerprint of the stage name, the source
+    of the module defining the function(including its helpers and constants), the params,
+    the content of the source files, the source of the code_dependencies and the
+    fingerprints of the inputs. Stages returning bytes can be written to output_file.
+
+    Args:
+        name:str
+        function:function      -> module level function, so it can run in a worker process
+        inputs:list            -> names of the stages whose outputs are passed to the function
+        params:dict            -> keyword arguments of the function
+        source_files:list      -> files the stage reads, i.e. the excel workbook
+        output_file:str        -> path the bytes returned by the stage are written to
+        code_dependencies:list -> modules the function calls into(i.e. 'scripts.visualization'),
+                                  their source is located without importing them
+        variant:str            -> variant of a stage replaced by an option of the pipeline(i.e.
+                                  'vector_charts'), the cached outputs of every variant are kept
+    """
+
+    def __init__(self,
+                 name:str,
+                 function,
+                 inputs:list = None,
+                 params:dict = None,
+                 source_files:list = None,
+                 output_file:str = None,
+                 code_dependencies:list = None,
+                 variant:str = None):
+
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs or [])
+        self.params = dict(params or {})
+        self.source_files = list(source_files or [])
+        self.output_file = output_file
+        self.code_dependencies = list(code_dependencies or [])
+        self.variant = variant
+
+    def get_fingerprint(self, input_fingerprints:list)->str:
+        """
+        Returns the fingerprint of the stage given the fingerprints of its inputs.
+        """
+        code = '{}.{}'.format(self.function.__module__, self.function.__qualname__)
+        try:
+            module_path = inspect.getsourcefile(self.function)
+        except TypeError:
+            module_path = None
+
+        digest = hashlib.sha256()
+        for part in [self.name, code, repr(sorted(self.params.items()))] + list(input_fingerprints):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        # the whole module, so the helpers and constants the function uses are covered too
+        if module_path and os.path.isfile(module_path):
+            digest.update(_get_file_content_hash(module_path).encode('utf-8'))
+        for path in self.source_files:
+            digest.update(_get_file_content_hash(path).encode('utf-8'))
+        for module_name in self.code_dependencies:
+            digest.update(_get_file_content_hash(get_module_path(module_name)).encode('utf-8'))
+        return digest.hexdigest()
+
+def get_module_path(module_name:str)->str:
+    """Returns the source file of the module without importing it."""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+        raise ValueError("Source of module '{}' not found.".format(module_name))
+    return spec.origin
+
+def _load_output(path:str):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+def _run_stage(function, input_paths:list, params:dict, output_path:str)->float:
+    """
+    Runs a stage on the cached outputs of its inputs and caches its output. Runs in
+    the worker processes of Pipeline.run. Returns the run time in seconds.
+    """
+    start = time.perf_counter()
+    result = function(*[_load_output(path) for path in input_paths], **params)
+
+    # write to a temporary file first so that an interrupted run never leaves a broken cache
+    temp_path = output_path + '.{}.tmp'.format(os.getpid())
+    with open(temp_path, 'wb') as file:
+        pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, output_path)
+
+    return time.perf_counter()-start
+
+def _init_pipeline_worker()->None:
+    """
+    Selects the non-interactive Agg backend for the plot stages without importing matplotlib.
+    """
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+class Pipeline:
+    """
+    DAG of stages with outputs cached on disk. A run only executes the stages whose
+    fingerprint changed since their output was cached(and the stages depending on
+    them). Stages whose inputs are ready run concurrently on a process pool, each
+    worker reads the inputs of its stage from the cache.
+
+    Args:
+        stages:list     -> list of Stage
+        cache_dir:str   -> directory of the cached stage outputs
+        max_workers:int -> number of worker processes, 1 runs every stage in this process
+    """
+
+    def __init__(self, stages:list, cache_dir:str = '.pipeline_cache', max_workers:int = None):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages)!=len(stages):
+            raise ValueError("Stage names must be unique.")
+
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.order = self.get_order()
+
+    def get_order(self)->list:
+        """
+        Returns the stage names in topological order. Raises a ValueError for unknown
+        inputs and cycles.
+        """
+        order, visiting, visited = [], set(), set()
+
+        def visit(name, path):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError("Cycle between stages: {}".format(' -> '.join(path+[name])))
+            if name not in self.stages:
+                raise ValueError("Unknown input stage '{}' of '{}'.".format(name, path[-1]))
+
+            visiting.add(name)
+            for input_name in self.stages[name].inputs:
+                visit(input_name, path+[name])
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def get_fingerprints(self)->dict:
+        """Returns the fingerprint of every stage."""
+        fingerprints = {}
+        for name in self.order:
+            stage = self.stages[name]
+            fingerprints[name] = stage.get_fingerprint([fingerprints[input_name] for input_name in stage.inputs])
+        return fingerprints
+
+    def _get_cache_prefix(self, name:str)->str:
+        variant = self.stages[name].variant
+        return '{}@{}-'.format(name, variant) if variant else name+'-'
+
+    def get_cache_path(self, name:str, fingerprint:str)->str:
+        return os.path.join(self.cache_dir, '{}{}.pkl'.format(self._get_cache_prefix(name), fingerprint[:16]))
+
+    def _remove_outdated(self, name:str, cache_path:str)->None:
+        """
+        Removes the cached outputs of older versions of the stage. Outputs of the other
+        variants of the stage are kept.
+        """
+        prefix = self._get_cache_prefix(name)
+        for file_name in os.listdir(self.cache_dir):
+            file_path = os.path.join(self.cache_dir, file_name)
+            if file_name.startswith(prefix) and file_name.endswith('.pkl') and file_path!=cache_path:
+                os.remove(file_path)
+
+    def _get_required_stages(self, targets:list)->list:
+        """Returns the targets and all the stages they depend on in topological order."""
+        required = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError("Unknown stage '{}'.".format(name))
+            if name not in required:
+                required.add(name)
+                pending.extend(self.stages[name].inputs)
+        return [name for name in self.order if name in required]
+
+    def _write_output_file(self, stage:Stage, cache_path:str)->None:
+        """Writes the cached bytes of the stage to its output file if it differs."""
+        content = _load_output(cache_path)
+        if os.path.exists(stage.output_file):
+            with open(stage.output_file, 'rb') as file:
+                if file.read()==content:
+                    return
+
+        os.makedirs(os.path.dirname(stage.output_file) or '.', exist_ok=True)
+        with open(stage.output_file, 'wb') as file:
+            file.write(content)
+
+    def run(self, targets:list = None, force:bool = False, dry_run:bool = False, verbose:bool = True)->dict:
+        """
+        This function runs the stages needed for the targets and returns the status of
+        every stage('cached', 'ran' or 'stale' for dry runs).
+
+        Args:
+            targets:list  -> stage names to produce, defaults to every stage
+            force:bool    -> ignore the cache and run every required stage
+            dry_run:bool  -> only report which stages would run
+            verbose:bool  -> print the status of every stage
+
+        Returns:
+            statuses:dict
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            names = self._get_required_stages(targets or self.order)
+            fingerprints = self.get_fingerprints()
+            cache_paths = {name: self.get_cache_path(name, fingerprints[name]) for name in names}
+
+            statuses = {}
+            for name in names:
+                cached = not force and os.path.exists(cache_paths[name])
+                statuses[name] = 'cached' if cached else 'stale'
+
+            def log(name, message):
+                if verbose:
+                    print('{:<28} {}'.format(name, message))
+
+            def complete(name, seconds=None):
+                stage = self.stages[name]
+                if seconds is not None:
+                    statuses[name] = 'ran'
+                    self._remove_outdated(name, cache_paths[name])
+                    log(name, 'ran in {:.2f}s'.format(seconds))
+                else:
+                    log(name, 'cached')
+                if stage.output_file:
+                    self._write_output_file(stage, cache_paths[name])
+
+            stale = [name for name in names if statuses[name]=='stale']
+            if dry_run:
+                for name in names:
+                    log(name, statuses[name])
+                return statuses
+
+            for name in names:
+                if statuses[name]=='cached':
+                    complete(name)
+
+            def submit(executor, name):
+                stage = self.stages[name]
+                arguments = (stage.function,
+                             [cache_paths[input_name] for input_name in stage.inputs],
+                             stage.params,
+                             cache_paths[name])
+                return executor.submit(_run_stage, *arguments) if executor else _run_stage(*arguments)
+
+            if self.max_workers==1 or len(stale)<=1:
+                for name in stale:
+                    complete(name, submit(None, name))
+                return statuses
+
+            done_stages = set(names)-set(stale)
+            waiting = list(stale)
+            running = {}
+
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(stale)),
+                                     initializer=_init_pipeline_worker) as executor:
+                while waiting or running:
+                    for name in list(waiting):
+                        if all(input_name in done_stages for input_name in self.stages[name].inputs):
+                            waiting.remove(name)
+                            running[submit(executor, name)] = name
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        complete(name, future.result())
+                        done_stages.add(name)
+
+            return statuses
+
+        except Exception as error:
+            raise Exception('Caught this error: ' + repr(error)) from error
+
+    def load(self, name:str):
+        """Returns the cached output of the stage, None if it was not run yet."""
+        cache_path = self.get_cache_path(name, self.get_fingerprints()[name])
+        return _load_output(cache_path) if os.path.exists(cache_path) else None
+
+def add_date_features(data:pd.core.frame.DataFrame)->pd.core.frame.DataFrame:
+    """Adds the month, year, dayofweek and week of the order date as columns."""
+    features = extract_multiple_date_features(data, 'order_date', ['month', 'year', 'dayofweek', 'week'])
+    return pd.concat([data.drop(columns=features.columns, errors='ignore'), features], axis=1)
+
+def get_weekly_trend(data:pd.core.frame.DataFrame)->pd.core.series.Series:
+    """Returns the revenue per week."""
+    return data[['week', 'revenue']].groupby('week').sum()['revenue']
+
+def get_weekly_aggregates(data:pd.core.frame.DataFrame, key_column:str = 'product')->pd.core.frame.DataFrame:
+    """
+    Returns the total orders, revenue and average revenue per order per week and key column.
+    """
+    df_weekly = aggregate_metrics(data,
+                                  group_by_columns=['week', key_column],
+                                  metrics={'total_orders': ('sum', 'order_count'),
+                                           'revenue': ('sum', 'revenue'),
+                                           'avg_order_rev': ('ratio', 'revenue', 'order_count')})
+    df_weekly[key_column] = df_weekly[key_column].astype(data[key_column].dtype)
+    return df_weekly.sort_values(['week', key_column], ignore_index=True)
+
+def get_report_texts(data:pd.core.frame.DataFrame,
+                     weekly_product:pd.core.frame.DataFrame,
+                     weekly_provider:pd.core.frame.DataFrame)->dict:
+    """Returns the texts of the report pages."""
+    avg_rev_per_week = round(data.revenue.sum()/data.week.nunique())
+    avg_order_per_week = round(weekly_product.total_orders.sum()/weekly_product.week.nunique())
+
+    product_orders = weekly_product.groupby('product')['total_orders'].mean()
+    provider_orders = weekly_provider.groupby('provider')['total_orders'].mean()
+
+    return {'page_1_txt1': 'Average orders per week: ~{}'.format(avg_order_per_week),
+            'page_1_txt2': 'Average Revenue per order: ~{}'.format(round(avg_rev_per_week/avg_order_per_week)),
+            'page_2_text': "Most Desirable Product: '{}' ~{} orders".format(product_orders.idxmax(),
+                                                                             round(product_orders.max())),
+            'page_3_text': "Most Proactive Provider: '{}' ~{} orders".format(provider_orders.idxmax(),
+                                                                              round(provider_orders.max()))}
+
+def get_report_width_px(image_name:str)->int:
+    """
+    Returns the pixel width of an image argument of PDF.create_analytics_report, None
+    renders at 300 dpi.
+    """
+    from scripts.generate_analytics_report import PDF
+    return PDF.get_image_width_px(image_name) if image_name else None
+
+def render_line_graph(trend:pd.core.series.Series, image_name:str = None, **plot_kwargs)->bytes:
+    """
+    Renders visualization.plot_line_graph at the size of image_name in the report
+    and returns the png.
+    """
+    from scripts.visualization import plot_line_graph
+    return plot_line_graph(trend, headless=True, return_bytes=True, width_px=get_report_width_px(image_name),
+                           **plot_kwargs)
+
+def render_bargraph(df:pd.core.frame.DataFrame,
+                    x_axis_column:str,
+                    y_axis_column:str,
+                    image_name:str = None,
+                    **plot_kwargs)->bytes:
+    """
+    Renders visualization.plot_bargraph with one color per x-axis value at the size of
+    image_name in the report and returns the png.
+    """
+    from scripts.visualization import plot_bargraph
+
+    color_dict = {value: BAR_COLORS[index%len(BAR_COLORS)] for index, value in enumerate(df[x_axis_column].unique())}
+    return plot_bargraph(df, x_axis_column, y_axis_column, color_dict=color_dict, headless=True, return_bytes=True,
+                         width_px=get_report_width_px(image_name), **plot_kwargs)
+
+def render_sphagetti_graph(df:pd.core.frame.DataFrame,
+                           key_column:str,
+                           value_column:str,
+                           scale:float = 1,
+                           fill_value:float = None,
+                           image_name:str = None,
+                           **plot_kwargs)->bytes:
+    """
+    Renders visualization.plot_highlighted_sphagetti_graph of the week x key column table
+    of value_column at the size of image_name in the report and returns the png.
+    """
+    from scripts.visualization import plot_highlighted_sphagetti_graph
+
+    wide_df = df.pivot(index='week', columns=key_column, values=value_column)/scale
+    if fill_value is not None:
+        wide_df = wide_df.fillna(fill_value)
+    wide_df = resolve_converted_wide_table_index_issue(wide_df)
+
+    return plot_highlighted_sphagetti_graph(wide_df, unique_index_name='index', headless=True, return_bytes=True,
+                                            width_px=get_report_width_px(image_name), **plot_kwargs)
+
+def create_line_chart(trend:pd.core.series.Series, **chart_kwargs):
+    """
+    Returns the pdf_charts.LineChart of the trend, which the report draws as vector
+    graphics instead of embedding a rendered image.
+    """
+    from scripts.pdf_charts import LineChart
+    return LineChart(trend, **chart_kwargs)
+
+def create_bar_chart(df:pd.core.frame.DataFrame, x_axis_column:str, y_axis_column:str, **chart_kwargs):
+    """
+    Returns the pdf_charts.BarChart of the mean of y_axis_column per x_axis_column with
+    the colors of render_bargraph.
+    """
+    from scripts.pdf_charts import BarChart
+
+    colors = {str(value): BAR_COLORS[index%len(BAR_COLORS)] for index, value in enumerate(df[x_axis_column].unique())}
+    return BarChart.from_frame(df, x_axis_column, y_axis_column, colors=colors, **chart_kwargs)
+
+def render_report(texts:dict,
+                  trend,
+                  top_products,
+                  top_products_avg_rev,
+                  product_sales_trend,
+                  top_providers_avg_rev,
+                  provider_revenue_trend)->bytes:
+    """
+    Creates the analytics report from the rendered plots(png bytes or pdf_charts charts)
+    and returns the pdf.
+    """
+    import io
+    import tempfile
+    import contextlib
+    from scripts.generate_analytics_report import PDF
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        save_filename = os.path.join(temp_dir, 'report.pdf')
+        with contextlib.redirect_stdout(io.StringIO()):
+            PDF().create_analytics_report(page_1_img_path=trend,
+                                          page_2_img_path1=top_products,
+                                          page_2_img_path2=top_products_avg_rev,
+                                          page_2_img_path3=product_sales_trend,
+                                          page_3_img_path1=top_providers_avg_rev,
+                                          page_3_img_path2=provider_revenue_trend,
+                                          save_filename=save_filename,
+                                          **texts)
+        with open(save_filename, 'rb') as file:
+            return file.read()
+
+def create_report_pipeline(path:str = DEFAULT_DATASET,
+                           sheet_name:str = 'data',
+                           output:str = 'analytics_report.pdf',
+                           plot_dir:str = 'plots',
+                           cache_dir:str = '.pipeline_cache',
+                           max_workers:int = None,
+                           vector_charts:bool = False)->Pipeline:
+    """
+    Returns the pipeline of Answer 2_Sales Analysis.ipynb: read_xlsx -> date features ->
+    weekly product/provider aggregates -> plots -> PDF.create_analytics_report. The
+    plots are saved into plot_dir and the report to output.
+
+    Args:
+        path:str           -> Path of the excel file
+        sheet_name:str     -> Sheet name in the excel
+        output:str         -> path of the pdf report
+        plot_dir:str
+        cache_dir:str
+        max_workers:int
+        vector_charts:bool -> draw the trend and the bar plots with pdf_charts as vector
+                              graphics in the report instead of rendering them with
+                              matplotlib, they are not saved into plot_dir
+    """
+    def plot_file(file_name):
+        return os.path.join(plot_dir, file_name) if plot_dir else None
+
+    stages = [Stage('read_xlsx', read_xlsx, params={'path': path, 'sheet_name': sheet_name}, source_files=[path],
+                    code_dependencies=DATA_MODULES),
+              Stage('extract_date_features', add_date_features, ['read_xlsx'], code_dependencies=DATA_MODULES),
+              Stage('weekly_trend', get_weekly_trend, ['extract_date_features']),
+              Stage('weekly_product', get_weekly_aggregates, ['extract_date_features'], {'key_column': 'product'},
+                    code_dependencies=DATA_MODULES),
+              Stage('weekly_provider', get_weekly_aggregates, ['extract_date_features'], {'key_column': 'provider'},
+                    code_dependencies=DATA_MODULES),
+              Stage('report_texts', get_report_texts, ['extract_date_features', 'weekly_product', 'weekly_provider']),
+
+              Stage('plot_trend', render_line_graph, ['weekly_trend'],
+                    {'x_label': 'Revenue', 'y_label': 'Week', 'trend_label': 'Weekly',
+                     'title': 'Overall Weekly Revenue trend', 'image_name': 'page_1_img_path'},
+                    output_file=plot_file('trend.png'), code_dependencies=PLOT_MODULES),
+              Stage('plot_top_products', render_bargraph, ['weekly_product'],
+                    {'x_axis_column': 'product', 'y_axis_column': 'revenue', 'x_label_name': 'Product',
+                     'y_label_name': 'Revenue', 'title': 'Top Product By Revenue', 'image_name': 'page_2_img_path1'},
+                    output_file=plot_file('top_products.png'), code_dependencies=PLOT_MODULES),
+              Stage('plot_top_products_avg_rev', render_bargraph, ['weekly_product'],
+                    {'x_axis_column': 'product', 'y_axis_column': 'avg_order_rev', 'x_label_name': 'Product',
+                     'y_label_name': 'Average Revenue per order', 'title': 'Top Product By Average Revenue Per Order',
+                     'image_name': 'page_2_img_path2'},
+                    output_file=plot_file('top_products_avg_rev.png'), code_dependencies=PLOT_MODULES),
+              Stage('plot_product_sales_trend', render_sphagetti_graph, ['weekly_product'],
+                    {'key_column': 'product', 'value_column': 'total_orders', 'scale': 7, 'fill_value': 0,
+                     'highlight_column': 'C', 'y_label': 'Order Volume', 'x_label': 'Week',
+                     'title': 'Sales Trend by Product', 'image_name': 'page_2_img_path3'},
+                    output_file=plot_file('product_sales_trend.png'), code_dependencies=PLOT_MODULES),
+              Stage('plot_top_providers_avg_rev', render_bargraph, ['weekly_provider'],
+                    {'x_axis_column': 'provider', 'y_axis_column': 'avg_order_rev', 'x_label_name': 'Provider',
+                     'y_label_name': 'avg_order_rev', 'title': 'Top Provider By Average Revenue Per Order',
+                     'image_name': 'page_3_img_path1'},
+                    output_file=plot_file('top_providers_avg_rev.png'), code_dependencies=PLOT_MODULES),
+              Stage('plot_provider_revenue_trend', render_sphagetti_graph, ['weekly_provider'],
+                    {'key_column': 'provider', 'value_column': 'revenue', 'highlight_column': 'roadrunner',
+                     'y_label': 'Revenue', 'x_label': 'Week', 'title': 'Weekly Revenue trend by providers',
+                     'image_name': 'page_3_img_path2'},
+                    output_file=plot_file('provider_revenue_trend.png'), code_dependencies=PLOT_MODULES),
+
+              Stage('create_analytics_report', render_report,
+                    ['report_texts', 'plot_trend', 'plot_top_products', 'plot_top_products_avg_rev',
+                     'plot_product_sales_trend', 'plot_top_providers_avg_rev', 'plot_provider_revenue_trend'],
+                    output_file=output, code_dependencies=REPORT_MODULES)]
+
+    if vector_charts:
+        chart_stages = [Stage('plot_trend', create_line_chart, ['weekly_trend'],
+                              {'x_label': 'Week', 'y_label': 'Revenue', 'title': 'Overall Weekly Revenue trend'},
+                              code_dependencies=CHART_MODULES),
+                        Stage('plot_top_products', create_bar_chart, ['weekly_product'],
+                              {'x_axis_column': 'product', 'y_axis_column': 'revenue', 'x_label': 'Product',
+                               'y_label': 'Revenue', 'title': 'Top Product By Revenue'},
+                              code_dependencies=CHART_MODULES),
+                        Stage('plot_top_products_avg_rev', create_bar_chart, ['weekly_product'],
+                              {'x_axis_column': 'product', 'y_axis_column': 'avg_order_rev', 'x_label': 'Product',
+                               'y_label': 'Average Revenue per order',
+                               'title': 'Top Product By Average Revenue Per Order'},
+                              code_dependencies=CHART_MODULES),
+                        Stage('plot_top_providers_avg_rev', create_bar_chart, ['weekly_provider'],
+                              {'x_axis_column': 'provider', 'y_axis_column': 'avg_order_rev', 'x_label': 'Provider',
+                               'y_label': 'avg_order_rev', 'title': 'Top Provider By Average Revenue Per Order'},
+                              code_dependencies=CHART_MODULES)]
+        chart_stages = {stage.name: stage for stage in chart_stages}
+        stages = [chart_stages.get(stage.name, stage) for stage in stages]
+        # the chart stages and the report built from them are cached next to the rendered ones
+        for stage in stages:
+            if stage.name in chart_stages or stage.name=='create_analytics_report':
+                stage.variant = 'vector_charts'
+
+    return Pipeline(stages, cache_dir, max_workers)
+
+def main(argv:list = None)->int:
+    parser = argparse.ArgumentParser(prog='sales-report',
+                                     description='Create the sales analytics report. Stages whose inputs did '
+                                                 'not change since the last run are loaded from the cache.')
+    parser.add_argument('path', nargs='?', default=DEFAULT_DATASET, help='excel file of the commission dataset')
+    parser.add_argument('--sheet-name', default='data')
+    parser.add_argument('--output', default='analytics_report.pdf', help='path of the pdf report')
+    parser.add_argument('--plot-dir', default='plots', help='directory the plots are saved into')
+    parser.add_argument('--cache-dir', default='.pipeline_cache')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes, defaults to the cpu count')
+    parser.add_argument('--stages', nargs='+', default=None, help='only produce these stages and their inputs')
+    parser.add_argument('--force', action='store_true', help='ignore the cache')
+    parser.add_argument('--dry-run', action='store_true', help='only list which stages would run')
+    parser.add_argument('--vector-charts', action='store_true',
+                        help='draw the trend and bar plots as vector graphics in the report')
+    args = parser.parse_args(argv)
+
+    _init_pipeline_worker()
+    pipeline = create_report_pipeline(args.path, args.sheet_name, args.output, args.plot_dir,
+                                      args.cache_dir, args.workers, args.vector_charts)
+    pipeline.run(args.stages, force=args.force, dry_run=args.dry_run)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
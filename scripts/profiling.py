@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import tracemalloc
+import contextlib
+import pandas as pd
+
+# tracer of the current profiling session, None while profiling is disabled
+_active_tracer = None
+
+# tracemalloc.reset_peak is new in Python 3.9
+_HAS_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+class Tracer:
+    """
+    Collects one record per call of the functions decorated with instrument while
+    it is active(see enable_profiling). A record holds the wall time, the cpu time,
+    the peak memory allocated during the call, the number of rows of the first input
+    and of the output frame and the change of the number of open pyplot figures.
+    Nested calls are recorded as well, their depth is stored with the record.
+
+    Memory is traced with tracemalloc, which slows the instrumented code down and is
+    shared by all threads, so peak memory is only exact for single threaded runs.
+    Before Python 3.9 the peak can't be reset per call: a call that doesn't raise the
+    peak of the whole session records the growth of the traced memory instead, which
+    is a lower bound of its peak.
+
+    Args:
+        trace_memory:bool -> whether to record the peak memory of every call
+    """
+
+    def __init__(self, trace_memory:bool = True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.start_time = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    def _get_stack(self)->list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def start(self)->None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self)->None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def call(self, name:str, function, args:tuple, kwargs:dict):
+        """
+        Calls the function and records it. Exceptions are recorded and re-raised unchanged.
+        """
+        stack = self._get_stack()
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+
+        frame = {'start_memory': 0, 'peak_memory': 0}
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            frame = {'start_memory': current, 'peak_memory': current, 'start_peak': peak}
+            if _HAS_RESET_PEAK:
+                # the peak so far belongs to the caller, keep it before it is reset for this call
+                if stack:
+                    stack[-1]['peak_memory'] = max(stack[-1]['peak_memory'], peak)
+                tracemalloc.reset_peak()
+
+        stack.append(frame)
+        num_figures = get_num_open_figures()
+        error = None
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+
+        try:
+            result = function(*args, **kwargs)
+            return result
+        except BaseException as exception:
+            error = exception
+            result = None
+            raise
+        finally:
+            wall_time = time.perf_counter()-start_wall
+            cpu_time = time.process_time()-start_cpu
+            stack.pop()
+
+            peak_memory = None
+            if trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                if _HAS_RESET_PEAK:
+                    absolute_peak = max(peak, frame['peak_memory'])
+                    if stack:
+                        stack[-1]['peak_memory'] = max(stack[-1]['peak_memory'], absolute_peak)
+                else:
+                    absolute_peak = peak if peak>frame['start_peak'] else max(current, frame['start_memory'])
+                peak_memory = (absolute_peak-frame['start_memory'])/(1024*1024)
+
+            record = {'name': name,
+                      'start': start_wall-self.start_time,
+                      'wall_time': wall_time,
+                      'cpu_time': cpu_time,
+                      'peak_memory_mb': peak_memory,
+                      'rows_in': get_num_input_rows(args, kwargs),
+                      'rows_out': get_num_rows(result),
+                      'figures_delta': get_num_open_figures()-num_figures,
+                      'depth': len(stack),
+                      'pid': os.getpid(),
+                      'thread_id': threading.get_ident(),
+                      'error': None if error is None else repr(error)}
+
+            with self._lock:
+                self.records.append(record)
+
+    def get_records(self)->pd.core.frame.DataFrame:
+        """Returns the records as a dataframe in the order the calls started."""
+        with self._lock:
+            records = list(self.records)
+        return pd.DataFrame(records).sort_values('start', kind='stable').reset_index(drop=True) if records else pd.DataFrame()
+
+    def get_summary(self)->pd.core.frame.DataFrame:
+        """
+        Returns the number of calls, the total and mean wall time, the total cpu time
+        and the largest peak memory per instrumented function, slowest first.
+        """
+        records = self.get_records()
+        if records.empty:
+            return records
+
+        summary = records.groupby('name').agg(calls=('wall_time', 'size'),
+                                             wall_time=('wall_time', 'sum'),
+                                             mean_wall_time=('wall_time', 'mean'),
+                                             cpu_time=('cpu_time', 'sum'),
+                                             peak_memory_mb=('peak_memory_mb', 'max'),
+                                             errors=('error', 'count'))
+        return summary.sort_values('wall_time', ascending=False)
+
+    def to_json(self, path:str)->None:
+        """Writes the records as a JSON list."""
+        with self._lock:
+            records = list(self.records)
+        with open(path, 'w') as file:
+            json.dump(records, file, indent=2)
+
+    def to_chrome_trace(self, path:str)->None:
+        """
+        Writes the records in the Chrome trace event format, which can be opened in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        with self._lock:
+            records = list(self.records)
+
+        events = []
+        for record in records:
+            args = {key: value for key, value in record.items()
+                    if key not in ('name', 'start', 'wall_time', 'pid', 'thread_id')}
+            events.append({'name': record['name'],
+                           'cat': record['name'].split('.')[0],
+                           'ph': 'X',
+                           'ts': record['start']*1e6,
+                           'dur': record['wall_time']*1e6,
+                           'pid': record['pid'],
+                           'tid': record['thread_id'],
+                           'args': args})
+
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+def get_num_rows(value)->int:
+    """Returns the number of rows of a dataframe, series or array, else None."""
+    if isinstance(value, (pd.core.frame.DataFrame, pd.core.series.Series)):
+        return len(value)
+    shape = getattr(value, 'shape', None)
+    return shape[0] if shape else None
+
+def get_num_input_rows(args:tuple, kwargs:dict)->int:
+    """Returns the number of rows of the first dataframe or series argument, else None."""
+    for value in list(args)+list(kwargs.values()):
+        if isinstance(value, (pd.core.frame.DataFrame, pd.core.series.Series)):
+            return len(value)
+    return None
+
+def get_num_open_figures()->int:
+    """
+    Returns the number of figures registered in pyplot, 0 if pyplot was never imported.
+    """
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    return len(pyplot.get_fignums()) if pyplot else 0
+
+def instrument(function=None, name:str = None):
+    """
+    Decorator recording every call of the function in the active tracer. Without an
+    active tracer the function is called directly. Can be used as @instrument or
+    @instrument(name='...'), the name defaults to <module>.<qualified name>.
+
+    Args:
+        function:function
+        name:str
+    """
+    if function is None:
+        return functools.partial(instrument, name=name)
+
+    record_name = name or '{}.{}'.format(function.__module__.split('.')[-1], function.__qualname__)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tracer = _active_tracer
+        if tracer is None:
+            return function(*args, **kwargs)
+        return tracer.call(record_name, function, args, kwargs)
+
+    return wrapper
+
+def enable_profiling(trace_memory:bool = True)->Tracer:
+    """
+    Starts a profiling session and returns its tracer. A running session is stopped first.
+
+    Args:
+        trace_memory:bool -> whether to record the peak memory of every call
+    """
+    global _active_tracer
+    disable_profiling()
+    _active_tracer = Tracer(trace_memory)
+    _active_tracer.start()
+    return _active_tracer
+
+def disable_profiling()->Tracer:
+    """Stops the profiling session and returns its tracer(None if none was running)."""
+    global _active_tracer
+    tracer, _active_tracer = _active_tracer, None
+    if tracer is not None:
+        tracer.stop()
+    return tracer
+
+def get_active_tracer()->Tracer:
+    """Returns the tracer of the running profiling session, None if profiling is disabled."""
+    return _active_tracer
+
+@contextlib.contextmanager
+def profiling(trace_memory:bool = True, json_path:str = None, chrome_trace_path:str = None):
+    """
+    Profiles the calls inside the with block and optionally exports the trace afterwards,
+    i.e.
+
+        with profiling(chrome_trace_path='report_trace.json') as tracer:
+            PDF().create_analytics_report()
+        print(tracer.get_summary())
+
+    Args:
+        trace_memory:bool
+        json_path:str         -> write the records as JSON
+        chrome_trace_path:str -> write the records in the Chrome trace event format
+    """
+    tracer = enable_profiling(trace_memory)
+    try:
+        yield tracer
+    finally:
+        disable_profiling()
+        if json_path:
+            tracer.to_json(json_path)
+        if chrome_trace_path:
+            tracer.to_chrome_trace(chrome_trace_path)
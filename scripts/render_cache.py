@@ -0,0 +1,175 @@
+import os
+import sys
+import shutil
+import hashlib
+import pandas as pd
+
+from scripts.batch_render import get_plot_output_path
+from scripts.utils import _get_file_content_hash
+
+class RenderCache:
+    """
+    Content-addressed cache of the images rendered by scripts.visualization. The
+    cache key is a hash of the plot function name, the source of its module, the
+    contents of the input frames and the other plotting parameters, so editing
+    the plot code invalidates the images rendered by it. On a hit the stored image is copied
+    (or hard linked) to the output path instead of calling matplotlib. The cache
+    is capped at max_bytes and evicts the least recently used images first.
+
+    Args:
+        cache_dir:str -> directory of the cached images
+        max_bytes:int -> size cap of the cache directory
+        link:bool     -> whether to hard link cached images instead of copying them
+    """
+
+    def __init__(self, cache_dir:str = '.render_cache', max_bytes:int = 256*1024*1024, link:bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _update_hash(digest, value)->None:
+        """
+        Adds the value to the hash. Frames and series are hashed by content, index,
+        column names and dtypes.
+        """
+        if isinstance(value, (pd.core.frame.DataFrame, pd.core.series.Series)):
+            digest.update(type(value).__name__.encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+            if isinstance(value, pd.core.frame.DataFrame):
+                digest.update(repr(list(value.columns)).encode('utf-8'))
+                digest.update(repr(list(value.dtypes.astype(str))).encode('utf-8'))
+            else:
+                digest.update(repr((value.name, str(value.dtype))).encode('utf-8'))
+            digest.update(repr(value.index.names).encode('utf-8'))
+        elif isinstance(value, dict):
+            for key in sorted(value, key=repr):
+                digest.update(repr(key).encode('utf-8'))
+                RenderCache._update_hash(digest, value[key])
+        else:
+            digest.update(repr(value).encode('utf-8'))
+
+    def get_key(self, function, kwargs:dict)->str:
+        """
+        Returns the cache key of a plot function call.
+
+        Args:
+            function:function -> plot function
+            kwargs:dict       -> keyword arguments of the plot function
+        """
+        digest = hashlib.sha256('{}.{}'.format(function.__module__, function.__qualname__).encode('utf-8'))
+
+        module_path = getattr(sys.modules.get(function.__module__), '__file__', None)
+        if module_path and os.path.isfile(module_path):
+            digest.update(_get_file_content_hash(module_path).encode('utf-8'))
+
+        self._update_hash(digest, kwargs)
+        return digest.hexdigest()
+
+    def _get_entries(self)->list:
+        entries = [os.path.join(self.cache_dir, file_name) for file_name in os.listdir(self.cache_dir)]
+        return [entry for entry in entries if os.path.isfile(entry)]
+
+    def get_size(self)->int:
+        """Returns the total size of the cached images in bytes."""
+        return sum(os.path.getsize(entry) for entry in self._get_entries())
+
+    def _evict(self)->None:
+        """
+        Removes the least recently used images until the cache fits into max_bytes.
+        """
+        entries = sorted(self._get_entries(), key=os.path.getmtime)
+        total_bytes = sum(os.path.getsize(entry) for entry in entries)
+
+        for entry in entries:
+            if total_bytes<=self.max_bytes:
+                break
+            total_bytes -= os.path.getsize(entry)
+            os.remove(entry)
+
+    def _place(self, source:str, destination:str)->None:
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        if os.path.exists(destination):
+            os.remove(destination)
+
+        if self.link:
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, destination)
+
+    @staticmethod
+    def _read(path:str)->bytes:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def render(self, function, **kwargs):
+        """
+        Renders the plot through the cache and returns its output path, or the png
+        bytes if return_bytes is set. Calls without save_path are passed to the plot
+        function directly.
+
+        Args:
+            function:str or function -> plot function(or its name) of scripts.visualization
+            kwargs                   -> keyword arguments of the plot function
+
+        Returns:
+            output_path:str or image:bytes
+        """
+        try:
+            if isinstance(function, str):
+                from scripts import visualization
+                function = getattr(visualization, function)
+
+            return_bytes = kwargs.get('return_bytes', False)
+
+            output_path = get_plot_output_path(function, kwargs)
+            if output_path is None:
+                self.misses += 1
+                image = function(**kwargs)
+                return image if return_bytes else None
+
+            extension = os.path.splitext(output_path)[1]
+            entry = os.path.join(self.cache_dir, self.get_key(function, kwargs) + extension)
+
+            if os.path.exists(entry):
+                self.hits += 1
+                # mark the entry as recently used
+                os.utime(entry)
+                self._place(entry, output_path)
+                return self._read(entry) if return_bytes else output_path
+
+            self.misses += 1
+            # a previous hit may have linked output_path to a cache entry, rendering into
+            # it would overwrite the image cached under the other key
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+            image = function(**kwargs)
+
+            temp_entry = entry + '.tmp'
+            shutil.copyfile(output_path, temp_entry)
+            os.replace(temp_entry, entry)
+            self._evict()
+
+            return image if return_bytes else output_path
+
+        except Exception as error:
+            raise Exception('Caught this error: ' + repr(error)) from error
+
+    def get_stats(self)->dict:
+        """Returns the hit and miss counters and the current cache size."""
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'num_entries': len(self._get_entries()),
+                'bytes': self.get_size()}
+
+    def clear(self)->None:
+        """Removes every cached image and resets the counters."""
+        for entry in self._get_entries():
+            os.remove(entry)
+        self.hits = self.misses = 0
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from scripts.utils import read_xlsx
+
+# column name -> kind of the column in the commission dataset
+# datetime: parsed once with pd.to_datetime
+# category: pandas categorical
+# integer:  smallest signed integer type holding every value
+# count:    like integer but at least int32, as counts are multiplied row by row(i.e. order_count*rate)
+# float:    float32 if every value and the running sum of the column survive the round trip
+#           within the tolerance, else float64
+COMMISSION_SCHEMA = {'order_date': 'datetime',
+                     'product': 'category',
+                     'provider': 'category',
+                     'order_count': 'count',
+                     'revenue': 'float',
+                     'hour': 'integer',
+                     'dayofweek': 'integer',
+                     'month': 'integer',
+                     'week': 'integer',
+                     'year': 'integer'}
+
+def coerce_column(series:pd.core.series.Series,
+                  kind:str,
+                  float_tolerance:float=0.005)->pd.core.series.Series:
+    """
+    This function converts the column to the compact dtype of the given kind.
+    Integer columns with missing values are left unchanged.
+
+    Args:
+        series:pd.core.series.Series
+        kind:str              -> one of datetime, category, integer, count, float
+        float_tolerance:float -> largest absolute error allowed by float32
+    """
+    if kind=='datetime':
+        return series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_datetime(series)
+
+    elif kind=='category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+
+    elif kind in ('integer', 'count'):
+        if series.isna().any():
+            return series
+        series = pd.to_numeric(series, downcast='integer')
+        if kind=='count' and series.dtype.itemsize<4:
+            series = series.astype('int32')
+        return series
+
+    elif kind=='float':
+        values = series.to_numpy(dtype='float64')
+        float32_values = values.astype('float32')
+        # sums of a float32 column are accumulated in float32 as well, so the running sum
+        # has to stay within the tolerance too, not only every single value
+        sum_error = np.abs(np.nancumsum(float32_values, dtype='float32')-np.nancumsum(values))
+        if np.allclose(float32_values, values, rtol=0, atol=float_tolerance, equal_nan=True) \
+           and not (sum_error>float_tolerance).any():
+            return pd.Series(float32_values, index=series.index, name=series.name)
+        return series.astype('float64')
+
+    else:
+        raise ValueError("Unknown column kind '{}'.".format(kind))
+
+def get_memory_usage_report(df_before:pd.core.frame.DataFrame,
+                            df_after:pd.core.frame.DataFrame)->pd.core.frame.DataFrame:
+    """
+    This function returns the dtype and deep memory usage in bytes of every column
+    before and after the coercion, together with a total row.
+
+    Args:
+        df_before:pd.core.frame.DataFrame
+        df_after:pd.core.frame.DataFrame
+    """
+    report = pd.DataFrame({'dtype_before': df_before.dtypes.astype(str),
+                           'dtype_after': df_after.dtypes.astype(str),
+                           'bytes_before': df_before.memory_usage(index=False, deep=True),
+                           'bytes_after': df_after.memory_usage(index=False, deep=True)})
+    report.loc['total'] = ['', '', report['bytes_before'].sum(), report['bytes_after'].sum()]
+    report['reduction(%)'] = (100-report['bytes_after']*100/report['bytes_before']).round(1)
+    return report
+
+def coerce_schema(df:pd.core.frame.DataFrame,
+                  schema:dict = COMMISSION_SCHEMA,
+                  float_tolerance:float = 0.005,
+                  print_report:bool = False)->pd.core.frame.DataFrame:
+    """
+    This function coerces the columns of the dataframe declared in the schema to
+    their compact dtypes and returns the coerced copy. Columns not declared in the
+    schema are left unchanged.
+
+    Args:
+        df:pd.core.frame.DataFrame
+        schema:dict           -> column name to kind mapping(see COMMISSION_SCHEMA)
+        float_tolerance:float -> largest absolute error allowed by float32
+        print_report:bool     -> whether to print the before/after memory usage
+    """
+    try:
+        df_coerced = df.copy(deep=False)
+
+        for column, kind in schema.items():
+            if column in df_coerced:
+                df_coerced[column] = coerce_column(df_coerced[column], kind, float_tolerance)
+
+        if print_report:
+            print(get_memory_usage_report(df, df_coerced))
+
+        return df_coerced
+
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def read_commission_dataset(path:str,
+                            sheet_name:str = 'data',
+                            cache_dir:str = None,
+                            print_report:bool = False)->pd.core.frame.DataFrame:
+    """
+    Reads the commission dataset with utils.read_xlsx and coerces it to
+    COMMISSION_SCHEMA.
+
+    Args:
+        path:str -> Path of the excel file
+        sheet_name:str -> Sheet name in the excel
+        cache_dir:str -> see utils.read_xlsx
+        print_report:bool -> whether to print the before/after memory usage
+    """
+    return coerce_schema(read_xlsx(path, sheet_name, cache_dir), print_report=print_report)
@@ -0,0 +1,429 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.utils import read_xlsx, resolve_converted_wide_table_index_issue
+from scripts.aggregate_store import AggregateStore, AGGREGATE_TABLES
+from scripts.commission import calculate_commissions
+
+KPI_NAMES = ['avg_orders_per_week',
+             'avg_revenue_per_week',
+             'avg_revenue_per_order',
+             'most_desirable_product',
+             'most_proactive_provider',
+             'monthly_gross_margin']
+
+PLOT_NAMES = ['weekly_revenue_trend',
+              'top_products',
+              'top_providers',
+              'product_sales_trend',
+              'provider_revenue_trend',
+              'monthly_gross_margin']
+
+BAR_METRICS = ['revenue', 'total_orders', 'avg_order_rev']
+MONTHLY_KEY_COLUMNS = AGGREGATE_TABLES['monthly_product_provider'][0]
+BAR_COLORS = ['#00876c', '#66ad75', '#b1d081', '#fff197']
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class LRUCache:
+    """
+    Least recently used cache of the rendered responses.
+
+    Args:
+        max_entries:int
+    """
+
+    def __init__(self, max_entries:int = 256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached value of the key, None on a miss."""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value)->None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries)>self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self)->None:
+        self.entries.clear()
+
+    def __len__(self)->int:
+        return len(self.entries)
+
+class BadRequest(ValueError):
+    """Invalid query parameters, answered with status 400."""
+
+def _get_choice(params:dict, name:str, choices:list, default:str)->str:
+    value = params.get(name, default)
+    if value not in choices:
+        raise BadRequest("'{}' must be one of {}, got '{}'.".format(name, choices, value))
+    return value
+
+def _to_json(value)->bytes:
+    def convert(item):
+        if isinstance(item, np.generic):
+            return item.item()
+        raise TypeError("Object of type {} is not JSON serializable".format(type(item).__name__))
+
+    return json.dumps(value, default=convert, allow_nan=False).encode('utf-8')
+
+class SalesAnalytics:
+    """
+    Warm state of the server: the dataset is read once into an in-memory AggregateStore
+    and the KPIs and plots are derived from the stored aggregates. All methods have to
+    be called from the same thread, the thread the store was loaded in.
+
+    Args:
+        path:str       -> Path of the excel file
+        sheet_name:str -> Sheet name in the excel
+        cache_dir:str  -> see utils.read_xlsx
+    """
+
+    def __init__(self, path:str, sheet_name:str = 'data', cache_dir:str = None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.cache_dir = cache_dir
+        self.store = None
+        self.version = 0
+        self.source_state = None
+        self.num_rows = 0
+        self.loaded_at = None
+
+    def get_source_state(self)->tuple:
+        """Returns the modification time and size of the source file."""
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def has_changed(self)->bool:
+        """Returns whether the source file changed since it was loaded."""
+        try:
+            return self.get_source_state()!=self.source_state
+        except OSError:
+            return False
+
+    def load(self)->None:
+        """(Re)loads the source file. The previous state stays in use if reading fails."""
+        source_state = self.get_source_state()
+        data = read_xlsx(self.path, self.sheet_name, self.cache_dir)
+
+        store = AggregateStore(':memory:')
+        store.append(data)
+
+        if self.store is not None:
+            self.store.close()
+        self.store = store
+        self.source_state = source_state
+        self.num_rows = len(data)
+        self.loaded_at = time.time()
+        self.version += 1
+
+    def get_info(self)->dict:
+        return {'path': self.path,
+                'sheet_name': self.sheet_name,
+                'rows': self.num_rows,
+                'version': self.version,
+                'loaded_at': self.loaded_at}
+
+    def get_monthly_gross_margin(self, params:dict)->pd.core.frame.DataFrame:
+        """
+        Returns the monthly gross margin(%) per product and provider of Answer 03.ipynb,
+        filtered by the product, provider, year and month params and summed up to the
+        comma separated group_by columns if given.
+        """
+        df = self.store.get_table('monthly_product_provider').drop(columns='avg_order_rev')
+        df['commision'] = calculate_commissions(df['provider'], df['order_count'])
+
+        for column in MONTHLY_KEY_COLUMNS:
+            if column in params:
+                value = params[column]
+                if column in ('year', 'month'):
+                    if not value.isdigit():
+                        raise BadRequest("'{}' must be an integer, got '{}'.".format(column, value))
+                    value = int(value)
+                df = df[df[column]==value]
+
+        group_by = [column for column in params.get('group_by', '').split(',') if column]
+        unknown_columns = set(group_by)-set(MONTHLY_KEY_COLUMNS)
+        if unknown_columns:
+            raise BadRequest("'group_by' columns must be in {}, got {}.".format(MONTHLY_KEY_COLUMNS, sorted(unknown_columns)))
+        if group_by:
+            df = df.groupby(group_by, sort=True)[['order_count', 'revenue', 'commision']].sum().reset_index()
+
+        df['gross_margin(%)'] = (df['revenue']-df['commision'])*100/df['revenue'].where(df['revenue']!=0)
+        return df
+
+    def get_kpi(self, name:str, params:dict):
+        """Returns the KPI of Answer 2_Sales Analysis.ipynb or Answer 03.ipynb as a JSON value."""
+        if name=='avg_orders_per_week':
+            return self.store.get_avg_orders_per_week()
+        elif name=='avg_revenue_per_week':
+            return self.store.get_avg_revenue_per_week()
+        elif name=='avg_revenue_per_order':
+            return self.store.get_avg_revenue_per_order()
+        elif name=='most_desirable_product':
+            product, orders = self.store.get_most_desirable_product() or (None, None)
+            return {'product': product, 'avg_weekly_orders': orders}
+        elif name=='most_proactive_provider':
+            provider, orders = self.store.get_most_proactive_provider() or (None, None)
+            return {'provider': provider, 'avg_weekly_orders': orders}
+        elif name=='monthly_gross_margin':
+            df = self.get_monthly_gross_margin(params)
+            return df.astype(object).where(df.notna(), None).to_dict('records')
+        raise KeyError(name)
+
+    def render_plot(self, name:str, params:dict)->bytes:
+        """Renders the chart with scripts.visualization and returns the png."""
+        from scripts import visualization
+
+        plot_kwargs = {'headless': True, 'return_bytes': True}
+
+        if name=='weekly_revenue_trend':
+            trend = self.store.get_table('weekly_product').groupby('week')['revenue'].sum()
+            return visualization.plot_line_graph(trend, x_label='Revenue', y_label='Week', trend_label='Weekly',
+                                                 title='Overall Weekly Revenue trend', **plot_kwargs)
+
+        if name in ('top_products', 'top_providers'):
+            column = 'product' if name=='top_products' else 'provider'
+            metric = _get_choice(params, 'metric', BAR_METRICS, 'revenue')
+            df = self.store.get_table('weekly_'+column)
+            color_dict = {value: BAR_COLORS[index%len(BAR_COLORS)] for index, value in enumerate(df[column].unique())}
+            return visualization.plot_bargraph(df, column, metric, x_label_name=column.capitalize(), y_label_name=metric,
+                                               title='Top {} By {}'.format(column.capitalize(), metric),
+                                               color_dict=color_dict, fast=True, **plot_kwargs)
+
+        if name in ('product_sales_trend', 'provider_revenue_trend'):
+            column, value_column, scale = ('product', 'total_orders', 7) if name=='product_sales_trend' \
+                                          else ('provider', 'revenue', 1)
+            df = self.store.get_table('weekly_'+column)
+            wide_df = df.pivot_table(index='week', columns=column, values=value_column, aggfunc='sum').fillna(0)/scale
+            highlight = params.get('highlight', wide_df.sum().idxmax())
+            if highlight not in wide_df.columns:
+                raise BadRequest("'highlight' must be one of {}, got '{}'.".format(list(wide_df.columns), highlight))
+            return visualization.plot_highlighted_sphagetti_graph(resolve_converted_wide_table_index_issue(wide_df),
+                                                                  highlight_column=highlight,
+                                                                  y_label='Order Volume' if scale!=1 else 'Revenue',
+                                                                  x_label='Week',
+                                                                  title=name.replace('_', ' ').capitalize(),
+                                                                  **plot_kwargs)
+
+        if name=='monthly_gross_margin':
+            x_axis_column = _get_choice(params, 'x', ['product', 'provider', 'month'], 'month')
+            hue = params.get('hue')
+            if hue is not None:
+                hue = _get_choice(params, 'hue', ['product', 'provider', 'month'], hue)
+            df = self.get_monthly_gross_margin({key: value for key, value in params.items() if key!='group_by'})
+            return visualization.plot_bargraph(df, x_axis_column, 'gross_margin(%)', hue_column_name=hue,
+                                               x_label_name=x_axis_column.capitalize(), y_label_name='gross_margin(%)',
+                                               title='Monthly Gross margin(%)', fast=True, **plot_kwargs)
+
+        raise KeyError(name)
+
+class AnalyticsServer:
+    """
+    Local asyncio HTTP server of the sales KPIs and charts. The dataset is loaded once
+    and reloaded in the background as soon as the source file changes. Responses are
+    kept in an LRU cache keyed by the dataset version, the path and the query params.
+    The dataset is only touched from a single worker thread, so requests never block
+    the event loop and never see a half loaded dataset.
+
+    Endpoints(GET):
+        /                        -> dataset info and endpoint list
+        /kpi                     -> every KPI except monthly_gross_margin
+        /kpi/<name>              -> see KPI_NAMES, monthly_gross_margin accepts product,
+                                    provider, year, month and group_by(comma separated)
+        /plot/<name>             -> png, see PLOT_NAMES. top_* accept metric, *_trend accept
+                                    highlight, monthly_gross_margin accepts x, hue and the filters
+
+    Args:
+        path:str              -> Path of the excel file
+        sheet_name:str
+        host:str
+        port:int              -> 0 picks a free port(see self.port after start)
+        cache_size:int        -> number of cached responses
+        reload_interval:float -> seconds between checks of the source file, 0 disables hot reload
+        cache_dir:str         -> see utils.read_xlsx
+    """
+
+    def __init__(self,
+                 path:str,
+                 sheet_name:str = 'data',
+                 host:str = '127.0.0.1',
+                 port:int = 8000,
+                 cache_size:int = 256,
+                 reload_interval:float = 1.0,
+                 cache_dir:str = None):
+
+        self.analytics = SalesAnalytics(path, sheet_name, cache_dir)
+        self.host = host
+        self.port = port
+        self.cache = LRUCache(cache_size)
+        self.reload_interval = reload_interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics')
+        self.server = None
+        self.watcher = None
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def start(self)->None:
+        """Loads the dataset and starts listening."""
+        await self._run(self.analytics.load)
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.reload_interval:
+            self.watcher = asyncio.ensure_future(self._watch_source())
+
+    async def stop(self)->None:
+        if self.watcher is not None:
+            self.watcher.cancel()
+            try:
+                await self.watcher
+            except asyncio.CancelledError:
+                pass
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def serve_forever(self)->None:
+        await self.start()
+        print('Serving {} on http://{}:{}'.format(self.analytics.path, self.host, self.port), flush=True)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def reload(self)->None:
+        """Reloads the dataset and drops the cached responses."""
+        await self._run(self.analytics.load)
+        self.cache.clear()
+
+    async def _watch_source(self)->None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if await self._run(self.analytics.has_changed):
+                try:
+                    await self.reload()
+                    print('Reloaded {} (version {})'.format(self.analytics.path, self.analytics.version), flush=True)
+                except Exception as error:
+                    # keep serving the previous version, i.e. while the file is still being written
+                    print('Reloading {} failed: {!r}'.format(self.analytics.path, error), flush=True)
+
+    def _get_response(self, route:str, name:str, params:dict)->tuple:
+        """Computes the response of a request in the worker thread."""
+        if route=='kpi' and name is None:
+            return 'application/json', _to_json({kpi: self.analytics.get_kpi(kpi, params)
+                                                 for kpi in KPI_NAMES if kpi!='monthly_gross_margin'})
+        if route=='kpi':
+            return 'application/json', _to_json({name: self.analytics.get_kpi(name, params)})
+        return 'image/png', self.analytics.render_plot(name, params)
+
+    async def handle_request(self, method:str, target:str)->tuple:
+        """
+        Answers a request and returns (status, content type, body, headers).
+        """
+        if method not in ('GET', 'HEAD'):
+            return self._error(405, 'Only GET requests are supported.')
+
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+
+        if not parts:
+            info = dict(self.analytics.get_info(), kpis=KPI_NAMES, plots=PLOT_NAMES,
+                        cache={'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses})
+            return 200, 'application/json', _to_json(info), {}
+
+        route, name = parts[0], (parts[1] if len(parts)>1 else None)
+        known = (route=='kpi' and len(parts)<=2 and (name is None or name in KPI_NAMES)) or \
+                (route=='plot' and len(parts)==2 and name in PLOT_NAMES)
+        if not known:
+            return self._error(404, "Unknown endpoint '{}'.".format(url.path))
+
+        key = (self.analytics.version, url.path, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return 200, cached[0], cached[1], {'X-Cache': 'hit'}
+
+        try:
+            content_type, body = await self._run(self._get_response, route, name, params)
+        except BadRequest as error:
+            return self._error(400, str(error))
+        except Exception as error:
+            return self._error(500, repr(error))
+
+        self.cache.put(key, (content_type, body))
+        return 200, content_type, body, {'X-Cache': 'miss'}
+
+    @staticmethod
+    def _error(status:int, message:str)->tuple:
+        return status, 'application/json', _to_json({'error': message}), {}
+
+    async def _handle_connection(self, reader, writer)->None:
+        try:
+            try:
+                request = await reader.readuntil(b'\r\n\r\n')
+                method, target, _ = request.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                status, content_type, body, headers = self._error(400, 'Malformed request.')
+                method = 'GET'
+            else:
+                status, content_type, body, headers = await self.handle_request(method, target)
+
+            header_lines = ['HTTP/1.1 {} {}'.format(status, HTTP_REASONS.get(status, '')),
+                            'Content-Type: {}'.format(content_type),
+                            'Content-Length: {}'.format(len(body)),
+                            'Connection: close']
+            header_lines += ['{}: {}'.format(key, value) for key, value in headers.items()]
+            writer.write(('\r\n'.join(header_lines)+'\r\n\r\n').encode('latin-1'))
+            if method!='HEAD':
+                writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def main(argv:list = None)->int:
+    parser = argparse.ArgumentParser(description='Serve the sales KPIs and charts of a commission dataset.')
+    parser.add_argument('path', help='excel file of the commission dataset')
+    parser.add_argument('--sheet-name', default='data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=256, help='number of cached responses')
+    parser.add_argument('--reload-interval', type=float, default=1.0,
+                        help='seconds between checks of the source file, 0 disables hot reload')
+    parser.add_argument('--cache-dir', default=None, help='columnar cache of the workbook(see utils.read_xlsx)')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    server = AnalyticsServer(args.path, args.sheet_name, args.host, args.port,
+                             args.cache_size, args.reload_interval, args.cache_dir)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,177 @@
 import os
+import hashlib
 import pandas as pd
 
-def read_xlsx(path:str, sheet_name:str)->pd.core.frame.DataFrame:
+from scripts.profiling import instrument
+
+def _get_file_content_hash(path:str, block_size:int=1<<20)->str:
+    """
+    Returns the sha256 hex digest of the file content.
+    
+    Args:
+        path:str       -> Path of the file
+        block_size:int -> Number of bytes read at a time
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _get_xlsx_cache_path(path:str, sheet_name:str, cache_dir:str)->tuple:
+    """
+    Returns the cache file path of the given sheet together with the prefix
+    shared by every cached version of that sheet. The file name is keyed by the
+    source path, sheet name, modification time and content hash, so a changed
+    workbook never maps to a stale cache file.
+    
+    Args:
+        path:str       -> Path of the excel file
+        sheet_name:str -> Sheet name in the excel
+        cache_dir:str  -> Directory of the cached columnar files
+    
+    Returns:
+        cache_path:str
+        source_prefix:str
+    """
+    source_key = '{}::{}'.format(os.path.abspath(path), sheet_name)
+    source_prefix = hashlib.sha256(source_key.encode('utf-8')).hexdigest()[:16]
+    
+    version_key = '{}::{}::{}'.format(source_key, 
+                                      os.stat(path).st_mtime_ns, 
+                                      _get_file_content_hash(path))
+    version = hashlib.sha256(version_key.encode('utf-8')).hexdigest()[:16]
+    
+    return os.path.join(cache_dir, f'{source_prefix}-{version}.feather'), source_prefix
+
+@instrument
+def read_xlsx(path:str, sheet_name:str, cache_dir:str = None)->pd.core.frame.DataFrame:
     """
     Reads and returns the excel file as dataframe from the 
     provided path.
     
+    If cache_dir is given, the first read stores the sheet as an uncompressed
+    Feather(Arrow IPC) file in that directory and later reads load it memory-mapped
+    instead of parsing the workbook again. Cached versions of a sheet are replaced
+    as soon as the workbook changes. Requires pyarrow.
+    
     Args:
         path:str -> Path of the dataframe
         sheet_name:str -> Sheet name in the excel
+        cache_dir:str -> Directory to store the columnar cache in
+    """
+    try:
+        if not cache_dir:
+            return pd.read_excel(path, sheet_name = sheet_name)
+        
+        from pyarrow import feather
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path, source_prefix = _get_xlsx_cache_path(path, sheet_name, cache_dir)
+        
+        if os.path.exists(cache_path):
+            return feather.read_table(cache_path, memory_map=True).to_pandas()
+        
+        df = pd.read_excel(path, sheet_name = sheet_name)
+        
+        # write to a temporary file first so that an interrupted run never leaves a broken cache
+        temp_path = cache_path + '.tmp'
+        feather.write_feather(df, temp_path, compression='uncompressed')
+        os.replace(temp_path, cache_path)
+        
+        # remove cached versions of the workbook which are outdated now
+        for file_name in os.listdir(cache_dir):
+            file_path = os.path.join(cache_dir, file_name)
+            if file_name.startswith(source_prefix + '-') and file_path != cache_path:
+                os.remove(file_path)
+        
+        return df
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def _apply_schema(df:pd.core.frame.DataFrame, schema:dict)->pd.core.frame.DataFrame:
+    """
+    Casts the columns of the dataframe to the declared dtypes and returns it.
+    Datetime dtypes are parsed with pd.to_datetime.
+    
+    Args:
+        df:pd.core.frame.DataFrame
+        schema:dict -> column name to dtype mapping
+    """
+    for column, dtype in schema.items():
+        if str(dtype).startswith('datetime'):
+            df[column] = pd.to_datetime(df[column])
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def iter_xlsx_chunks(path:str, 
+                     sheet_name:str, 
+                     chunksize:int=100000,
+                     schema:dict=None):
+    """
+    Reads the excel sheet in openpyxl read-only mode and yields it as dataframe
+    chunks, so only one chunk of rows is held in memory at a time. The first row
+    of the sheet is used as header.
+    
+    Args:
+        path:str       -> Path of the excel file
+        sheet_name:str -> Sheet name in the excel
+        chunksize:int  -> Maximum number of rows per chunk
+        schema:dict    -> column name to dtype mapping applied to every chunk
+    
+    Yields:
+        chunk:pd.core.frame.DataFrame
     """
     try:
-        return pd.read_excel(path, sheet_name = sheet_name)
+        if chunksize<1:
+            raise ValueError("chunksize must be a positive integer.")
+        
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        
+        try:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            columns = next(rows, None)
+            
+            if columns is None:
+                return
+            
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                
+                if len(buffer)==chunksize:
+                    chunk = pd.DataFrame.from_records(buffer, columns=columns)
+                    buffer = []
+                    yield _apply_schema(chunk, schema) if schema else chunk
+            
+            if buffer:
+                chunk = pd.DataFrame.from_records(buffer, columns=columns)
+                yield _apply_schema(chunk, schema) if schema else chunk
+        finally:
+            workbook.close()
+            
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def get_wide_column(series:pd.core.series.Series)->pd.core.series.Series:
+    """
+    Returns integer columns as int64 and float columns as float64, other columns
+    unchanged. Sums of compact columns(see schema.coerce_schema) keep the dtype of
+    the column and would overflow or lose precision otherwise.
+    
+    Args:
+        series:pd.core.series.Series
+    """
+    if pd.api.types.is_integer_dtype(series) and series.dtype!='int64':
+        return series.astype('int64')
+    elif pd.api.types.is_float_dtype(series) and series.dtype!='float64':
+        return series.astype('float64')
+    return series
 
+@instrument
 def extract_date_features(df:pd.core.frame.DataFrame,
                           date_column:str='datetime',
                           feature_name:str='hour')->list:
@@ -22,12 +179,21 @@ def extract_date_features(df:pd.core.frame.DataFrame,
     Extract date features(i.e. hour, month, week, dayofweek) and returns
     as a list to store as a new column. 
     
+    If an iterator of dataframe chunks(i.e. from iter_xlsx_chunks) is given
+    instead of a dataframe, returns a generator yielding each chunk with the
+    feature stored as a new column named after feature_name.
+    
     Args:
         df:pd.core.frame.DataFrame
         date_column_name:str
-        feature_name:str -> (i.e. hour, month, week, dayofweek)
+        feature_name:str -> (i.e. hour, month, week, dayofweek, iso_year)
     
+    The week is the ISO week, iso_year is the ISO year it belongs to, which differs
+    from the calendar year for the first and last days of some years.
     """
+    if not isinstance(df, pd.core.frame.DataFrame):
+        return _iter_date_features(df, date_column, feature_name)
+    
     try:
         df[date_column] = pd.to_datetime(df[date_column])
 
@@ -41,11 +207,93 @@ def extract_date_features(df:pd.core.frame.DataFrame,
             return df[date_column].dt.month
         elif feature_name=='week':
             return df[date_column].dt.isocalendar().week.astype("int64")
+        elif feature_name=='iso_year':
+            return df[date_column].dt.isocalendar().year.astype("int64")
         else:
             raise NotImplementedError
             
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def _iter_date_features(chunks, date_column:str, feature_name:str):
+    """
+    Generator behind extract_date_features for dataframe chunks.
+    """
+    for chunk in chunks:
+        chunk[feature_name] = extract_date_features(chunk, date_column, feature_name)
+        yield chunk
+    
+DATE_FEATURE_DTYPES = {'hour':'int8',
+                       'dayofweek':'int8',
+                       'month':'int8',
+                       'week':'int8',
+                       'year':'int16',
+                       'iso_year':'int16'}
+
+@instrument
+def extract_multiple_date_features(df:pd.core.frame.DataFrame,
+                                   date_column:str='datetime',
+                                   feature_names:tuple=('month', 'year', 'dayofweek', 'week'))->pd.core.frame.DataFrame:
+    """
+    Extract several date features(i.e. hour, month, week, dayofweek, year, iso_year) in one pass and
+    returns them as a dataframe of compact integer columns(int8/int16) with the index of
+    the given dataframe. The date column is parsed only once and the given dataframe
+    is left unchanged. If a date is missing(NaT), the nullable Int8/Int16 dtypes are used
+    and its features are <NA>.
+    
+    If an iterator of dataframe chunks is given, returns a generator yielding each chunk
+    with the features joined as new columns.
+    
+    Args:
+        df:pd.core.frame.DataFrame
+        date_column:str
+        feature_names:tuple -> (i.e. hour, month, week, dayofweek, year, iso_year), week is the
+                               ISO week and iso_year the ISO year it belongs to
+    
+    Returns:
+        df_features:pd.core.frame.DataFrame -> one column per feature name
+    """
+    if not isinstance(df, pd.core.frame.DataFrame):
+        return _iter_multiple_date_features(df, date_column, feature_names)
+    
+    try:
+        unknown_features = [name for name in feature_names if name not in DATE_FEATURE_DTYPES]
+        if unknown_features:
+            raise ValueError("Unknown date features {}, valid features are {}.".format(
+                                unknown_features, list(DATE_FEATURE_DTYPES)))
+        
+        dates = df[date_column]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        has_missing_dates = dates.isna().any()
+        
+        features = {}
+        iso_calendar = None
+        for feature_name in feature_names:
+            if feature_name in ('week', 'iso_year'):
+                if iso_calendar is None:
+                    iso_calendar = dates.dt.isocalendar()
+                values = iso_calendar['week' if feature_name=='week' else 'year']
+            else:
+                values = getattr(dates.dt, feature_name)
+            if has_missing_dates:
+                features[feature_name] = values.astype(DATE_FEATURE_DTYPES[feature_name].capitalize()).array
+            else:
+                features[feature_name] = values.to_numpy(dtype=DATE_FEATURE_DTYPES[feature_name])
+        
+        return pd.DataFrame(features, index=df.index)
+    
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+def _iter_multiple_date_features(chunks, date_column:str, feature_names:list):
+    """
+    Generator behind extract_multiple_date_features for dataframe chunks.
+    """
+    for chunk in chunks:
+        df_features = extract_multiple_date_features(chunk, date_column, feature_names)
+        chunk[list(feature_names)] = df_features
+        yield chunk
     
 def get_commision(provider:str, order_count:int)->float:
     """
@@ -72,6 +320,7 @@ def get_commision(provider:str, order_count:int)->float:
         above_500_orders = above_500_orders if above_500_orders >0 else 0
         return 10000+(above_500_orders*10)
     
+@instrument
 def group_by_and_sum_rows(data:pd.core.frame.DataFrame, 
                             group_by_columns:list, 
                             column_to_sum:str='order_date',
@@ -80,6 +329,10 @@ def group_by_and_sum_rows(data:pd.core.frame.DataFrame,
     Grouped by the given column list and calculated summation the provided column and store result 
     as a new column.
     
+    If an iterator of dataframe chunks is given instead of a dataframe, every chunk is
+    summed on its own and merged into a running result, so memory is bounded by the
+    chunk size and the number of groups.
+    
     Args:
         data:pd.core.frame.DataFrame
         group_by_columns:list
@@ -90,11 +343,27 @@ def group_by_and_sum_rows(data:pd.core.frame.DataFrame,
         Updated dataframe-> consists of grouped columns and calculated result as a new column.
     
     """    
-    df_grouped = data[group_by_columns+[column_to_sum]].groupby(group_by_columns).sum().reset_index()
+    if not isinstance(data, pd.core.frame.DataFrame):
+        df_grouped = None
+        
+        for chunk in data:
+            chunk = chunk[group_by_columns].assign(**{column_to_sum: get_wide_column(chunk[column_to_sum])})
+            df_partial = chunk.groupby(group_by_columns).sum()
+            df_grouped = df_partial if df_grouped is None else \
+                         pd.concat([df_grouped, df_partial]).groupby(level=group_by_columns).sum()
+        
+        if df_grouped is None:
+            return pd.DataFrame(columns=group_by_columns+[resulted_column_name])
+        
+        return df_grouped.sort_index().reset_index().rename(columns={column_to_sum: resulted_column_name})
+    
+    data = data[group_by_columns].assign(**{column_to_sum: get_wide_column(data[column_to_sum])})
+    df_grouped = data.groupby(group_by_columns).sum().reset_index()
     df_grouped = df_grouped.rename(columns={column_to_sum: resulted_column_name})
     return df_grouped
 
 
+@instrument
 def resolve_converted_wide_table_index_issue(df:pd.core.frame.DataFrame)->pd.core.frame.DataFrame:
     '''
     This function resolves the issue created because of using pandas pivot function. Resets the
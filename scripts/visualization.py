@@ -1,13 +1,86 @@
+import io
+import contextlib
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import matplotlib.gridspec as gridspec
+import matplotlib.transforms as transforms
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
 import math
+from statistics import NormalDist
+
+from scripts.profiling import instrument
 
 sns.set_theme(style="whitegrid")
 sns.set(rc={'figure.figsize':(480/96, 480/96)})
 
+def create_figure(headless:bool=False, **figure_kwargs):
+    """
+    This function creates a figure. Headless figures are created without pyplot,
+    so they are not kept alive by its global figure registry and are freed as soon
+    as they are no longer referenced.
+
+    Args:
+        headless:bool
+        figure_kwargs   -> keyword arguments of matplotlib.figure.Figure(i.e. figsize, dpi)
+
+    Returns:
+        fig:matplotlib.figure.Figure
+    """
+    if headless:
+        return Figure(**figure_kwargs)
+    return plt.figure(**figure_kwargs)
+
+@instrument
+def finalize_figure(fig,
+                    save_path:str=None,
+                    save_file:str='figure.png',
+                    headless:bool=False,
+                    return_bytes:bool=False,
+                    show:bool=False,
+                    width_px:int=None)->bytes:
+    """
+    This function saves the figure and returns the rendered png as bytes if requested.
+    Headless figures are cleared afterwards, other figures are shown if show is set.
+
+    Args:
+        fig:matplotlib.figure.Figure
+        save_path:str
+        save_file:str
+        headless:bool
+        return_bytes:bool
+        show:bool
+        width_px:int -> render the figure this many pixels wide instead of at 300 dpi,
+                        i.e. the placed width of the image in the PDF(see PDF.get_image_width_px)
+
+    Returns:
+        image:bytes -> None if return_bytes is not set
+    """
+    image = None
+    dpi = width_px/fig.get_figwidth() if width_px else 300
+
+    if return_bytes:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches = "tight")
+        image = buffer.getvalue()
+        
+        if save_path:
+            with open(f"{save_path}/"+ save_file, 'wb') as file:
+                file.write(image)
+                
+    elif save_path:
+        fig.savefig( f"{save_path}/"+ save_file, dpi=dpi, bbox_inches = "tight")
+
+    if headless:
+        fig.clear()
+    elif show:
+        plt.show()
+        
+    return image
+
 def get_rows_cols_for_subplot(num_subplots:int)->tuple:
     """
     This function calculates the rows and cols required
@@ -37,7 +110,7 @@ def get_rows_cols_for_subplot(num_subplots:int)->tuple:
             
         return nrows,ncols,odd
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
 
 def get_axes_object_for_subplots(nrows:int,
                                  ncols:int,
@@ -89,8 +162,9 @@ def get_axes_object_for_subplots(nrows:int,
         return axes_list
 
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
 
+@instrument
 def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
                                         x_axis_col_names:list,
                                         y_axis_col_names:list,
@@ -101,7 +175,10 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
                                         save_file:str='barplot.png',
                                         sort:bool=False,
                                         sharey:bool=True,
-                                        save_path:str = None)->None:
+                                        save_path:str = None,
+                                        headless:bool = False,
+                                        return_bytes:bool = False,
+                                        width_px:int = None)->bytes:
     """
     This function creates and plots several barplots in a figure.
     
@@ -115,6 +192,9 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
         fontsize:int
         sharey:bool                  -> wheather to sharen y-axis in same row
         save_path:str
+        headless:bool                -> create the figure without pyplot and release it after saving
+        return_bytes:bool            -> return the rendered png as bytes
+        width_px:int                 -> pixel width of the rendered png, defaults to 300 dpi
     
     """
     
@@ -122,7 +202,7 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
         if num_subplots<2:
             raise ValueError("Inadequate number of subplots.")
         elif num_subplots>4:
-            raise ValueError("Not Implemented Error!")
+            raise ValueError("Not Implemented Error! Use facets.plot_facet_grid for more subplots.")
             
         elif num_subplots!=len(x_axis_col_names) or \
            num_subplots!=len(y_axis_col_names) or \
@@ -134,7 +214,7 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
 
             nrows,ncols,odd = get_rows_cols_for_subplot(num_subplots)
         
-            fig = plt.figure()
+            fig = create_figure(headless)
             fig.suptitle(figure_title, fontsize=fontsize)
             
             axes_list = get_axes_object_for_subplots(nrows,ncols,odd, fig, sharey)
@@ -142,7 +222,7 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
             for index in range(num_subplots):
                 
                 if sort:
-                    order = df_weekly_trend_by_product.groupby([x_axis_col_names[index]])[y_axis_col_names[index]]\
+                    order = data.groupby([x_axis_col_names[index]])[y_axis_col_names[index]]\
                                                                             .mean().sort_values(ascending=False).index
                     sns.barplot(x = x_axis_col_names[index], 
                                 y = y_axis_col_names[index], 
@@ -157,20 +237,18 @@ def create_several_barplots_in_a_figure(data:pd.core.frame.DataFrame,
                                 data = data,
                                 ax = axes_list[index])
 
-            plt.subplots_adjust(left=0.125,
+            fig.subplots_adjust(left=0.125,
                                 bottom=0.1, 
                                 right=0.9, 
                                 top=0.9, 
                                 wspace=0.5, 
                                 hspace=0.35)
             
-            if save_path:
-                plt.savefig( f"{save_path}/"+ save_file, dpi=300, bbox_inches = "tight")
-                
-            plt.show()
+            return finalize_figure(fig, save_path, save_file, headless, return_bytes, show=True, width_px=width_px)
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
 
+@instrument
 def plot_line_graph(y:pd.core.frame.DataFrame,
                        x_label:str = 'Revenue',
                        y_label:str = 'Week Number',
@@ -180,7 +258,10 @@ def plot_line_graph(y:pd.core.frame.DataFrame,
                        fig_dim_x:int=8,
                        fig_dim_y:int=4,
                        annnotate_values:bool=True,
-                       save_path:str = None)->None:  
+                       save_path:str = None,
+                       headless:bool = False,
+                       return_bytes:bool = False,
+                       width_px:int = None)->bytes:  
     """
     This function plots the data of given data frame to see the trend.
     
@@ -195,10 +276,14 @@ def plot_line_graph(y:pd.core.frame.DataFrame,
         fig_dim_y:int
         annnotate_values:bool
         save_path:str
+        headless:bool             -> create the figure without pyplot and release it after saving
+        return_bytes:bool         -> return the rendered png as bytes
+        width_px:int              -> pixel width of the rendered png, defaults to 300 dpi
     """
     try:
 
-        fig, ax = plt.subplots(figsize=(fig_dim_x, fig_dim_y))
+        fig = create_figure(headless, figsize=(fig_dim_x, fig_dim_y))
+        ax = fig.subplots()
         ax.xaxis.set_major_locator(ticker.MultipleLocator(1))
         ax.plot(y, marker='.', linestyle='-', linewidth=0.5, label=trend_label)
         ax.set_ylabel(x_label)
@@ -213,11 +298,10 @@ def plot_line_graph(y:pd.core.frame.DataFrame,
                     ax.annotate(str(j),xy=(i+0.05,j), fontsize=5)
                 count+=1
         
-        if save_path:
-            plt.savefig( f"{save_path}/"+ save_file, dpi=300, bbox_inches = "tight")
+        return finalize_figure(fig, save_path, save_file, headless, return_bytes, width_px=width_px)
 
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
 
 def add_value_labels(ax, spacing=5)->None:
     """Add labels to the end of each bar in a bar chart.
@@ -256,8 +340,9 @@ def add_value_labels(ax, spacing=5)->None:
                 )                    
 
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
 
+@instrument
 def plot_bargraph(df:pd.core.frame.DataFrame,
                   x_axis_column:str='product',
                   y_axis_column:str='avg_order_rev',
@@ -268,7 +353,12 @@ def plot_bargraph(df:pd.core.frame.DataFrame,
                   save_file:str='barplot.png',
                   conf_interval:bool=False,
                   color_dict:dict = None,
-                  save_path:str = None)->None:
+                  save_path:str = None,
+                  headless:bool = False,
+                  return_bytes:bool = False,
+                  fast:bool = False,
+                  top_n:int = None,
+                  width_px:int = None)->bytes:
     """
     This function plots the bargraph of the given two columns of the dataframe.
     
@@ -283,16 +373,29 @@ def plot_bargraph(df:pd.core.frame.DataFrame,
         save_file:str
         color_dict:dict
         save_path:str
+        headless:bool                   -> create the figure without pyplot and release it after saving
+        return_bytes:bool               -> return the rendered png as bytes
+        fast:bool                       -> aggregate once and draw the bars directly instead of
+                                           through seaborn, see plot_aggregated_bargraph
+        top_n:int                       -> only plot the top_n x-axis values, requires fast
+        width_px:int                    -> pixel width of the rendered png, defaults to 300 dpi
     """
 
+    if fast:
+        return plot_aggregated_bargraph(df, x_axis_column, y_axis_column, hue_column_name, x_label_name, y_label_name,
+                                        title, save_file, conf_interval, color_dict, save_path, headless, return_bytes,
+                                        top_n, width_px=width_px)
+    elif top_n:
+        raise ValueError("top_n is only supported together with fast=True.")
+    
     try:    
         order = df.groupby([x_axis_column])[y_axis_column].mean().sort_values(ascending=False).index
-        ax = None
+        ax = create_figure(headless).subplots() if headless else None
         
         if conf_interval:
-            ax = sns.barplot(x = x_axis_column, y = y_axis_column, hue=hue_column_name, data=df, order=order, palette = color_dict)
+            ax = sns.barplot(x = x_axis_column, y = y_axis_column, hue=hue_column_name, data=df, order=order, palette = color_dict, ax = ax)
         else:
-            ax = sns.barplot(x = x_axis_column, y = y_axis_column, hue=hue_column_name, data=df, order=order, ci=None, palette = color_dict)
+            ax = sns.barplot(x = x_axis_column, y = y_axis_column, hue=hue_column_name, data=df, order=order, ci=None, palette = color_dict, ax = ax)
 
         ax.set(xlabel=x_label_name, ylabel=y_label_name)
         ax.set_title(title)
@@ -300,12 +403,271 @@ def plot_bargraph(df:pd.core.frame.DataFrame,
         # #plot bar values
         add_value_labels(ax)
 
-        if save_path:
-            plt.savefig( f"{save_path}/"+ save_file, dpi=300, bbox_inches = "tight")
+        return finalize_figure(ax.figure, save_path, save_file, headless, return_bytes, width_px=width_px)
 
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+@instrument
+def get_bar_statistics(df:pd.core.frame.DataFrame,
+                       x_axis_column:str,
+                       y_axis_column:str,
+                       hue_column_name:str = None,
+                       confidence:float = 0.95,
+                       top_n:int = None,
+                       facet_column:str = None)->pd.core.frame.DataFrame:
+    """
+    This function computes mean, count, standard deviation and the normal approximation
+    confidence interval half width of y_axis_column per x-axis(and hue) value in one
+    grouped pass. Rows are ordered by the mean of the x-axis value in descending order.
+    If facet_column is given, the statistics and the order are computed per facet value.
+    
+    Args:
+        df:pd.core.frame.DataFrame
+        x_axis_column:str
+        y_axis_column:str
+        hue_column_name:str
+        confidence:float
+        top_n:int            -> only keep the top_n x-axis values
+        facet_column:str
+    
+    Returns:
+        df_statistics:pd.core.frame.DataFrame -> x_position holds the rank of the x-axis value
+    """
+    facet_columns = [] if facet_column is None else [facet_column]
+    x_columns = facet_columns+[x_axis_column]
+    group_by_columns = x_columns if hue_column_name is None else x_columns+[hue_column_name]
+    
+    df_statistics = df.groupby(group_by_columns, sort=False, observed=True)[y_axis_column]\
+                      .agg(['mean', 'count', 'std']).reset_index()
+    
+    z = NormalDist().inv_cdf((1+confidence)/2)
+    df_statistics['ci'] = (z*df_statistics['std']/np.sqrt(df_statistics['count'])).fillna(0)
+    
+    # mean of every x-axis value over all hue values, derived from the group means and counts
+    keys = [df_statistics[column] for column in x_columns]
+    total = (df_statistics['mean']*df_statistics['count']).groupby(keys, sort=False, observed=True).transform('sum')
+    count = df_statistics['count'].groupby(keys, sort=False, observed=True).transform('sum')
+    df_statistics['x_mean'] = total/count
+    
+    x_means = df_statistics.drop_duplicates(x_columns)
+    x_means = x_means.sort_values('x_mean', ascending=False, kind='stable')
+    if facet_column is None:
+        x_means = x_means.assign(x_position=np.arange(len(x_means)))
+    else:
+        x_means = x_means.assign(x_position=x_means.groupby(facet_column, sort=False, observed=True).cumcount())
+    
+    df_statistics = df_statistics.merge(x_means[x_columns+['x_position']], on=x_columns)
+    if top_n:
+        df_statistics = df_statistics[df_statistics['x_position']<top_n]
+    
+    return df_statistics.sort_values(facet_columns+['x_position'], kind='stable').reset_index(drop=True)
+
+def draw_aggregated_bars(ax,
+                         df_statistics:pd.core.frame.DataFrame,
+                         x_axis_column:str,
+                         hue_column_name:str = None,
+                         conf_interval:bool = False,
+                         color_dict:dict = None,
+                         value_labels:bool = True)->None:
+    """
+    This function draws the bars of the statistics created by get_bar_statistics on the
+    given axes with one bar call and labels every bar with its value.
+    
+    Args:
+        ax:matplotlib.axes.Axes
+        df_statistics:pd.core.frame.DataFrame
+        x_axis_column:str
+        hue_column_name:str
+        conf_interval:bool  -> draw confidence intervals as error bars
+        color_dict:dict     -> color of every x-axis value, or of every hue value if hue is given
+        value_labels:bool   -> write the value above every bar
+    """
+    num_x = df_statistics['x_position'].max()+1 if len(df_statistics) else 0
+    positions = df_statistics['x_position'].to_numpy(dtype='float64')
+    
+    if hue_column_name is None:
+        width = 0.8
+        keys = df_statistics[x_axis_column]
+        palette = dict(zip(keys, sns.color_palette(n_colors=len(keys))))
+    else:
+        hue_values = pd.unique(df_statistics[hue_column_name])
+        if pd.api.types.is_numeric_dtype(df_statistics[hue_column_name]):
+            # numeric hue levels are ordered like seaborn does
+            hue_values = np.sort(hue_values)
+        hue_positions = pd.Index(hue_values).get_indexer(df_statistics[hue_column_name])
+        width = 0.8/len(hue_values)
+        positions = positions-0.4+width*(hue_positions+0.5)
+        keys = df_statistics[hue_column_name]
+        palette = dict(zip(hue_values, sns.color_palette(n_colors=len(hue_values))))
+    
+    if color_dict:
+        palette.update(color_dict)
+    colors = [palette[key] for key in keys]
+    
+    heights = df_statistics['mean'].to_numpy()
+    bars = ax.bar(positions, 
+                  heights, 
+                  width=width, 
+                  color=colors, 
+                  yerr=df_statistics['ci'].to_numpy() if conf_interval else None,
+                  ecolor='#424242')
+    
+    if hue_column_name is not None:
+        handles = [plt.Rectangle((0, 0), 1, 1, color=palette[value]) for value in hue_values]
+        ax.legend(handles, hue_values, title=hue_column_name)
+    
+    ax.set_xticks(range(num_x))
+    ax.set_xticklabels(df_statistics.drop_duplicates('x_position')[x_axis_column].astype(str))
+    
+    # plot bar values
+    if value_labels:
+        draw_bar_labels(ax, bars, heights)
 
+def draw_bar_labels(ax, bars, values:np.ndarray, fontsize:int = 5, padding:float = 5)->None:
+    """
+    This function writes the value above(below for negative values) every bar of the
+    container in one call. Uses Axes.bar_label where available(matplotlib>=3.4),
+    otherwise the labels and their alignment are derived from the values at once and
+    placed with two shared offset transforms.
+    
+    Args:
+        ax:matplotlib.axes.Axes
+        bars:matplotlib.container.BarContainer -> returned by ax.bar
+        values:np.ndarray                      -> value of every bar
+        fontsize:int
+        padding:float                          -> distance of the labels from the bars in points
+    """
+    values = np.asarray(values, dtype='float64')
+    labels = np.char.mod('%.1f', values)
+    
+    if hasattr(ax, 'bar_label'):
+        ax.bar_label(bars, labels=labels, padding=padding, fontsize=fontsize)
+        return
+    
+    x_values = np.array([bar.get_x()+bar.get_width()/2 for bar in bars])
+    above = values>=0
+    offsets = {True: transforms.offset_copy(ax.transData, fig=ax.figure, y=padding, units='points'),
+               False: transforms.offset_copy(ax.transData, fig=ax.figure, y=-padding, units='points')}
+    for x_value, y_value, label, is_above in zip(x_values, values, labels, above):
+        ax.text(x_value, y_value, label, transform=offsets[bool(is_above)], ha='center',
+                va='bottom' if is_above else 'top', fontsize=fontsize)
+
+@instrument
+def plot_aggregated_bargraph(df:pd.core.frame.DataFrame,
+                             x_axis_column:str='product',
+                             y_axis_column:str='avg_order_rev',
+                             hue_column_name:str = None,
+                             x_label_name:str= 'Product',
+                             y_label_name:str='Average Revenue per order',
+                             title:str='Title',
+                             save_file:str='barplot.png',
+                             conf_interval:bool=False,
+                             color_dict:dict = None,
+                             save_path:str = None,
+                             headless:bool = False,
+                             return_bytes:bool = False,
+                             top_n:int = None,
+                             confidence:float = 0.95,
+                             width_px:int = None)->bytes:
+    """
+    This function plots the same bargraph as plot_bargraph from a single grouped aggregation.
+    All bars are drawn with one bar call and confidence intervals are computed analytically
+    instead of bootstrapped by seaborn.
+    
+    Args:
+        df:pd.core.frame.DataFrame
+        x_axis_column:str               -> Dataframe Column name to put on x-axis
+        y_axis_column:str               -> Dataframe Column name to put on y-axis
+        hue_column_name:str             -> Dataframe Column name to put on hue
+        x_label_name:str
+        y_label_name:str
+        title:str
+        save_file:str
+        conf_interval:bool              -> draw confidence intervals as error bars
+        color_dict:dict                 -> color of every x-axis value, or of every hue value if hue is given
+        save_path:str
+        headless:bool                   -> create the figure without pyplot and release it after saving
+        return_bytes:bool               -> return the rendered png as bytes
+        top_n:int                       -> only plot the top_n x-axis values by mean
+        confidence:float                -> confidence level of the intervals
+        width_px:int                    -> pixel width of the rendered png, defaults to 300 dpi
+    """
+    try:
+        df_statistics = get_bar_statistics(df, x_axis_column, y_axis_column, hue_column_name, confidence, top_n)
+        
+        fig = create_figure(headless)
+        ax = fig.subplots()
+        
+        draw_aggregated_bars(ax, df_statistics, x_axis_column, hue_column_name, conf_interval, color_dict)
+        ax.set(xlabel=x_label_name, ylabel=y_label_name)
+        ax.set_title(title)
+        
+        return finalize_figure(fig, save_path, save_file, headless, return_bytes, width_px=width_px)
+    
+    except Exception as error:
+        raise Exception('Caught this error: ' + repr(error)) from error
+
+@instrument
+def lttb_downsample(x, y, num_points:int)->tuple:
+    """
+    This function downsamples series with the Largest-Triangle-Three-Buckets method,
+    which keeps the first and last point and from every bucket the point forming the
+    largest triangle with its neighbours, so peaks and dips survive the downsampling.
+    All columns of a 2d y are downsampled at once.
+    
+    Args:
+        x:array-like   -> shared x values of length n
+        y:array-like   -> values of shape (n,) or (n, num_series)
+        num_points:int -> number of points to keep per series
+    
+    Returns:
+        x_sampled:np.ndarray -> shape (num_points,) or (num_points, num_series)
+        y_sampled:np.ndarray -> shape (num_points,) or (num_points, num_series)
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    
+    if num_points>=n or num_points<3:
+        return (x, y) if y.ndim==1 else (np.repeat(x[:, None], y.shape[1], axis=1), y)
+    
+    y_2d = y.reshape(n, -1)
+    columns = np.arange(y_2d.shape[1])
+    
+    # bucket i covers the points edges[i]:edges[i+1], the first and last point are kept as they are
+    every = (n-2)/(num_points-2)
+    edges = (np.arange(num_points-1)*every).astype('int64')+1
+    
+    selected = np.empty((num_points, y_2d.shape[1]), dtype='int64')
+    selected[0] = 0
+    selected[-1] = n-1
+    
+    previous = np.zeros(y_2d.shape[1], dtype='int64')
+    for bucket in range(num_points-2):
+        start, end = edges[bucket], edges[bucket+1]
+        next_end = edges[bucket+2] if bucket+2<len(edges) else n
+        
+        average_x = x[end:next_end].mean()
+        average_y = y_2d[end:next_end].mean(axis=0)
+        
+        previous_x = x[previous]
+        previous_y = y_2d[previous, columns]
+        
+        areas = np.abs((previous_x-average_x)*(y_2d[start:end]-previous_y)
+                       -(previous_x-x[start:end, None])*(average_y-previous_y))
+        
+        previous = start+np.argmax(np.nan_to_num(areas, nan=-1.0), axis=0)
+        selected[bucket+1] = previous
+    
+    x_sampled = x[selected]
+    y_sampled = y_2d[selected, columns]
+    
+    if y.ndim==1:
+        return x_sampled[:, 0], y_sampled[:, 0]
+    return x_sampled, y_sampled
+
+@instrument
 def plot_highlighted_sphagetti_graph(df,
                                      unique_index_name:str='index',
                                      highlight_column:str='D',
@@ -316,7 +678,13 @@ def plot_highlighted_sphagetti_graph(df,
                                      title:str = "Evolution of vs other",
                                      save_file:str='highlighted_sphagetti.png',
                                      figsize_dpi:int=96,
-                                     save_path:str = None)->None:  
+                                     save_path:str = None,
+                                     headless:bool = False,
+                                     return_bytes:bool = False,
+                                     high_cardinality:bool = False,
+                                     max_points:int = 500,
+                                     annotate_top_k:int = 5,
+                                     width_px:int = None)->bytes:  
     """
     This function plots sphagetti graph and highlights a particular line plot
     given data frame and associated parameters.
@@ -331,51 +699,79 @@ def plot_highlighted_sphagetti_graph(df,
         y_label:str     
         x_label:str     
         title:str       
+        headless:bool            -> create the figure without pyplot and release it after saving
+        return_bytes:bool        -> return the rendered png as bytes
+        high_cardinality:bool    -> draw all other lines as one LineCollection, downsample them to
+                                    max_points with LTTB and only annotate the highlighted line and
+                                    the annotate_top_k lines with the highest last value. Suited for
+                                    thousands of columns.
+        max_points:int
+        annotate_top_k:int
+        width_px:int             -> pixel width of the rendered png, defaults to 300 dpi
     
     Returns: 
-        Updated dataframe-> consists of grouped columns and calculated result as a new column.
+        image:bytes -> None if return_bytes is not set
     
     """  
 
     try:
-        plt.style.use('seaborn-darkgrid')
+        if headless:
+            # apply the style to this figure only
+            style = plt.style.context('seaborn-darkgrid')
+        else:
+            plt.style.use('seaborn-darkgrid')
+            style = contextlib.nullcontext()
 
-        # set figure size
-        plt.figure(figsize=(480/figsize_dpi, 480/figsize_dpi), dpi=figsize_dpi)
+        with style:
+            # set figure size
+            fig = create_figure(headless, figsize=(480/figsize_dpi, 480/figsize_dpi), dpi=figsize_dpi)
+            ax = fig.add_subplot()
 
-        # plot multiple lines
-        for column in df.drop(unique_index_name, axis=1):
-            plt.plot(df[unique_index_name], df[column], marker='', color= line_color, linewidth=1, alpha=0.4)
+            x_values = df[unique_index_name].to_numpy()
+            # every line including the highlighted one is drawn in line_color, the highlight is drawn on top
+            line_columns = [column for column in df.columns if column!=unique_index_name]
+            other_columns = [column for column in line_columns if column!=highlight_column]
 
+            # Annotate the plot right of the last x value
+            label_x = x_values[-1] + 0.02*(x_values[-1]-x_values[0])
 
-        plt.plot(df[unique_index_name], df[highlight_column], marker='', color=highlight_line_color, linewidth=4, alpha=0.7)
+            if high_cardinality:
+                x_sampled, y_sampled = lttb_downsample(x_values, df[line_columns].to_numpy(dtype='float64'), max_points)
 
-        # Change x axis limit
-        plt.xlim(df[unique_index_name].iloc[0]-1,df[unique_index_name].iloc[-1]+1)
+                # (num_series, num_points, 2) array of line vertices
+                segments = np.stack([x_sampled.T, y_sampled.T], axis=-1)
+                ax.add_collection(LineCollection(segments, colors=line_color, linewidths=1, alpha=0.4))
 
-        # Annotate the plot: hardcoded the text x-axis~26.2
-        num=0
-        for i in df.values[df.shape[0]-1][1:]:
-            num+=1
-            name=list(df)[num]
-            if name != highlight_column:
-                plt.text(26.2, i, name, horizontalalignment='left', size='small', color=line_color)
+                last_values = df[other_columns].iloc[-1].to_numpy(dtype='float64')
+                top_k = np.argsort(-np.nan_to_num(last_values, nan=-np.inf))[:annotate_top_k]
+                for index in top_k:
+                    ax.text(label_x, last_values[index], other_columns[index], horizontalalignment='left', size='small', color=line_color)
 
-        # And add a special annotation for the group we are interested in
-        plt.text(26.2, df[highlight_column].tail(1), '{}'.format(highlight_column), horizontalalignment='left', size='small', color='orange')
+            else:
+                # plot multiple lines
+                for column in line_columns:
+                    ax.plot(x_values, df[column], marker='', color= line_color, linewidth=1, alpha=0.4)
 
-        plt.title(title,\
-                  loc='center', 
-                  fontsize= 10, 
-                  fontweight=0)
-        plt.xlabel(x_label)
-        plt.ylabel(y_label)
-        
-        if save_path:
-            plt.savefig( f"{save_path}/"+ save_file, dpi=300, bbox_inches = "tight")
-            
-        # Show the graph
-        plt.show()
+                for column in other_columns:
+                    ax.text(label_x, df[column].iloc[-1], column, horizontalalignment='left', size='small', color=line_color)
+
+            ax.plot(x_values, df[highlight_column], marker='', color=highlight_line_color, linewidth=4, alpha=0.7)
+
+            # Change x axis limit
+            ax.set_xlim(x_values[0]-1,x_values[-1]+1)
+
+            # And add a special annotation for the group we are interested in
+            ax.text(label_x, df[highlight_column].iloc[-1], '{}'.format(highlight_column), horizontalalignment='left', size='small', color='orange')
+
+            ax.set_title(title,\
+                         loc='center', 
+                         fontsize= 10, 
+                         fontweight=0)
+            ax.set_xlabel(x_label)
+            ax.set_ylabel(y_label)
+
+            # Show the graph
+            return finalize_figure(fig, save_path, save_file, headless, return_bytes, show=True, width_px=width_px)
 
     except Exception as error:
-        raise Exception('Caught this error: ' + repr(error))
\ No newline at end of file
+        raise Exception('Caught this error: ' + repr(error)) from error
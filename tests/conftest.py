@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+# the scripts are imported as scripts.<module> from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from scripts.benchmark import generate_sales_data
+
+@pytest.fixture(scope='session')
+def sales_data():
+    """Seeded order rows shaped like the commission dataset."""
+    return generate_sales_data(3000, seed=7)
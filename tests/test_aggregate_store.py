@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from scripts.aggregate_store import AggregateStore
+
+def test_weekly_buckets_use_the_iso_year():
+    rows = pd.DataFrame({'order_date': pd.to_datetime(['2019-01-02', '2019-12-30', '2020-12-31', '2021-01-03']),
+                         'product': 'A', 'provider': 'roadrunner', 'order_count': [1, 2, 4, 8], 'revenue': 10})
+
+    with AggregateStore(':memory:') as store:
+        store.append(rows)
+        weekly = store.get_table('weekly_product').set_index(['iso_year', 'week'])['total_orders']
+        monthly = store.get_table('monthly_product_provider').set_index(['year', 'month'])['order_count']
+
+    # 2019-12-30 is in ISO week 2020-W01, 2020-12-31 and 2021-01-03 are both in 2020-W53
+    assert weekly.to_dict()=={(2019, 1): 1, (2020, 1): 2, (2020, 53): 12}
+    assert monthly.to_dict()=={(2019, 1): 1, (2019, 12): 2, (2020, 12): 4, (2021, 1): 8}
+
+def test_incremental_appends_match_the_notebook_kpis(sales_data):
+    weeks = sales_data['order_date'].dt.isocalendar().week
+
+    with AggregateStore(':memory:') as store:
+        for chunk in (sales_data.iloc[:1000], sales_data.iloc[1000:2500], sales_data.iloc[2500:]):
+            store.append(chunk)
+
+        assert store.get_avg_orders_per_week()==pytest.approx(sales_data['order_count'].sum()/weeks.nunique())
+        assert store.get_avg_revenue_per_order()==pytest.approx(sales_data['revenue'].sum()/sales_data['order_count'].sum())
+
+        weekly_orders = sales_data.groupby([weeks, 'product'])['order_count'].sum().groupby('product').mean()
+        product, orders = store.get_most_desirable_product()
+        assert (product, orders)==(weekly_orders.idxmax(), pytest.approx(weekly_orders.max()))
+
+def test_outdated_store_is_rejected(tmp_path):
+    path = str(tmp_path/'aggregates.sqlite')
+    with AggregateStore(path) as store:
+        store.connection.execute('DROP TABLE weekly_product')
+        store.connection.execute('CREATE TABLE weekly_product (year INTEGER, week INTEGER, product TEXT, '
+                                 'total_orders REAL, revenue REAL)')
+
+    with pytest.raises(ValueError):
+        AggregateStore(path)
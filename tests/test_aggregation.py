@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.aggregation import (compute_partial_aggregates, merge_partial_aggregates, finalize_aggregates,
+                                 aggregate_metrics, write_partitions, aggregate_metrics_out_of_core)
+
+METRICS = {'order_count': ('sum', 'order_count'),
+           'revenue': ('sum', 'revenue'),
+           'orders': ('count', 'order_count'),
+           'avg_revenue': ('mean', 'revenue'),
+           'avg_order_rev': ('ratio', 'revenue', 'order_count')}
+
+KEYS = ['product', 'provider', 'year', 'month']
+
+def get_notebook_aggregates(data):
+    """Monthly aggregates computed the way the notebook does."""
+    data = data.assign(year=data['order_date'].dt.year, month=data['order_date'].dt.month)
+    df_grouped = data.groupby(KEYS).agg(order_count=('order_count', 'sum'),
+                                        revenue=('revenue', 'sum'),
+                                        orders=('order_count', 'count'),
+                                        avg_revenue=('revenue', 'mean')).reset_index()
+    df_grouped['avg_order_rev'] = df_grouped['revenue']/df_grouped['order_count']
+    return df_grouped
+
+def assert_aggregates_equal(result, expected):
+    result = result.astype({'product': str, 'provider': str}).sort_values(KEYS).reset_index(drop=True)
+    expected = expected.sort_values(KEYS).reset_index(drop=True)
+    assert result[KEYS].astype(str).equals(expected[KEYS].astype(str))
+    for column in METRICS:
+        np.testing.assert_allclose(result[column], expected[column], err_msg=column)
+
+def test_single_pass_aggregates_match_the_notebook(sales_data):
+    data = sales_data.assign(year=sales_data['order_date'].dt.year, month=sales_data['order_date'].dt.month)
+    assert_aggregates_equal(aggregate_metrics(data, KEYS, METRICS), get_notebook_aggregates(sales_data))
+
+def test_merged_partial_aggregates_match_the_notebook(sales_data):
+    data = sales_data.assign(year=sales_data['order_date'].dt.year, month=sales_data['order_date'].dt.month)
+    parts = (data.iloc[:500], data.iloc[500:1800], data.iloc[1800:])
+    partials = [compute_partial_aggregates(part, KEYS, METRICS) for part in parts]
+
+    result = finalize_aggregates(merge_partial_aggregates(partials), METRICS)
+    assert_aggregates_equal(result, get_notebook_aggregates(sales_data))
+
+def test_out_of_core_aggregates_match_the_notebook(sales_data, tmp_path):
+    chunks = (sales_data.iloc[start:start+700] for start in range(0, len(sales_data), 700))
+    partitions = write_partitions(chunks, str(tmp_path/'partitions'))
+
+    result = aggregate_metrics_out_of_core(partitions, KEYS, METRICS, max_workers=2, date_features=['year', 'month'])
+    assert_aggregates_equal(result, get_notebook_aggregates(sales_data))
+
+def test_zero_denominators_use_zero_division():
+    data = pd.DataFrame({'product': ['A', 'B'], 'revenue': [10.0, 0.0], 'order_count': [2, 0]})
+    result = aggregate_metrics(data, ['product'], {'avg_order_rev': ('ratio', 'revenue', 'order_count')},
+                               zero_division=np.nan)
+    assert result['avg_order_rev'].iloc[0]==pytest.approx(5.0)
+    assert np.isnan(result['avg_order_rev'].iloc[1])
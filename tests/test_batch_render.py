@@ -0,0 +1,42 @@
+import os
+import pytest
+
+from scripts.batch_render import render_plots
+
+def get_plot_specs(sales_data, save_path:str)->list:
+    trend = sales_data.groupby(sales_data['order_date'].dt.isocalendar().week)['revenue'].sum()
+    return [{'function': 'plot_line_graph',
+             'kwargs': {'y': trend, 'save_path': save_path, 'save_file': 'trend.png'}},
+            {'function': 'plot_aggregated_bargraph',
+             'kwargs': {'df': sales_data, 'x_axis_column': 'product', 'y_axis_column': 'revenue',
+                        'save_path': save_path, 'save_file': 'products.png'}},
+            {'function': 'plot_aggregated_bargraph',
+             'kwargs': {'df': sales_data, 'x_axis_column': 'product', 'y_axis_column': 'missing_column',
+                        'save_path': save_path, 'save_file': 'broken.png'}},
+            {'function': 'plot_aggregated_bargraph',
+             'kwargs': {'df': sales_data, 'x_axis_column': 'provider', 'y_axis_column': 'order_count',
+                        'save_path': save_path, 'save_file': 'providers.png'}}]
+
+def test_every_plot_is_written_at_its_path(sales_data, tmp_path):
+    plot_specs = [spec for spec in get_plot_specs(sales_data, str(tmp_path)) if spec['kwargs']['save_file']!='broken.png']
+    paths = render_plots(plot_specs, max_workers=2)
+
+    assert paths==['{}/{}'.format(tmp_path, file_name) for file_name in ['trend.png', 'products.png', 'providers.png']]
+    for path in paths:
+        with open(path, 'rb') as file:
+            assert file.read(4)==b'\x89PNG'
+
+def test_failing_plot_does_not_abort_the_batch(sales_data, tmp_path):
+    plot_specs = get_plot_specs(sales_data, str(tmp_path))
+
+    paths = render_plots(plot_specs, max_workers=2, return_exceptions=True)
+    assert isinstance(paths[2], Exception)
+    assert [path for index, path in enumerate(paths) if index!=2]==\
+           ['{}/{}'.format(tmp_path, file_name) for file_name in ['trend.png', 'products.png', 'providers.png']]
+    assert sorted(os.listdir(tmp_path))==['products.png', 'providers.png', 'trend.png']
+
+    for file_name in os.listdir(tmp_path):
+        os.remove(os.path.join(tmp_path, file_name))
+    with pytest.raises(Exception, match='1 of 4 plots failed: 2 plot_aggregated_bargraph'):
+        render_plots(plot_specs, max_workers=2)
+    assert sorted(os.listdir(tmp_path))==['products.png', 'providers.png', 'trend.png']
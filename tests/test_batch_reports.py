@@ -0,0 +1,44 @@
+import os
+import pytest
+from multiprocessing import shared_memory
+
+from scripts import batch_reports
+from scripts.batch_reports import create_entity_reports, get_report_file_name
+
+def test_reports_are_written_for_every_entity(sales_data, tmp_path, monkeypatch):
+    specs = []
+    create_shared_arrays = batch_reports.create_shared_arrays
+
+    def record_shared_arrays(arrays):
+        spec, blocks = create_shared_arrays(arrays)
+        specs.append(spec)
+        return spec, blocks
+
+    monkeypatch.setattr(batch_reports, 'create_shared_arrays', record_shared_arrays)
+
+    calls = []
+    output_dir = str(tmp_path/'reports')
+    results = create_entity_reports(sales_data, output_dir=output_dir, max_workers=2,
+                                    progress=lambda done, total, result: calls.append((done, total, result)))
+
+    entities = [(column, value) for column in ['provider', 'product'] for value in sorted(sales_data[column].unique())]
+    assert sorted((result['entity_column'], result['entity']) for result in results)==sorted(entities)
+    assert sorted(os.listdir(output_dir))==sorted(get_report_file_name(*entity) for entity in entities)
+    for result in results:
+        with open(result['path'], 'rb') as file:
+            assert file.read(5)==b'%PDF-'
+
+    # one progress call per report, in completion order
+    assert [(done, total) for done, total, _ in calls]==[(done, len(entities)) for done in range(1, len(entities)+1)]
+    assert [result for _, _, result in calls]==results
+
+    # the shared memory blocks are unlinked once the reports are written
+    assert len(specs)==1 and specs[0]
+    for block_name, _, _ in specs[0].values():
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block_name)
+
+def test_unknown_entities_are_rejected(sales_data, tmp_path):
+    with pytest.raises(Exception) as error:
+        create_entity_reports(sales_data, entities={'provider': ['nobody']}, output_dir=str(tmp_path), progress=None)
+    assert isinstance(error.value.__cause__, ValueError)
@@ -0,0 +1,57 @@
+import json
+import tracemalloc
+import numpy as np
+import pytest
+
+from scripts.benchmark import measure, main
+from scripts.profiling import profiling
+
+def allocate(num_bytes:int)->int:
+    return len(np.ones(num_bytes, dtype='uint8'))
+
+def test_measure_starts_and_stops_its_own_trace():
+    assert not tracemalloc.is_tracing()
+    _, result = measure(allocate, 8*1024*1024)
+    assert not tracemalloc.is_tracing()
+    assert result['peak_memory_mb']>=8
+
+def test_measure_keeps_an_active_trace_running():
+    with profiling():
+        _, result = measure(allocate, 8*1024*1024)
+        assert tracemalloc.is_tracing()
+        assert result['peak_memory_mb']>=8
+
+    assert not tracemalloc.is_tracing()
+
+def write_benchmark(path, seconds:float, peak_memory_mb:float)->str:
+    benchmark = {'created': '2021-07-01T00:00:00', 'seed': 0, 'environment': {},
+                 'results': {'1000': {'read_xlsx': {'seconds': 1.0, 'peak_memory_mb': 10.0},
+                                      'get_commision': {'seconds': seconds, 'peak_memory_mb': peak_memory_mb}}}}
+    path.write_text(json.dumps(benchmark))
+    return str(path)
+
+def test_compare_exits_nonzero_on_regressions(tmp_path, capsys):
+    baseline = write_benchmark(tmp_path/'baseline.json', 1.0, 10.0)
+
+    assert main(['compare', baseline, write_benchmark(tmp_path/'same.json', 1.1, 10.0)])==0
+    assert main(['compare', baseline, write_benchmark(tmp_path/'slower.json', 2.0, 10.0)])==1
+    assert main(['compare', baseline, write_benchmark(tmp_path/'larger.json', 1.0, 20.0)])==1
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()==['num_rows', 'stage', 'baseline_seconds', 'seconds', 'time_ratio',
+                              'baseline_peak_memory_mb', 'peak_memory_mb', 'memory_ratio', 'regression']
+    assert [line.split()[-1] for line in lines if 'get_commision' in line]==['False', 'True', 'True']
+
+def test_run_writes_the_json_baseline(tmp_path):
+    output = str(tmp_path/'baseline.json')
+    assert main(['run', '--sizes', '200', '--stages', 'get_commision', 'calculate_commissions',
+                 '--work-dir', str(tmp_path/'work'), '--output', output])==0
+
+    with open(output) as file:
+        benchmark = json.load(file)
+    assert set(benchmark)=={'created', 'seed', 'environment', 'results'}
+    assert list(benchmark['results'])==['200']
+    assert set(benchmark['results']['200'])=={'get_commision', 'calculate_commissions'}
+    for result in benchmark['results']['200'].values():
+        assert set(result)=={'seconds', 'peak_memory_mb'}
+        assert result['seconds']>=0 and result['peak_memory_mb']>=0
@@ -0,0 +1,38 @@
+import numpy as np
+
+from scripts.commission import COMMISSION_RULES, calculate_commissions, simulate_gross_margins
+from scripts.utils import get_commision
+
+def test_vectorized_commissions_match_get_commision():
+    # order counts around the tier threshold of micky_mouse
+    order_counts = [0, 1, 250, 499, 500, 501, 1234]
+    providers = [provider for provider in COMMISSION_RULES for _ in order_counts]
+    order_counts = order_counts*len(COMMISSION_RULES)
+
+    expected = [get_commision(provider, order_count) for provider, order_count in zip(providers, order_counts)]
+    np.testing.assert_allclose(calculate_commissions(providers, order_counts), expected)
+
+def test_vectorized_commissions_match_get_commision_on_monthly_data(sales_data):
+    monthly = sales_data.assign(year=sales_data['order_date'].dt.year, month=sales_data['order_date'].dt.month)\
+                        .groupby(['product', 'provider', 'year', 'month'])['order_count'].sum().reset_index()
+
+    expected = monthly.apply(lambda row: get_commision(row['provider'], row['order_count']), axis=1)
+    np.testing.assert_allclose(calculate_commissions(monthly['provider'], monthly['order_count']), expected)
+
+def test_simulated_gross_margins_match_get_commision(sales_data):
+    monthly = sales_data.assign(year=sales_data['order_date'].dt.year, month=sales_data['order_date'].dt.month)\
+                        .groupby(['product', 'provider', 'year', 'month'])[['order_count', 'revenue']].sum().reset_index()
+    cheaper_rules = dict(COMMISSION_RULES, tom_jerry={'flat_fee': 4000})
+
+    gross_margins = simulate_gross_margins(monthly, {'current': COMMISSION_RULES, 'cheaper': cheaper_rules})
+    assert list(gross_margins.index)==['current', 'cheaper']
+    assert list(gross_margins.columns.names)==['product', 'provider', 'year', 'month']
+
+    # gross margin of Answer 03.ipynb with the per-row commission
+    commissions = monthly.apply(lambda row: get_commision(row['provider'], row['order_count']), axis=1)
+    expected = (monthly['revenue']-commissions)*100/monthly['revenue']
+    np.testing.assert_allclose(gross_margins.loc['current'].to_numpy(), expected.to_numpy())
+
+    tom_jerry = (monthly['provider']=='tom_jerry').to_numpy()
+    assert (gross_margins.loc['cheaper'].to_numpy()[tom_jerry]>gross_margins.loc['current'].to_numpy()[tom_jerry]).all()
+    np.testing.assert_allclose(gross_margins.loc['cheaper'].to_numpy()[~tom_jerry], expected.to_numpy()[~tom_jerry])
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from scripts.cube import SalesCube
+from scripts.schema import coerce_schema
+from scripts.utils import extract_multiple_date_features
+
+def test_roll_up_matches_groupby(sales_data):
+    cube = SalesCube(sales_data)
+    features = extract_multiple_date_features(sales_data, 'order_date', ['week'])
+    expected = pd.concat([sales_data, features], axis=1).groupby(['product', 'week'])[['order_count', 'revenue']].sum()
+
+    rolled_up = cube.roll_up(['product', 'week']).set_index(['product', 'week'])
+    pd.testing.assert_frame_equal(rolled_up[['order_count', 'revenue']], expected, check_dtype=False)
+
+def test_roll_up_does_not_overflow_narrow_dtypes(sales_data):
+    compact = coerce_schema(sales_data, {'order_count': 'integer'})
+    assert compact['order_count'].dtype.itemsize==1
+
+    total = SalesCube(compact).roll_up()
+    assert total['order_count'].iloc[0]==sales_data['order_count'].sum()
+    assert (SalesCube(compact).cells['order_count']>=0).all()
+
+def test_get_rows_keeps_source_index(sales_data):
+    data = sales_data.set_axis(sales_data.index+1000)
+    rows = SalesCube(data).get_rows(product='B', week=20)
+
+    assert len(rows)>0
+    pd.testing.assert_frame_equal(rows[data.columns], data.loc[rows.index])
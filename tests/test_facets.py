@@ -0,0 +1,61 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import visualization
+from scripts.facets import plot_facet_grid
+from scripts.visualization import get_bar_statistics
+
+@pytest.fixture
+def facet_data():
+    rng = np.random.default_rng(3)
+    size = 700
+    return pd.DataFrame({'facet': rng.choice(['f{}'.format(index) for index in range(7)], size),
+                         'provider': rng.choice(['donald_duck', 'micky_mouse', 'roadrunner'], size),
+                         'revenue': rng.normal(100, 30, size)})
+
+def render_pages(monkeypatch, data:pd.core.frame.DataFrame, **kwargs)->list:
+    """Renders the facet grid in this process and returns the figures of its pages."""
+    figures = []
+
+    def keep_figure(fig, *args, **kwargs):
+        figures.append(fig)
+
+    monkeypatch.setattr(visualization, 'finalize_figure', keep_figure)
+    plot_facet_grid(data, facet_column='facet', x_axis_column='provider', y_axis_column='revenue',
+                    max_workers=1, **kwargs)
+    return figures
+
+def get_panels(figures:list)->list:
+    return [ax for fig in figures for ax in fig.axes if ax.get_visible()]
+
+def test_panels_are_split_into_pages(facet_data, monkeypatch):
+    figures = render_pages(monkeypatch, facet_data, panels_per_figure=4)
+
+    assert len(figures)==2
+    assert [len(fig.axes) for fig in figures]==[4, 4]
+    assert [sum(ax.get_visible() for ax in fig.axes) for fig in figures]==[4, 3]
+    assert [ax.get_title() for ax in get_panels(figures)]==['facet = f{}'.format(index) for index in range(7)]
+
+def test_colors_and_y_limits_are_shared(facet_data, monkeypatch):
+    panels = get_panels(render_pages(monkeypatch, facet_data, panels_per_figure=4))
+
+    assert len({ax.get_ylim() for ax in panels})==1
+
+    colors = {}
+    for ax in panels:
+        labels = [label.get_text() for label in ax.get_xticklabels()]
+        for label, patch in zip(labels, ax.patches):
+            colors.setdefault(label, set()).add(matplotlib.colors.to_hex(patch.get_facecolor()))
+    assert sorted(colors)==['donald_duck', 'micky_mouse', 'roadrunner']
+    assert all(len(values)==1 for values in colors.values())
+    assert len({values.pop() for values in colors.values()})==3
+
+def test_panel_bars_match_the_bar_statistics(facet_data, monkeypatch):
+    panels = get_panels(render_pages(monkeypatch, facet_data, panels_per_figure=4, top_n=2))
+
+    for index, ax in enumerate(panels):
+        expected = get_bar_statistics(facet_data[facet_data['facet']=='f{}'.format(index)], 'provider', 'revenue', top_n=2)
+        assert [label.get_text() for label in ax.get_xticklabels()]==expected['provider'].tolist()
+        np.testing.assert_allclose([patch.get_height() for patch in ax.patches], expected['mean'])
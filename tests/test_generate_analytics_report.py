@@ -0,0 +1,22 @@
+import io
+
+from PIL import Image
+
+from scripts.generate_analytics_report import PDF
+from scripts.visualization import plot_line_graph
+
+def test_image_width_follows_the_placed_width():
+    assert PDF.get_image_width_px('page_1_img_path')==round(190/25.4*200)
+    assert PDF.get_image_width_px('page_2_img_path1', image_ppi=100)==round(95/25.4*100)
+    assert PDF().image_ppi==PDF.DEFAULT_IMAGE_PPI
+
+def test_plots_render_at_the_requested_width(sales_data):
+    trend = sales_data.groupby(sales_data['order_date'].dt.isocalendar().week)['revenue'].sum()
+    width_px = PDF.get_image_width_px('page_1_img_path')
+
+    image = Image.open(io.BytesIO(plot_line_graph(trend, headless=True, return_bytes=True, width_px=width_px)))
+    # bbox_inches='tight' trims the margins of the figure
+    assert 0.8*width_px<=image.width<=1.1*width_px
+
+    default = Image.open(io.BytesIO(plot_line_graph(trend, headless=True, return_bytes=True)))
+    assert default.width>image.width
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fpdf import FPDF
+
+from scripts.pdf_charts import Chart, BarChart, LineChart, hex_to_rgb
+from scripts.pipeline import create_report_pipeline, create_bar_chart, create_line_chart
+
+def test_chart_is_abstract():
+    with pytest.raises(TypeError):
+        Chart()
+
+def test_bar_chart_matches_the_bargraph_means(sales_data):
+    chart = create_bar_chart(sales_data, 'product', 'revenue', title='Top Product By Revenue')
+    means = sales_data.groupby('product')['revenue'].mean().sort_values(ascending=False)
+
+    assert isinstance(chart, BarChart)
+    assert list(chart.labels)==list(means.index)
+    assert chart.values.tolist()==pytest.approx(means.tolist())
+
+def test_vector_chart_pipeline_draws_the_trend_and_bar_plots_as_charts(tmp_path):
+    pipeline = create_report_pipeline(str(tmp_path/'data.xlsx'), cache_dir=str(tmp_path/'cache'), vector_charts=True)
+
+    assert pipeline.stages['plot_trend'].function is create_line_chart
+    for name in ['plot_top_products', 'plot_top_products_avg_rev', 'plot_top_providers_avg_rev']:
+        assert pipeline.stages[name].function is create_bar_chart
+        assert pipeline.stages[name].output_file is None
+    assert 'create_analytics_report' in pipeline.order
+
+class FontCountingPDF(FPDF):
+    def __init__(self):
+        super().__init__()
+        self.set_font_calls = 0
+        self.add_page()
+        self.set_font('Arial', '', 10)
+
+    def set_font(self, *args, **kwargs):
+        self.set_font_calls += 1
+        return super().set_font(*args, **kwargs)
+
+def test_chart_colors():
+    assert hex_to_rgb('#00876c')==(0, 135, 108)
+    assert hex_to_rgb('#fff')==(255, 255, 255)
+    assert hex_to_rgb('grey')==(128, 128, 128)
+    with pytest.raises(ValueError, match='Invalid chart color'):
+        hex_to_rgb('not a color')
+
+def test_missing_values_are_left_out_of_the_charts():
+    trend = pd.Series([10.0, np.nan, 30.0, 20.0], index=[17, 18, 19, 20])
+    line_chart = LineChart(trend)
+    assert line_chart.x_values.tolist()==[17, 19, 20]
+    assert line_chart.values.tolist()==[10, 30, 20]
+
+    bar_chart = BarChart(['A', 'B', 'C'], [1.0, np.nan, 3.0], colors={'A': 'grey', 'C': '#fff'})
+    assert bar_chart.labels.tolist()==['C', 'A']
+    assert bar_chart.colors==['#fff', 'grey']
+
+    pdf = FontCountingPDF()
+    for chart in [line_chart, bar_chart, LineChart([np.nan]), BarChart(['A'], [np.nan])]:
+        chart.draw(pdf, 10, 10, 100)
+
+def test_bar_chart_sets_the_fonts_once_per_pass():
+    def count_set_font_calls(num_bars):
+        pdf = FontCountingPDF()
+        calls = pdf.set_font_calls
+        BarChart([str(index) for index in range(num_bars)], np.arange(1, num_bars+1)).draw(pdf, 10, 10, 100)
+        return pdf.set_font_calls-calls
+
+    assert count_set_font_calls(2)==count_set_font_calls(12)
@@ -0,0 +1,87 @@
+import sys
+import importlib
+import pandas as pd
+
+from scripts.pipeline import Stage, Pipeline, create_report_pipeline, add_date_features, get_weekly_aggregates
+
+def double(value:int = 1)->int:
+    return 2*value
+
+def test_fingerprint_follows_code_dependencies(tmp_path, monkeypatch):
+    module_path = tmp_path/'plot_helpers.py'
+    module_path.write_text('SCALE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    stage = Stage('double', double, code_dependencies=['plot_helpers'])
+    fingerprint = stage.get_fingerprint([])
+    assert stage.get_fingerprint([])==fingerprint
+
+    module_path.write_text('SCALE = 2\n')
+    assert stage.get_fingerprint([])!=fingerprint
+    assert 'plot_helpers' not in sys.modules
+
+def test_changed_dependency_reruns_only_its_stages(tmp_path, monkeypatch):
+    module_path = tmp_path/'plot_helpers.py'
+    module_path.write_text('SCALE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def create_pipeline():
+        return Pipeline([Stage('first', double, params={'value': 2}),
+                         Stage('second', double, ['first'], code_dependencies=['plot_helpers'])],
+                        str(tmp_path/'cache'), max_workers=1)
+
+    assert create_pipeline().run(verbose=False)=={'first': 'ran', 'second': 'ran'}
+    assert create_pipeline().run(verbose=False)=={'first': 'cached', 'second': 'cached'}
+
+    module_path.write_text('SCALE = 2\n')
+    pipeline = create_pipeline()
+    assert pipeline.run(verbose=False)=={'first': 'cached', 'second': 'ran'}
+    assert pipeline.load('second')==8
+
+def test_report_stages_depend_on_the_plot_and_report_modules(tmp_path):
+    pipeline = create_report_pipeline(str(tmp_path/'data.xlsx'), cache_dir=str(tmp_path/'cache'))
+    assert 'scripts.visualization' in pipeline.stages['plot_trend'].code_dependencies
+    assert 'scripts.generate_analytics_report' in pipeline.stages['create_analytics_report'].code_dependencies
+
+def test_fingerprint_follows_the_module_of_the_function(tmp_path, monkeypatch):
+    module_path = tmp_path/'stage_functions.py'
+    module_path.write_text('SCALE = 1\n\ndef scale(value=1):\n    return SCALE*value\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+    stage_functions = importlib.import_module('stage_functions')
+
+    stage = Stage('scale', stage_functions.scale)
+    fingerprint = stage.get_fingerprint([])
+
+    # only a module level constant used by the function changes
+    module_path.write_text('SCALE = 2\n\ndef scale(value=1):\n    return SCALE*value\n')
+    assert stage.get_fingerprint([])!=fingerprint
+    sys.modules.pop('stage_functions')
+
+def test_variants_of_a_stage_are_cached_side_by_side(tmp_path):
+    def create_pipeline(variant):
+        second = Stage('second', double, params={'value': 3 if variant else 4}, variant=variant)
+        return Pipeline([Stage('first', double, params={'value': 2}), second], str(tmp_path/'cache'), max_workers=1)
+
+    assert create_pipeline(None).run(verbose=False)=={'first': 'ran', 'second': 'ran'}
+    assert create_pipeline('vector_charts').run(verbose=False)=={'first': 'cached', 'second': 'ran'}
+    assert create_pipeline(None).run(verbose=False)=={'first': 'cached', 'second': 'cached'}
+    assert create_pipeline('vector_charts').run(verbose=False)=={'first': 'cached', 'second': 'cached'}
+
+def test_vector_chart_stages_are_a_variant(tmp_path):
+    pipeline = create_report_pipeline(str(tmp_path/'data.xlsx'), cache_dir=str(tmp_path/'cache'), vector_charts=True)
+    assert pipeline.stages['plot_trend'].variant=='vector_charts'
+    assert pipeline.stages['create_analytics_report'].variant=='vector_charts'
+    assert pipeline.stages['plot_product_sales_trend'].variant is None
+
+def test_weekly_aggregates_match_the_notebook(sales_data):
+    data = add_date_features(sales_data.copy())
+    weeks = sales_data['order_date'].dt.isocalendar().week
+
+    df_weekly = get_weekly_aggregates(data, 'product').set_index(['week', 'product'])
+    expected = sales_data.groupby([weeks, 'product'])[['order_count', 'revenue']].sum()
+
+    assert (df_weekly['total_orders'].to_numpy()==expected['order_count'].to_numpy()).all()
+    assert (df_weekly['revenue'].to_numpy()==expected['revenue'].to_numpy()).all()
+    pd.testing.assert_series_equal(df_weekly['avg_order_rev'], expected['revenue']/expected['order_count'],
+                                   check_names=False, check_index_type=False)
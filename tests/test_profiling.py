@@ -0,0 +1,30 @@
+import pytest
+
+from scripts import profiling
+from scripts.profiling import instrument, profiling as profile
+
+@instrument(name='allocate')
+def allocate(num_bytes:int)->int:
+    return len(bytearray(num_bytes))
+
+@instrument(name='outer')
+def outer()->int:
+    return allocate(4*1024*1024)+allocate(1024)
+
+@pytest.mark.parametrize('has_reset_peak', [True, False])
+def test_nested_peak_memory(monkeypatch, has_reset_peak):
+    if has_reset_peak and not profiling._HAS_RESET_PEAK:
+        pytest.skip('tracemalloc.reset_peak needs Python 3.9')
+    monkeypatch.setattr(profiling, '_HAS_RESET_PEAK', has_reset_peak)
+
+    with profile() as tracer:
+        outer()
+
+    records = tracer.get_records().set_index('name')
+    assert list(tracer.get_records()['depth'])==[0, 1, 1]
+    assert records.loc['outer', 'peak_memory_mb']>=4
+    assert records['error'].isna().all()
+
+def test_instrument_without_tracer_calls_through():
+    assert profiling.get_active_tracer() is None
+    assert allocate(10)==10
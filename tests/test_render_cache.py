@@ -0,0 +1,63 @@
+import os
+
+from scripts.render_cache import RenderCache
+
+def write_plot(text:str = '', save_file:str = 'plot.png', save_path:str = None):
+    with open(os.path.join(save_path, save_file), 'w') as file:
+        file.write(text)
+
+def read(path:str)->str:
+    with open(path) as file:
+        return file.read()
+
+def test_hit_returns_the_cached_image(tmp_path):
+    cache = RenderCache(str(tmp_path/'cache'))
+    output_path = cache.render(write_plot, text='first', save_path=str(tmp_path))
+    os.remove(output_path)
+
+    assert cache.render(write_plot, text='first', save_path=str(tmp_path))==output_path
+    assert read(output_path)=='first'
+    assert (cache.hits, cache.misses)==(1, 1)
+
+def test_miss_after_linked_hit_keeps_the_cached_image(tmp_path):
+    cache = RenderCache(str(tmp_path/'cache'), link=True)
+    cache.render(write_plot, text='first', save_path=str(tmp_path))
+    cache.render(write_plot, text='first', save_path=str(tmp_path))
+    output_path = cache.render(write_plot, text='second', save_path=str(tmp_path))
+
+    assert read(output_path)=='second'
+    cache.render(write_plot, text='first', save_path=str(tmp_path))
+    assert read(output_path)=='first'
+    assert (cache.hits, cache.misses)==(2, 2)
+
+PLOT_MODULE = '''
+def write_plot(color:str = 'red', save_file:str = 'plot.png', save_path:str = None, return_bytes:bool = False):
+    image = ('{}:' + color).encode('utf-8')
+    with open(save_path + '/' + save_file, 'wb') as file:
+        file.write(image)
+    return image if return_bytes else None
+'''
+
+def import_plot_module(tmp_path, monkeypatch, version:str):
+    import importlib
+    import sys
+
+    (tmp_path/'plot_module.py').write_text(PLOT_MODULE.replace('{}', version))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop('plot_module', None)
+    importlib.invalidate_caches()
+    return importlib.import_module('plot_module')
+
+def test_changed_plot_module_is_rendered_again(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path/'cache'))
+    output_dir = tmp_path/'plots'
+    output_dir.mkdir()
+
+    plot_module = import_plot_module(tmp_path, monkeypatch, 'v1')
+    assert cache.render(plot_module.write_plot, save_path=str(output_dir), return_bytes=True)==b'v1:red'
+    assert cache.render(plot_module.write_plot, save_path=str(output_dir), return_bytes=True)==b'v1:red'
+
+    plot_module = import_plot_module(tmp_path, monkeypatch, 'v2')
+    assert cache.render(plot_module.write_plot, save_path=str(output_dir), return_bytes=True)==b'v2:red'
+    assert read(str(output_dir/'plot.png'))=='v2:red'
+    assert (cache.hits, cache.misses)==(1, 2)
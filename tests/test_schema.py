@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from scripts.aggregation import aggregate_metrics
+from scripts.schema import coerce_column, coerce_schema, get_memory_usage_report
+from scripts.utils import group_by_and_sum_rows
+
+def test_coerce_schema_keeps_the_values(sales_data):
+    compact = coerce_schema(sales_data)
+
+    assert compact['product'].dtype=='category'
+    assert compact['provider'].dtype=='category'
+    # counts are multiplied row by row, so they are not narrowed below int32
+    assert compact['order_count'].dtype=='int32'
+    assert (compact['order_count']*1000).equals((sales_data['order_count']*1000).astype('int32'))
+
+    pd.testing.assert_frame_equal(compact.astype(sales_data.dtypes.to_dict()), sales_data)
+
+def test_float32_is_rejected_when_the_sums_drift():
+    rng = np.random.default_rng(0)
+    revenue = pd.Series(rng.integers(0, 40000, 200000).astype('float64'))
+
+    # every single value is exact in float32, but their running sum is not
+    assert np.array_equal(revenue.astype('float32'), revenue)
+    assert coerce_column(revenue, 'float').dtype=='float64'
+
+    small_revenue = pd.Series(rng.integers(0, 100, 1000)/4)
+    assert coerce_column(small_revenue, 'float').dtype=='float32'
+
+def test_sums_of_compact_columns_match(sales_data):
+    data = sales_data.assign(product=sales_data['product'].astype(str), revenue=sales_data['revenue']*1000.0)
+    compact = data.astype({'order_count': 'int8', 'revenue': 'float32'})
+
+    expected = group_by_and_sum_rows(data, ['product'], 'revenue', 'revenue')
+    pd.testing.assert_frame_equal(group_by_and_sum_rows(compact, ['product'], 'revenue', 'revenue'), expected)
+
+    metrics = {'order_count': ('sum', 'order_count'), 'revenue': ('sum', 'revenue')}
+    result = aggregate_metrics(compact, ['product'], metrics).set_index('product').sort_index()
+    expected = data.groupby('product')[['order_count', 'revenue']].sum()
+    assert (result['order_count']==expected['order_count']).all()
+    np.testing.assert_allclose(result['revenue'], expected['revenue'], rtol=0, atol=0.005)
+
+def test_memory_usage_report(sales_data):
+    compact = coerce_schema(sales_data)
+    report = get_memory_usage_report(sales_data, compact)
+
+    assert list(report.index)==list(sales_data.columns)+['total']
+    assert report.loc['product', 'dtype_after']=='category'
+    assert report.loc['total', 'bytes_before']==sales_data.memory_usage(index=False, deep=True).sum()
+    assert report.loc['total', 'bytes_after']<report.loc['total', 'bytes_before']
+    assert 0<report.loc['total', 'reduction(%)']<100
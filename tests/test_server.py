@@ -0,0 +1,81 @@
+import json
+import time
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+from scripts.benchmark import write_sales_dataset
+from scripts.server import AnalyticsServer
+from scripts.utils import read_xlsx
+
+@pytest.fixture
+def server(tmp_path):
+    """AnalyticsServer on an ephemeral localhost port, its event loop runs in a thread."""
+    path = write_sales_dataset(str(tmp_path/'sales.xlsx'), 500, seed=1)
+    server = AnalyticsServer(path, port=0, reload_interval=0.05)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(timeout=60)
+
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=60)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def get(server, target:str)->tuple:
+    try:
+        with urllib.request.urlopen('http://127.0.0.1:{}{}'.format(server.port, target), timeout=60) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+def get_expected_kpis(path:str)->dict:
+    data = read_xlsx(path, 'data')
+    weeks = data['order_date'].dt.isocalendar().week
+    return {'avg_orders_per_week': data['order_count'].sum()/weeks.nunique(),
+            'avg_revenue_per_order': data['revenue'].sum()/data['order_count'].sum()}
+
+def test_kpis_match_the_dataset(server):
+    status, headers, body = get(server, '/kpi')
+    assert status==200 and headers['Content-Type']=='application/json'
+
+    kpis = json.loads(body)
+    expected = get_expected_kpis(server.analytics.path)
+    assert kpis['avg_orders_per_week']==pytest.approx(expected['avg_orders_per_week'])
+    assert kpis['avg_revenue_per_order']==pytest.approx(expected['avg_revenue_per_order'])
+    assert set(kpis['most_desirable_product'])=={'product', 'avg_weekly_orders'}
+
+    assert get(server, '/kpi/unknown')[0]==404
+    assert get(server, '/kpi/monthly_gross_margin?year=twenty')[0]==400
+
+def test_repeated_request_is_a_cache_hit(server):
+    status, headers, body = get(server, '/kpi/monthly_gross_margin?group_by=provider')
+    assert status==200 and headers['X-Cache']=='miss'
+    assert {row['provider'] for row in json.loads(body)['monthly_gross_margin']}=={'donald_duck', 'micky_mouse',
+                                                                                  'roadrunner', 'tom_jerry'}
+
+    status, headers, cached_body = get(server, '/kpi/monthly_gross_margin?group_by=provider')
+    assert status==200 and headers['X-Cache']=='hit'
+    assert cached_body==body
+    assert server.cache.hits==1
+
+def test_changed_source_file_is_reloaded(server):
+    first = json.loads(get(server, '/kpi/avg_orders_per_week')[2])['avg_orders_per_week']
+
+    write_sales_dataset(server.analytics.path, 800, seed=2)
+    deadline = time.time()+30
+    while json.loads(get(server, '/')[2])['version']<2:
+        assert time.time()<deadline, 'the changed source file was not reloaded'
+        time.sleep(0.05)
+
+    status, headers, body = get(server, '/kpi/avg_orders_per_week')
+    assert headers['X-Cache']=='miss'
+    reloaded = json.loads(body)['avg_orders_per_week']
+    assert reloaded!=first
+    assert reloaded==pytest.approx(get_expected_kpis(server.analytics.path)['avg_orders_per_week'])
@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pytest
+
+from scripts.benchmark import write_sales_dataset
+from scripts.utils import read_xlsx, iter_xlsx_chunks, group_by_and_sum_rows, extract_multiple_date_features
+
+def test_feather_cache_round_trip(tmp_path):
+    path = write_sales_dataset(str(tmp_path/'sales.xlsx'), 500, seed=3)
+    cache_dir = str(tmp_path/'cache')
+    expected = read_xlsx(path, 'data')
+
+    first = read_xlsx(path, 'data', cache_dir=cache_dir)
+    second = read_xlsx(path, 'data', cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir))==1
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+
+    # a changed workbook replaces the cached version instead of reading it
+    write_sales_dataset(path, 400, seed=4)
+    changed = read_xlsx(path, 'data', cache_dir=cache_dir)
+    assert len(changed)==400
+    assert len(os.listdir(cache_dir))==1
+    pd.testing.assert_frame_equal(changed, read_xlsx(path, 'data'))
+
+def test_chunked_groupby_matches_in_memory(tmp_path):
+    path = write_sales_dataset(str(tmp_path/'sales.xlsx'), 1000, seed=5)
+    data = read_xlsx(path, 'data')
+
+    chunks = iter_xlsx_chunks(path, 'data', chunksize=128, schema={'order_date': 'datetime64[ns]'})
+    chunked = group_by_and_sum_rows(chunks, ['product', 'provider'], 'order_count', 'total_orders')
+    expected = group_by_and_sum_rows(data, ['product', 'provider'], 'order_count', 'total_orders')
+
+    pd.testing.assert_frame_equal(chunked, expected)
+
+def test_date_features_of_missing_dates_are_na():
+    df = pd.DataFrame({'order_date': pd.to_datetime(['2020-12-31', None, '2021-01-03'])})
+    features = extract_multiple_date_features(df, 'order_date', ['month', 'year', 'week', 'iso_year'])
+
+    assert features.dtypes.astype(str).tolist()==['Int8', 'Int16', 'Int8', 'Int16']
+    assert features.iloc[1].isna().all()
+    assert features.iloc[[0, 2]].to_numpy().tolist()==[[12, 2020, 53, 2020], [1, 2021, 53, 2020]]
+
+    # without missing dates the plain numpy dtypes are kept
+    features = extract_multiple_date_features(df.dropna(), 'order_date', ['month', 'iso_year'])
+    assert features.dtypes.astype(str).tolist()==['int8', 'int16']
+
+def test_unknown_date_features_are_rejected():
+    df = pd.DataFrame({'order_date': pd.to_datetime(['2021-01-03'])})
+    with pytest.raises(Exception) as error:
+        extract_multiple_date_features(df, 'order_date', ['quarter'])
+    assert isinstance(error.value.__cause__, ValueError)
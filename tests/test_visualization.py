@@ -0,0 +1,48 @@
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import visualization
+
+@pytest.fixture
+def wide_df():
+    weeks = np.arange(17, 27)
+    return pd.DataFrame({'index': weeks, 'A': weeks*2.0, 'B': weeks*3.0, 'C': weeks*1.0})
+
+def test_spaghetti_draws_the_highlighted_line_in_grey_behind_the_highlight(wide_df):
+    plt.close('all')
+    visualization.plot_highlighted_sphagetti_graph(wide_df, highlight_column='B')
+
+    lines = plt.gcf().axes[0].get_lines()
+    colors = [matplotlib.colors.to_hex(line.get_color()) for line in lines]
+    assert colors==[matplotlib.colors.to_hex('grey')]*3+[matplotlib.colors.to_hex('orange')]
+    np.testing.assert_array_equal(lines[1].get_ydata(), lines[-1].get_ydata())
+    plt.close('all')
+
+def test_headless_plots_leave_no_pyplot_figures(wide_df):
+    plt.close('all')
+    image = visualization.plot_highlighted_sphagetti_graph(wide_df, highlight_column='B', headless=True,
+                                                            return_bytes=True)
+    assert image[:4]==b'\x89PNG'
+    assert plt.get_fignums()==[]
+
+@pytest.mark.parametrize('has_bar_label', [True, False])
+def test_bar_values_are_labeled_at_once(has_bar_label, monkeypatch):
+    if not has_bar_label:
+        # matplotlib<3.4, i.e. the pinned 3.3.4
+        monkeypatch.delattr(matplotlib.axes.Axes, 'bar_label')
+
+    df_statistics = pd.DataFrame({'product': ['A', 'B', 'C'], 'mean': [12.34, -5.0, 0.0], 'ci': 0.0,
+                                  'x_position': [0, 1, 2]})
+    fig = visualization.create_figure(headless=True)
+    ax = fig.subplots()
+    visualization.draw_aggregated_bars(ax, df_statistics, 'product')
+
+    assert [text.get_text() for text in ax.texts]==['12.3', '-5.0', '0.0']
+    assert [text.get_va() for text in ax.texts]==['bottom', 'top', 'bottom']
+    renderer = FigureCanvasAgg(fig).get_renderer()
+    positions = [ax.transData.inverted().transform(text.get_window_extent(renderer)) for text in ax.texts]
+    assert positions[0][0][1]>12.34 and positions[1][1][1]<-5.0